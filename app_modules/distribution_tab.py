@@ -1,3 +1,4 @@
+import hashlib
 import io
 
 import pandas as pd
@@ -15,21 +16,63 @@ from app_modules.ui_config import INVENTORY_LOCATIONS
 from inventory_modules import core as inv_core
 
 
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _read_master(file_hash: str, name: str, _content: bytes) -> pd.DataFrame:
+    """Parse the master list once per file content (keyed by `file_hash`)."""
+    if name.lower().endswith(".csv"):
+        return pd.read_csv(io.BytesIO(_content))
+    return pd.read_excel(io.BytesIO(_content))
+
+
 def _read_uploaded(uploaded_file):
     if not uploaded_file:
         return None
-    uploaded_file.seek(0)
-    if uploaded_file.name.lower().endswith(".csv"):
-        return pd.read_csv(uploaded_file)
-    return pd.read_excel(uploaded_file)
+    content = uploaded_file.getvalue()
+    return _read_master(hashlib.md5(content).hexdigest(), uploaded_file.name, content)
+
+
+@st.cache_resource(show_spinner=False)
+def _location_parse_cache() -> inv_core.LocationParseCache:
+    """Parsed location files shared across reruns, keyed by content hash."""
+    return inv_core.LocationParseCache()
 
 
 def _reset_inventory_state():
     clear_state_keys(
-        ["inv_res_data", "inv_active_l", "inv_t_col", "inv_master_df_live"]
+        [
+            "inv_res_data",
+            "inv_active_l",
+            "inv_t_col",
+            "inv_master_df_live",
+            "inv_res_key",
+            "inv_search_index",
+            "inv_search_key",
+        ]
     )
 
 
+def _analysis_key(result_df, title_col, locations) -> str:
+    """Content hash of an analysis result; stable across load_state reloads."""
+    digest = hashlib.md5("|".join(map(str, [title_col, *locations, *result_df.columns])).encode())
+    digest.update(pd.util.hash_pandas_object(result_df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _search_index(result_df, title_col, locations) -> inv_core.DistributionIndex:
+    """Index for the current analysis, rebuilt only when the analysis changes."""
+    # load_state hands back a fresh DataFrame every rerun, so the index is
+    # keyed by the persisted inv_res_key rather than by object identity.
+    key = st.session_state.get("inv_res_key")
+    if key is None:
+        key = st.session_state.inv_res_key = _analysis_key(result_df, title_col, locations)
+    index = st.session_state.get("inv_search_index")
+    if index is None or st.session_state.get("inv_search_key") != key:
+        index = inv_core.DistributionIndex(result_df, title_col, locations)
+        st.session_state.inv_search_index = index
+        st.session_state.inv_search_key = key
+    return index
+
+
 def _render_upload_summary(master_df, title_col):
     c1, c2 = st.columns(2)
     c1.metric("Master rows", 0 if master_df is None else len(master_df))
@@ -50,6 +93,15 @@ def render_distribution_tab(search_q):
             if uploaded:
                 loc_files[loc] = uploaded
 
+    fuzzy_threshold = st.slider(
+        "Fuzzy match threshold",
+        min_value=60,
+        max_value=100,
+        value=inv_core.FUZZY_THRESHOLD,
+        key="inv_fuzzy_threshold",
+        help="Items without an exact name or SKU match take the closest same-size item scoring at least this much. Higher is stricter.",
+    )
+
     master_df = None
     title_col = None
     sku_col = None
@@ -92,7 +144,9 @@ def render_distribution_tab(search_q):
         else:
             try:
                 inventory_map, warnings, _, sku_map = (
-                    inv_core.load_inventory_from_uploads(loc_files)
+                    inv_core.load_inventory_from_uploads(
+                        loc_files, cache=_location_parse_cache()
+                    )
                 )
                 if warnings:
                     for warning in warnings:
@@ -105,11 +159,19 @@ def render_distribution_tab(search_q):
                     INVENTORY_LOCATIONS,
                     sku_col,
                     sku_map,
+                    fuzzy_threshold=fuzzy_threshold,
                 )
 
                 st.session_state.inv_res_data = result_df
                 st.session_state.inv_active_l = INVENTORY_LOCATIONS
                 st.session_state.inv_t_col = title_col
+                st.session_state.inv_res_key = _analysis_key(
+                    result_df, title_col, INVENTORY_LOCATIONS
+                )
+                st.session_state.inv_search_index = inv_core.DistributionIndex(
+                    result_df, title_col, INVENTORY_LOCATIONS
+                )
+                st.session_state.inv_search_key = st.session_state.inv_res_key
                 save_state()
                 st.success("Distribution analysis complete.")
             except Exception as exc:
@@ -117,17 +179,37 @@ def render_distribution_tab(search_q):
                 st.error("Distribution analysis failed.")
 
     if st.session_state.get("inv_res_data") is not None:
-        df = st.session_state.inv_res_data.copy()
+        result_df = st.session_state.inv_res_data
         title_key = st.session_state.inv_t_col
         active_locations = st.session_state.inv_active_l
+        index = _search_index(result_df, title_key, active_locations)
+
+        f1, f2, f3, f4 = st.columns(4)
+        stock_loc = f1.selectbox(
+            "Location", ["Any"] + index.locations, key="inv_filter_loc"
+        )
+        min_stock = f2.number_input(
+            "Min stock at location", min_value=0, value=0, step=1, key="inv_filter_min"
+        )
+        low_only = f3.checkbox("Low stock only", key="inv_filter_low")
+        # Persisted setting (defaults to 5 in init_state); saved on change so
+        # the next rerun's load_state doesn't restore the old value.
+        low_max = f4.number_input(
+            "Low stock at or below",
+            min_value=0,
+            step=1,
+            key="low_stock_threshold",
+            on_change=save_state,
+        )
 
-        if search_q:
-            df = df[
-                df[title_key]
-                .astype(str)
-                .str.lower()
-                .str.contains(search_q.lower(), na=False)
-            ]
+        rows = index.select(
+            search_q,
+            location=None if stock_loc == "Any" else stock_loc,
+            min_stock=int(min_stock),
+            low_stock_max=int(low_max) if low_only else None,
+        )
+        df = result_df if len(rows) == len(index) else result_df.iloc[rows]
+        st.caption(f"Showing {len(rows):,} of {len(index):,} items")
 
         st.dataframe(df, use_container_width=True)
 
@@ -18,7 +18,7 @@ from typing import Dict, List, Optional
 
 # Import shared components and logic from your existing modules
 from app_modules.customer_dedup import build_customer_mapping, auto_detect_columns
-from app_modules.wc_live_source import load_from_woocommerce
+from app_modules.wc_order_store import load_from_order_store
 from app_modules.sales_dashboard import load_from_google_sheet, find_columns
 from app_modules.ui_components import to_excel_bytes, section_card
 from app_modules.unified_reporting import render_unified_export_section, create_report_section, ReportMetadata
@@ -36,7 +36,7 @@ def load_sources(
     
     if use_wc and wc_creds:
         try:
-            wc_df, _, _ = load_from_woocommerce(**wc_creds)
+            wc_df, _, _ = load_from_order_store(**wc_creds)
         except Exception as e:
             st.error(f"Failed to load from WooCommerce: {e}")
 
@@ -1,6 +1,12 @@
+import csv
+import html
+import io
 import re
+import time
+from dataclasses import dataclass
 from io import BytesIO
 from datetime import datetime
+from typing import IO, Callable, Dict, Iterator, Optional
 
 import pandas as pd
 import streamlit as st
@@ -17,6 +23,54 @@ HEADER_TOKENS = {
 }
 
 
+RECORD_COLUMNS = [
+    "Consignment ID",
+    "Type",
+    "Order ID",
+    "Store",
+    "Recipient Name",
+    "Address",
+    "Phone",
+    "Delivery Status",
+    "Status Updated On",
+    "COD Amount",
+    "Charge",
+    "Discount",
+    "Payment Status",
+    "Action",
+]
+
+# Patterns are compiled once at import; both parsers classify each line /
+# token a single time and append straight into per-column lists.
+_CONS_ID = re.compile(r"[A-Z]{2}\d{6}[A-Z0-9]+")
+_AMOUNT = re.compile(r"([\d,]+(?:\.\d+)?)")
+
+# Line kinds for the standard parser
+_OTHER, _CONS, _TYPE, _UPDATED = range(4)
+
+# One alternation for every field the fuzzy parser extracts; `cons` starts a
+# record. The lookahead lets positions that cannot start a token fail fast.
+_FUZZY_TOKENS = re.compile(
+    r"(?=[ACDPRUcw\d])(?:"
+    r"(?P<cons>DD\d{6}[A-Z0-9]+)"
+    r"|(?P<phone>01\d{9})"
+    r"|\b(?P<order>\d{6})\b"
+    r"|(?P<store>Deen Commerce|w DEEN WARI OUTLET|c DEEN CUMILLA OUTLET)"
+    r"|COD\s*à§³?\s*(?P<cod>[\d,]+)"
+    r"|Charge\s*à§³?\s*(?P<charge>[\d,.]+)"
+    r"|Discount\s*à§³?\s*(?P<discount>[\d,]+)"
+    r"|(?P<delivery>At Delivery Hub|Paid Return|Urgent Delivery Requested|Returned)"
+    r"|Updated on\s*(?P<updated>[\d/]+)"
+    r"|(?P<unpaid>Unpaid)"
+    r"|(?P<paid>Paid))"
+)
+_FUZZY_FIELDS = ("phone", "order", "store", "cod", "charge", "discount", "delivery", "updated")
+_PHONE_START = re.compile(r"01\d{9}")
+_INFO_IGNORE = re.compile(
+    r"type:|parcel|cod|charge|discount|paid|view pod|action|updated on", re.IGNORECASE
+)
+
+
 def clean_lines(raw: str):
     lines = []
     for line in raw.splitlines():
@@ -30,11 +84,11 @@ def clean_lines(raw: str):
 
 
 def is_consignment_id(value: str) -> bool:
-    return bool(re.match(r"^[A-Z]{2}\d{6}[A-Z0-9]+$", value))
+    return _CONS_ID.fullmatch(value) is not None
 
 
 def parse_amount(line: str):
-    m = re.search(r"([\d,]+(?:\.\d+)?)", line)
+    m = _AMOUNT.search(line)
     if not m:
         return 0.0
     return float(m.group(1).replace(",", ""))
@@ -46,203 +100,319 @@ def parse_date(line: str):
     return line.strip()
 
 
+def tokenize_lines(raw: str):
+    """clean_lines() plus the kind of every kept line, in one pass."""
+    is_cons = _CONS_ID.fullmatch
+    lines, kinds = [], []
+    for line in raw.splitlines():
+        value = line.strip()
+        if not value or value in HEADER_TOKENS:
+            continue
+        lines.append(value)
+        if value.startswith("Type"):
+            kinds.append(_TYPE)
+        elif value.startswith("Updated on"):
+            kinds.append(_UPDATED)
+        elif is_cons(value):
+            kinds.append(_CONS)
+        else:
+            kinds.append(_OTHER)
+    return lines, kinds
+
+
 def parse_records(raw: str):
-    lines = clean_lines(raw)
-    records = []
+    """
+    Positional parser for consignment rows copied from the Pathao panel:
+    ID, type, order, store, recipient, address, phone, status lines,
+    "Updated on", COD/charge/discount, payment, then action lines.
+    """
+    lines, kinds = tokenize_lines(raw)
+    n = len(lines)
+    cols = {c: [] for c in RECORD_COLUMNS}
+    positional = ("Type", "Order ID", "Store", "Recipient Name", "Address", "Phone")
     i = 0
 
-    while i < len(lines):
-        if not is_consignment_id(lines[i]):
+    while i < n:
+        if kinds[i] != _CONS:
             i += 1
             continue
 
-        rec = {
-            "Consignment ID": lines[i],
-            "Type": "",
-            "Order ID": "",
-            "Store": "",
-            "Recipient Name": "",
-            "Address": "",
-            "Phone": "",
-            "Delivery Status": "",
-            "Status Updated On": "",
-            "COD Amount": 0.0,
-            "Charge": 0.0,
-            "Discount": 0.0,
-            "Payment Status": "",
-            "Action": "",
-        }
+        cols["Consignment ID"].append(lines[i])
         i += 1
-
-        if i < len(lines) and lines[i].startswith("Type"):
-            i += 1
-        if i < len(lines):
-            rec["Type"] = lines[i]
+        if i < n and kinds[i] == _TYPE:
             i += 1
+        for col in positional:
+            cols[col].append(lines[i] if i < n else "")
+            i = min(i + 1, n)
 
-        if i < len(lines):
-            rec["Order ID"] = lines[i]
-            i += 1
-        if i < len(lines):
-            rec["Store"] = lines[i]
-            i += 1
-        if i < len(lines):
-            rec["Recipient Name"] = lines[i]
-            i += 1
-        if i < len(lines):
-            rec["Address"] = lines[i]
-            i += 1
-        if i < len(lines):
-            rec["Phone"] = lines[i]
+        start = i
+        while i < n and kinds[i] != _UPDATED:
             i += 1
+        cols["Delivery Status"].append("; ".join(lines[start:i]))
 
-        status_lines = []
-        while i < len(lines) and not lines[i].startswith("Updated on"):
-            status_lines.append(lines[i])
+        if i < n:
+            cols["Status Updated On"].append(parse_date(lines[i]))
             i += 1
-        rec["Delivery Status"] = "; ".join(status_lines)
+        else:
+            cols["Status Updated On"].append("")
 
-        if i < len(lines) and lines[i].startswith("Updated on"):
-            rec["Status Updated On"] = parse_date(lines[i])
-            i += 1
+        for col in ("COD Amount", "Charge", "Discount"):
+            cols[col].append(parse_amount(lines[i]) if i < n else 0.0)
+            i = min(i + 1, n)
 
-        if i < len(lines):
-            rec["COD Amount"] = parse_amount(lines[i])
-            i += 1
-        if i < len(lines):
-            rec["Charge"] = parse_amount(lines[i])
-            i += 1
-        if i < len(lines):
-            rec["Discount"] = parse_amount(lines[i])
-            i += 1
+        cols["Payment Status"].append(lines[i] if i < n else "")
+        i = min(i + 1, n)
 
-        if i < len(lines):
-            rec["Payment Status"] = lines[i]
+        start = i
+        while i < n and kinds[i] != _CONS:
             i += 1
+        cols["Action"].append(", ".join(lines[j] for j in range(start, i) if kinds[j] != _TYPE))
+
+    return pd.DataFrame(cols)
 
-        action_lines = []
-        while i < len(lines) and not is_consignment_id(lines[i]):
-            if not lines[i].startswith("Type"):
-                action_lines.append(lines[i])
-            i += 1
-        rec["Action"] = ", ".join(action_lines)
-
-        records.append(rec)
-
-    return pd.DataFrame(records)
-
-
-def extract_fields_fuzzy(cons_id, text_block):
-    order_id_match = re.search(r"\b(\d{6})\b", text_block)
-    order_id = order_id_match.group(1) if order_id_match else ""
-
-    store_match = re.search(
-        r"(Deen Commerce|w DEEN WARI OUTLET|c DEEN CUMILLA OUTLET)", text_block
-    )
-    store = store_match.group(1) if store_match else ""
-
-    phone_match = re.search(r"(01\d{9})", text_block)
-    phone = phone_match.group(1) if phone_match else ""
-
-    cod_match = re.search(r"COD\s*à§³?\s*([\d,]+)", text_block)
-    cod = cod_match.group(1).replace(",", "") if cod_match else "0"
-
-    charge_match = re.search(r"Charge\s*à§³?\s*([\d,.]+)", text_block)
-    charge = charge_match.group(1).replace(",", "") if charge_match else "0"
-
-    discount_match = re.search(r"Discount\s*à§³?\s*([\d,]+)", text_block)
-    discount = discount_match.group(1).replace(",", "") if discount_match else "0"
-
-    status = "Unpaid"
-    if "Paid" in text_block and "Unpaid" not in text_block:
-        status = "Paid"
-
-    delivery_match = re.search(
-        r"(At Delivery Hub|Paid Return|Urgent Delivery Requested|Returned)", text_block
-    )
-    delivery_status = delivery_match.group(1) if delivery_match else ""
-
-    updated_match = re.search(r"Updated on\s*([\d/]+)", text_block)
-    status_updated_on = updated_match.group(1) if updated_match else ""
-
-    lines = text_block.split("\n")
-    info_lines = []
-    ignore_keywords = [
-        "Type:",
-        "Parcel",
-        "COD",
-        "Charge",
-        "Discount",
-        "Paid",
-        "Unpaid",
-        "View POD",
-        "Action",
-        "Updated on",
-        "Paid At:",
-        store,
-        order_id,
-        cons_id,
-    ]
-
-    for line in lines:
-        clean_line = line.strip()
-        if not clean_line:
-            continue
-        if re.match(r"01\d{9}", clean_line):
-            continue
 
-        should_ignore = False
-        for kw in ignore_keywords:
-            if kw and kw.lower() in clean_line.lower():
-                should_ignore = True
-                break
+def _to_float(value: str) -> float:
+    value = value.replace(",", "")
+    return float(value) if value else 0.0
 
-        if not should_ignore:
-            info_lines.append(clean_line)
 
-    filtered_info = []
-    for line in info_lines:
-        if line.isdigit():
+def parse_data_fuzzy(raw_text):
+    """
+    Fallback for loosely structured text: every "DD......" consignment id
+    starts a record; order id, store, phone, amounts, delivery status and
+    date are the first matches inside it, and the remaining free-text lines
+    give the recipient name and address.
+    """
+    cols = {c: [] for c in RECORD_COLUMNS}
+
+    def _flush(rec: Dict, body: str):
+        cons_id = rec["cons"]
+        store = rec["store"] or ""
+        order_id = rec["order"] or ""
+        dynamic = [kw.lower() for kw in (store, order_id, cons_id) if kw]
+        info = []
+        for line in body.split("\n"):
+            line = line.strip()
+            if not line or _PHONE_START.match(line) or _INFO_IGNORE.search(line) or line.isdigit():
+                continue
+            lowered = line.lower()
+            if not any(kw in lowered for kw in dynamic):
+                info.append(line)
+        cols["Consignment ID"].append(cons_id)
+        cols["Type"].append("")
+        cols["Order ID"].append(order_id)
+        cols["Store"].append(store)
+        cols["Recipient Name"].append(info[0] if info else "")
+        cols["Address"].append(", ".join(info[1:]))
+        cols["Phone"].append(rec["phone"] or "")
+        cols["Delivery Status"].append(rec["delivery"] or "")
+        cols["Status Updated On"].append(rec["updated"] or "")
+        cols["COD Amount"].append(_to_float(rec["cod"] or "0"))
+        cols["Charge"].append(_to_float(rec["charge"] or "0"))
+        cols["Discount"].append(_to_float(rec["discount"] or "0"))
+        cols["Payment Status"].append("Paid" if rec["paid"] and not rec["unpaid"] else "Unpaid")
+        cols["Action"].append("")
+
+    rec = None
+    body_start = 0
+    for m in _FUZZY_TOKENS.finditer(raw_text):
+        kind = m.lastgroup
+        if kind == "cons":
+            if rec is not None:
+                _flush(rec, raw_text[body_start:m.start()])
+            rec = dict.fromkeys(_FUZZY_FIELDS)
+            rec.update(cons=m.group(kind), paid=False, unpaid=False)
+            body_start = m.end()
+        elif rec is None:
             continue
-        filtered_info.append(line)
-
-    name = ""
-    address = ""
-
-    if len(filtered_info) > 0:
-        name = filtered_info[0]
-    if len(filtered_info) > 1:
-        address = ", ".join(filtered_info[1:])
-
-    return {
-        "Consignment ID": cons_id,
-        "Type": "",
-        "Order ID": order_id,
-        "Store": store,
-        "Recipient Name": name,
-        "Address": address,
-        "Phone": phone,
-        "Delivery Status": delivery_status,
-        "Status Updated On": status_updated_on,
-        "COD Amount": float(cod) if cod else 0.0,
-        "Charge": float(charge) if charge else 0.0,
-        "Discount": float(discount) if discount else 0.0,
-        "Payment Status": status,
-        "Action": "",
-    }
+        elif kind == "paid":
+            rec["paid"] = True
+        elif kind == "unpaid":
+            rec["unpaid"] = True
+        else:
+            if kind == "delivery" and m.group(kind) == "Paid Return":
+                rec["paid"] = True
+            if rec[kind] is None:
+                rec[kind] = m.group(kind)
+
+    if rec is not None:
+        _flush(rec, raw_text[body_start:])
+    return pd.DataFrame(cols)
+
+
+# ── Streaming uploads ────────────────────────────────────────────────────
+STREAM_CHUNK_CHARS = 1 << 20  # decoded characters handed to the parser per chunk
+
+# Record starts used to cut the stream: a whole consignment-id line for the
+# standard parser (complete, i.e. newline-terminated), any id for the fuzzy one.
+_CONS_LINE = re.compile(r"^[ \t]*[A-Z]{2}\d{6}[A-Z0-9]+[ \t]*\r?\n", re.MULTILINE)
+_FUZZY_CONS = re.compile(r"DD\d{6}[A-Z0-9]+")
+# Either kind of boundary, for parser="auto" before a parser is chosen
+_ANY_CONS = re.compile(f"{_CONS_LINE.pattern}|{_FUZZY_CONS.pattern}", re.MULTILINE)
+_CUT_PATTERNS = {"standard": _CONS_LINE, "fuzzy": _FUZZY_CONS, "auto": _ANY_CONS}
+
+_HTML_BREAK = re.compile(r"<\s*/?\s*(?:td|th|tr|div|p|br|li|ul|ol|table|thead|tbody|h[1-6])\b[^>]*>", re.IGNORECASE)
+_HTML_TAG = re.compile(r"<[^>]*>")
+_HTML_SKIP = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+
+
+@dataclass
+class ParseProgress:
+    """One parsed chunk of a streamed upload."""
+    frame: pd.DataFrame
+    records: int  # records parsed so far
+    bytes_read: int
+    total_bytes: Optional[int]
+    elapsed: float
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.records / self.elapsed if self.elapsed else 0.0
+
+
+def _read_text(stream: IO[bytes], chunk_chars: int) -> Iterator[str]:
+    reader = io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+    try:
+        while True:
+            text = reader.read(chunk_chars)
+            if not text:
+                return
+            yield text
+    finally:
+        reader.detach()
+
+
+def _read_html(stream: IO[bytes], chunk_chars: int) -> Iterator[str]:
+    """Markup to text lines: table cells and blocks become line breaks, inline tags vanish."""
+    pending = ""
+    for text in _read_text(stream, chunk_chars):
+        pending += text
+        # Hold back an unterminated tag or script/style block for the next chunk
+        cut = len(pending)
+        lt = pending.rfind("<")
+        if lt != -1 and pending.find(">", lt) == -1:
+            cut = lt
+        opener = re.search(r"<(script|style)\b(?![\s\S]*</\1\s*>)", pending[:cut], re.IGNORECASE)
+        if opener:
+            cut = opener.start()
+        done, pending = pending[:cut], pending[cut:]
+        yield html.unescape(_HTML_TAG.sub("", _HTML_BREAK.sub("\n", _HTML_SKIP.sub("", done))))
+    if pending:
+        yield html.unescape(_HTML_TAG.sub("", _HTML_BREAK.sub("\n", _HTML_SKIP.sub("", pending))))
+
+
+def _read_csv(stream: IO[bytes], chunk_chars: int) -> Iterator[str]:
+    """Each CSV row becomes its cells on consecutive lines, like a copied panel row."""
+    reader = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        parts, size = [], 0
+        for row in csv.reader(reader):
+            block = "\n".join(row) + "\n"
+            parts.append(block)
+            size += len(block)
+            if size >= chunk_chars:
+                yield "".join(parts)
+                parts, size = [], 0
+        if parts:
+            yield "".join(parts)
+    finally:
+        reader.detach()
+
+
+READERS: Dict[str, Callable[[IO[bytes], int], Iterator[str]]] = {
+    "text": _read_text,
+    "html": _read_html,
+    "csv": _read_csv,
+}
 
 
-def parse_data_fuzzy(raw_text):
-    record_start_pattern = re.compile(r"(DD\d{6}[A-Z0-9]+)")
-    parts = record_start_pattern.split(raw_text)
-    records = []
-    for i in range(1, len(parts), 2):
-        if i + 1 < len(parts):
-            cons_id = parts[i].strip()
-            body = parts[i + 1].strip()
-            record = extract_fields_fuzzy(cons_id, body)
-            records.append(record)
-    return pd.DataFrame(records)
+def upload_kind(filename: str) -> str:
+    name = filename.lower()
+    if name.endswith((".html", ".htm")):
+        return "html"
+    if name.endswith(".csv"):
+        return "csv"
+    return "text"
+
+
+def _record_cut(buffer: str, parser: str) -> int:
+    """Start of the last complete record boundary after position 0 (0 if none)."""
+    pattern = _CUT_PATTERNS[parser]
+    cut = 0
+    for m in pattern.finditer(buffer, 1):
+        if m.end() < len(buffer):
+            cut = m.start()
+    return cut
+
+
+def iter_parsed_chunks(
+    stream: IO[bytes],
+    kind: str = "text",
+    parser: str = "auto",
+    chunk_chars: int = STREAM_CHUNK_CHARS,
+    total_bytes: Optional[int] = None,
+) -> Iterator[ParseProgress]:
+    """
+    Stream an uploaded dump through parse_records / parse_data_fuzzy.
+
+    The decoded text is cut at consignment-id boundaries, so every chunk
+    holds whole records and memory stays proportional to `chunk_chars`.
+    parser="auto" uses the standard parser unless the first chunk that
+    contains records only parses with the fuzzy one.
+    """
+    started = time.perf_counter()
+    records = 0
+    buffer = ""
+
+    def _parse(text: str, final: bool = False):
+        nonlocal parser, records
+        if parser == "auto":
+            frame = parse_records(text)
+            if frame.empty:
+                frame = parse_data_fuzzy(text)
+                if not frame.empty or final:
+                    parser = "fuzzy"
+            else:
+                parser = "standard"
+        else:
+            frame = (parse_records if parser == "standard" else parse_data_fuzzy)(text)
+        records += len(frame)
+        return ParseProgress(frame, records, stream.tell(), total_bytes, time.perf_counter() - started)
+
+    for text in READERS[kind](stream, chunk_chars):
+        buffer += text
+        cut = _record_cut(buffer, parser)
+        if cut:
+            chunk, buffer = buffer[:cut], buffer[cut:]
+            yield _parse(chunk)
+        elif parser != "auto" and not _CUT_PATTERNS[parser].search(buffer):
+            # No record has started yet: drop all but a tail that may hold a split id.
+            # Auto mode keeps everything until a parser is chosen.
+            buffer = buffer[-64:]
+    if buffer.strip():
+        yield _parse(buffer, final=True)
+
+
+def iter_records(stream: IO[bytes], kind: str = "text", parser: str = "auto",
+                 chunk_chars: int = STREAM_CHUNK_CHARS) -> Iterator[Dict]:
+    """Parsed records one at a time (RECORD_COLUMNS dicts)."""
+    for progress in iter_parsed_chunks(stream, kind, parser, chunk_chars):
+        yield from progress.frame.to_dict("records")
+
+
+def parse_upload(stream: IO[bytes], kind: str = "text", parser: str = "auto",
+                 chunk_chars: int = STREAM_CHUNK_CHARS, total_bytes: Optional[int] = None,
+                 on_progress: Optional[Callable[[ParseProgress], None]] = None) -> pd.DataFrame:
+    """Whole upload as one DataFrame, built from the streamed chunks."""
+    frames = []
+    for progress in iter_parsed_chunks(stream, kind, parser, chunk_chars, total_bytes):
+        if not progress.frame.empty:
+            frames.append(progress.frame)
+        if on_progress is not None:
+            on_progress(progress)
+    if not frames:
+        return pd.DataFrame(columns=RECORD_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
 
 
 def df_to_excel_bytes(df: pd.DataFrame) -> bytes:
@@ -289,7 +459,7 @@ from app_modules.ui_components import (
 
 
 def _reset_parser_state():
-    clear_state_keys(["standard_parsed_df", "fuzzy_parsed_df"])
+    clear_state_keys(["standard_parsed_df", "fuzzy_parsed_df", "upload_parsed_df"])
 
 
 def render_fuzzy_parser_tab():
@@ -314,7 +484,7 @@ Unpaid
 View
 POD"""
 
-    tab1, tab2 = st.tabs(["Standard Parser", "Fuzzy Parser"])
+    tab1, tab2, tab3 = st.tabs(["Standard Parser", "Fuzzy Parser", "Upload File"])
 
     with tab1:
         raw_text = st.text_area(
@@ -392,3 +562,54 @@ POD"""
                 use_container_width=True,
                 type="primary",
             )
+
+    with tab3:
+        upload = st.file_uploader(
+            "Upload a consignment list dump (text, HTML or CSV)",
+            type=["txt", "html", "htm", "csv"],
+            key="parser_upload_file",
+        )
+        parser_choice = st.radio(
+            "Parser", ["Auto", "Standard", "Fuzzy"], horizontal=True, key="parser_upload_mode"
+        )
+        upload_clicked, _ = render_action_bar("Parse uploaded file", "upload_parse_btn")
+
+        if upload_clicked:
+            if upload is None:
+                st.warning("Upload a file before parsing.")
+            else:
+                progress_bar = st.progress(0.0)
+                status_text = st.empty()
+
+                def _report(p: ParseProgress):
+                    if p.total_bytes:
+                        progress_bar.progress(min(p.bytes_read / p.total_bytes, 1.0))
+                    status_text.text(f"Parsed {p.records:,} records · {p.records_per_sec:,.0f} records/s")
+
+                try:
+                    upload.seek(0)
+                    parsed_df = parse_upload(
+                        upload, kind=upload_kind(upload.name), parser=parser_choice.lower(),
+                        total_bytes=upload.size, on_progress=_report,
+                    )
+                except Exception as e:
+                    parsed_df = pd.DataFrame()
+                    st.error(f"Could not parse the uploaded file: {e}")
+
+                progress_bar.progress(1.0)
+                if parsed_df.empty:
+                    st.error("No records were found in the uploaded file.")
+                else:
+                    st.session_state.upload_parsed_df = parsed_df
+                    st.success(f"Parsed {len(parsed_df):,} records from {upload.name}.")
+
+        if st.session_state.get("upload_parsed_df") is not None:
+            st.dataframe(st.session_state.upload_parsed_df, use_container_width=True)
+            st.download_button(
+                "Download parsed upload",
+                df_to_excel_bytes(st.session_state.upload_parsed_df),
+                f"uploaded_deliveries_{datetime.now().strftime('%d-%m-%Y')}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                use_container_width=True,
+                type="primary",
+            )
@@ -0,0 +1,246 @@
+"""
+Background Live Sync
+====================
+Server-wide sync threads for the Live Dashboard. Each worker polls its
+source on a schedule and publishes an immutable Snapshot; UI sessions only
+read the latest snapshot, so page renders never wait on the network and N
+viewers cost one fetch per interval.
+
+- WooCommerce: the worker drives the order store's StoreDeltaSync; sessions
+  query the local store for their window (cached per snapshot version).
+  With WC_WEBHOOK_SECRET set, a webhook receiver pushes order changes into
+  the store and polling drops to a slow reconciliation interval.
+- Google Sheet: the worker downloads the sheet and publishes the frame.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+import streamlit as st
+
+from app_modules.error_handler import log_error
+
+LIVE_SYNC_INTERVAL = 30  # seconds between background syncs
+WEBHOOK_RECONCILE_INTERVAL = 600  # polling interval while webhooks push changes
+FIRST_SNAPSHOT_TIMEOUT = 120  # seconds a render waits when no snapshot exists yet
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One published sync result."""
+    version: int
+    payload: Any
+    published_at: datetime
+    duration: float
+
+
+class SyncWorker:
+    """
+    Daemon thread running `job()` every `interval` seconds and publishing
+    its return value as the latest Snapshot. A failing job keeps the
+    previous snapshot and records `last_error`.
+    """
+
+    def __init__(self, name: str, job: Callable[[], Any], interval: float = LIVE_SYNC_INTERVAL):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.last_error: Optional[Exception] = None
+        self.last_run_at: Optional[datetime] = None
+        self.runs = 0
+        self.running = False
+        self._snapshot: Optional[Snapshot] = None
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "SyncWorker":
+        if not self.alive:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=f"live-sync-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def trigger(self):
+        """Run the job now instead of waiting for the next tick."""
+        self._wake.set()
+
+    def latest(self) -> Optional[Snapshot]:
+        return self._snapshot
+
+    def wait_for(self, runs: int = 0, timeout: Optional[float] = None) -> Optional[Snapshot]:
+        """Block until more than `runs` job runs have finished (or timeout); return the latest snapshot."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.runs > runs, timeout=timeout)
+            return self._snapshot
+
+    def publish(self, payload: Any, duration: float = 0.0) -> Snapshot:
+        """Publish a new snapshot version (also used for pushed updates)."""
+        with self._cond:
+            version = (self._snapshot.version if self._snapshot else 0) + 1
+            self._snapshot = Snapshot(version, payload, datetime.now(), duration)
+            self._cond.notify_all()
+            return self._snapshot
+
+    def _run_once(self):
+        with self._cond:
+            self.running = True
+        started = time.perf_counter()
+        try:
+            payload = self.job()
+            error = None
+        except Exception as e:
+            payload, error = None, e
+            log_error(e, context=f"Live sync ({self.name})")
+        with self._cond:
+            self.runs += 1
+            self.running = False
+            self.last_run_at = datetime.now()
+            self.last_error = error
+            if error is None:
+                self.publish(payload, time.perf_counter() - started)
+            self._cond.notify_all()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            self._run_once()
+            self._wake.wait(self.interval)
+
+
+_WORKERS: Dict[str, SyncWorker] = {}
+_WORKERS_LOCK = threading.Lock()
+
+
+def get_sync_worker(name: str, job_factory: Callable[[], Callable[[], Any]],
+                    interval: float = LIVE_SYNC_INTERVAL) -> SyncWorker:
+    """The running worker registered under `name`, started once per server process."""
+    with _WORKERS_LOCK:
+        worker = _WORKERS.get(name)
+        if worker is None:
+            worker = _WORKERS[name] = SyncWorker(name, job_factory(), interval)
+        return worker.start()
+
+
+def read_snapshot(worker: SyncWorker, timeout: float = FIRST_SNAPSHOT_TIMEOUT) -> Snapshot:
+    """Latest snapshot; only the very first render waits for the initial sync."""
+    snapshot = worker.latest() or worker.wait_for(timeout=timeout)
+    if snapshot is None:
+        if worker.last_error is not None:
+            raise worker.last_error
+        raise TimeoutError(f"No data from the {worker.name} sync yet.")
+    return snapshot
+
+
+def refresh_now(worker: SyncWorker, timeout: float = FIRST_SNAPSHOT_TIMEOUT) -> Optional[Snapshot]:
+    """Trigger an immediate sync and wait for its snapshot (Force Refresh)."""
+    with worker._cond:
+        # A run already in flight may predate the request; wait for the next one
+        runs = worker.runs + (1 if worker.running else 0)
+        worker.trigger()
+    return worker.wait_for(runs=runs, timeout=timeout)
+
+
+# ── WooCommerce ──────────────────────────────────────────────────────────
+class WCStoreSyncJob:
+    """Worker job: backfill requested coverage, then delta-sync the order store."""
+
+    def __init__(self, sync):
+        self.sync = sync
+        self.want_after: Optional[str] = None
+
+    def request_coverage(self, after: Optional[str]):
+        if after and (self.want_after is None or after < self.want_after):
+            self.want_after = after
+
+    def __call__(self) -> Dict[str, Any]:
+        self.sync.ensure_coverage(self.want_after)
+        stats = self.sync.refresh(max_age=0) or {}
+        return {"stats": stats, "coverage_start": self.sync.after, "synced_at": self.sync.synced_at}
+
+
+def get_wc_sync_worker(store_url: str, consumer_key: str, consumer_secret: str,
+                       api_version: str = "wc/v3", interval: float = LIVE_SYNC_INTERVAL) -> SyncWorker:
+    """Background worker keeping get_order_store(store_url) in sync."""
+    from app_modules.sales_dashboard import get_setting
+    from app_modules.wc_order_store import get_store_sync
+
+    name = f"wc:{store_url}:{api_version}"
+    secret = get_setting("WC_WEBHOOK_SECRET")
+    if secret and name not in _WORKERS:
+        interval = max(interval, WEBHOOK_RECONCILE_INTERVAL)
+
+    def _factory():
+        return WCStoreSyncJob(get_store_sync(store_url, consumer_key, consumer_secret, api_version))
+
+    worker = get_sync_worker(name, _factory, interval)
+    if secret:
+        start_wc_webhooks(worker, store_url, secret, int(get_setting("WC_WEBHOOK_PORT", 8765)))
+    return worker
+
+
+def start_wc_webhooks(worker: SyncWorker, store_url: str, secret: str, port: int):
+    """Attach the webhook receiver; each pushed change publishes a new snapshot version."""
+    from app_modules.wc_webhook import get_webhook_receiver
+
+    job: WCStoreSyncJob = worker.job
+
+    def _on_change(topic: str, order_id: str):
+        current = worker.latest()
+        if current is not None:
+            worker.publish(dict(current.payload, synced_at=datetime.now(), pushed=order_id))
+
+    return get_webhook_receiver(store_url, job.sync.store, secret, port=port, on_change=_on_change)
+
+
+@st.cache_data(ttl=600, max_entries=32, show_spinner=False)
+def _query_store(store_url: str, version: int, after: Optional[str], before: Optional[str], status: str) -> pd.DataFrame:
+    from app_modules.wc_order_store import get_order_store
+
+    statuses = [s.strip() for s in str(status or "any").split(",")]
+    return get_order_store(store_url).query_dashboard_df(start=after, end=before, statuses=statuses)
+
+
+def load_wc_snapshot(
+    store_url: str,
+    consumer_key: str,
+    consumer_secret: str,
+    api_version: str = "wc/v3",
+    status: str = "completed",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+) -> tuple:
+    """
+    Same result as load_from_order_store, served from the background
+    worker's latest snapshot without touching the API.
+
+    Returns:
+        tuple: (df, source_name, modified_at)
+    """
+    worker = get_wc_sync_worker(store_url, consumer_key, consumer_secret, api_version)
+    job: WCStoreSyncJob = worker.job
+    snapshot = read_snapshot(worker)
+    if after and after < snapshot.payload["coverage_start"]:
+        # Older than the store holds: backfill in the worker and wait for it
+        job.request_coverage(after)
+        snapshot = refresh_now(worker) or snapshot
+
+    df = _query_store(store_url, snapshot.version, after, before, status)
+    source_name = f"wc_{store_url.replace('https://', '').replace('http://', '')}"
+    modified_at = (snapshot.payload["synced_at"] or snapshot.published_at).strftime("%Y-%m-%d %H:%M:%S")
+    return df, source_name, modified_at
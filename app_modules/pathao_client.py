@@ -0,0 +1,513 @@
+"""
+Pathao Merchant API Client
+==========================
+Async access to Pathao's order search (`/aladdin/api/v1/orders?search=`)
+for bulk delivery-history checks.
+
+- A token bucket keeps the request rate under Pathao's limits, and a
+  fixed pool of workers bounds the number of requests in flight.
+- 429/5xx, timeouts and connection errors are retried with backoff
+  (Retry-After honoured).
+- iter_bulk_check() runs on the shared background HTTP loop and yields
+  result rows as they complete, so the UI can stream them into a table.
+- PathaoTokenManager caches the OAuth access token across reruns and
+  sessions, refreshes it before expiry and renews once on a 401.
+- With a delivery history (app_modules.pathao_history), bulk checks answer
+  fresh phones locally and record every API result.
+- iter_order_sync() matches WooCommerce orders to Pathao consignments the
+  same way: order-id searches run concurrently, the phone fallback search
+  is shared by every order with that phone, and resolved orders are cached.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import aiohttp
+import requests
+import streamlit as st
+
+from app_modules.wc_fetcher import RETRY_STATUSES, _retry_after_seconds, backoff_delay
+from app_modules.wc_http import get_http_client
+
+PATHAO_BASE_URL = "https://api-hermes.pathao.com"
+ORDERS_PATH = "/aladdin/api/v1/orders"
+TOKEN_PATH = "/aladdin/api/v1/issue-token"
+TOKEN_REFRESH_MARGIN = 300  # seconds before expiry at which the token is renewed
+
+RETURN_STATUSES = ("cancelled", "returned", "return")
+# Orders in these states are not looked up again by the WC Order Sync
+FINAL_STATUSES = ("delivered", "partial_delivery") + RETURN_STATUSES
+
+
+@dataclass
+class PathaoCheckConfig:
+    """Rate, concurrency and retry settings for bulk checks."""
+    rate: float = 5.0  # sustained requests per second
+    burst: int = 10
+    concurrency: int = 8
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 20.0
+    timeout: float = 15.0
+    retry_statuses: Tuple[int, ...] = RETRY_STATUSES
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, seconds: float):
+        """Drain the bucket so nobody sends for ~seconds (after a 429)."""
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class PathaoAuthError(Exception):
+    """Authentication failed or the access token was rejected (401/403)."""
+
+
+def auth_headers(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept": "application/json"}
+
+
+class PathaoTokenManager:
+    """
+    Thread-safe cache of one merchant's Pathao access token.
+
+    get_token() reuses the cached token until `refresh_margin` seconds
+    before it expires, then renews it (refresh_token grant first, password
+    grant as fallback). renew(stale) is for 401s: it only re-authenticates
+    if nobody has replaced the stale token yet, so concurrent failures
+    cost one round trip.
+    """
+
+    def __init__(self, client_id: str, client_secret: str, username: str, password: str,
+                 base_url: str = PATHAO_BASE_URL, refresh_margin: float = TOKEN_REFRESH_MARGIN,
+                 timeout: float = 10):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.username = username
+        self.password = password
+        self.base_url = base_url
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.expires_at = 0.0
+        self.issued = 0
+        self._lock = threading.Lock()
+
+    @property
+    def valid(self) -> bool:
+        return bool(self.access_token) and time.time() < self.expires_at - self.refresh_margin
+
+    def _issue(self, payload: Dict[str, str]) -> requests.Response:
+        return requests.post(f"{self.base_url}{TOKEN_PATH}", json=payload, timeout=self.timeout)
+
+    def _authenticate(self):
+        resp = None
+        if self.refresh_token:
+            resp = self._issue({
+                "client_id": self.client_id, "client_secret": self.client_secret,
+                "refresh_token": self.refresh_token, "grant_type": "refresh_token",
+            })
+        if resp is None or resp.status_code != 200:
+            resp = self._issue({
+                "client_id": self.client_id, "client_secret": self.client_secret,
+                "username": self.username, "password": self.password, "grant_type": "password",
+            })
+        if resp.status_code != 200:
+            try:
+                details = resp.json().get("error_description", "Please check your credentials.")
+            except Exception:
+                details = "Please check your credentials."
+            raise PathaoAuthError(f"Failed to authenticate (Status {resp.status_code}). {details}")
+        body = resp.json()
+        self.access_token = body.get("access_token")
+        self.refresh_token = body.get("refresh_token") or self.refresh_token
+        self.expires_at = time.time() + float(body.get("expires_in") or 3600)
+        self.issued += 1
+
+    def get_token(self) -> str:
+        with self._lock:
+            if not self.valid:
+                self._authenticate()
+            return self.access_token
+
+    def renew(self, stale_token: Optional[str] = None) -> str:
+        """New token after `stale_token` was rejected (no-op if already replaced)."""
+        with self._lock:
+            if stale_token is None or self.access_token == stale_token:
+                self.access_token = None
+                self._authenticate()
+            return self.access_token
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET with the cached bearer token, renewing and retrying once on 401."""
+        token = self.get_token()
+        resp = requests.get(url, headers=auth_headers(token), **kwargs)
+        if resp.status_code == 401:
+            resp = requests.get(url, headers=auth_headers(self.renew(token)), **kwargs)
+        return resp
+
+
+@st.cache_resource(show_spinner=False)
+def get_pathao_token_manager(client_id: str, client_secret: str, username: str, password: str,
+                             base_url: str = PATHAO_BASE_URL) -> PathaoTokenManager:
+    """Process-wide token manager for one set of Pathao credentials."""
+    return PathaoTokenManager(client_id, client_secret, username, password, base_url=base_url)
+
+
+TokenSource = Union[str, PathaoTokenManager]
+
+
+async def _token_of(source: TokenSource) -> str:
+    if isinstance(source, PathaoTokenManager):
+        if source.valid:
+            return source.access_token
+        return await asyncio.get_running_loop().run_in_executor(None, source.get_token)
+    return source
+
+
+async def search_orders(
+    session: aiohttp.ClientSession,
+    query: str,
+    token: TokenSource,
+    config: Optional[PathaoCheckConfig] = None,
+    bucket: Optional[TokenBucket] = None,
+    base_url: str = PATHAO_BASE_URL,
+) -> List[Dict]:
+    """
+    Orders matching `query` (phone, order id or consignment id). With a
+    PathaoTokenManager as `token`, a 401 renews the token and retries once.
+    """
+    config = config or PathaoCheckConfig()
+    attempt = 0
+    renewed = False
+    while True:
+        attempt += 1
+        retry_after = None
+        if bucket is not None:
+            await bucket.acquire()
+        access_token = await _token_of(token)
+        try:
+            async with session.get(
+                f"{base_url}{ORDERS_PATH}", params={"search": query}, headers=auth_headers(access_token),
+                timeout=aiohttp.ClientTimeout(total=config.timeout),
+            ) as response:
+                if response.status == 401 and isinstance(token, PathaoTokenManager) and not renewed:
+                    renewed = True
+                    await asyncio.get_running_loop().run_in_executor(None, token.renew, access_token)
+                    continue
+                if response.status in (401, 403):
+                    raise PathaoAuthError(f"Pathao rejected the access token ({response.status})")
+                if response.status in config.retry_statuses and attempt <= config.max_retries:
+                    retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+                    if response.status == 429 and bucket is not None:
+                        bucket.penalize(retry_after or config.backoff_base)
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history, status=response.status,
+                        message=response.reason or "", headers=response.headers,
+                    )
+                response.raise_for_status()
+                body = await response.json(content_type=None)
+                return ((body or {}).get("data") or {}).get("data") or []
+        except aiohttp.ClientResponseError as e:
+            if e.status not in config.retry_statuses or attempt > config.max_retries:
+                raise
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError):
+            if attempt > config.max_retries:
+                raise
+        await asyncio.sleep(backoff_delay(attempt - 1, config, retry_after))
+
+
+def summarize_phone(phone: str, orders: List[Dict]) -> Dict[str, Any]:
+    """Bulk-check result row for one phone."""
+    statuses = [str(o.get("order_status", "")).lower() for o in orders]
+    total = len(statuses)
+    delivered = statuses.count("delivered")
+    returned = sum(1 for s in statuses if s in RETURN_STATUSES)
+    return {
+        "Phone": phone,
+        "Total Orders": total,
+        "Delivered": delivered,
+        "Returned/Cancelled": returned,
+        "Success Rate (%)": round(delivered / total * 100, 2) if total else 0,
+    }
+
+
+async def check_phones(
+    session: aiohttp.ClientSession,
+    phones: Sequence[str],
+    token: TokenSource,
+    on_result: Callable[[str, Optional[Dict], Optional[Exception]], None],
+    config: Optional[PathaoCheckConfig] = None,
+    base_url: str = PATHAO_BASE_URL,
+    history=None,
+):
+    """
+    Search every phone with bounded concurrency under the rate limit and
+    call on_result(phone, row, error) as each completes. An auth failure
+    aborts the whole run. Results are written to `history` when given.
+    """
+    config = config or PathaoCheckConfig()
+    bucket = TokenBucket(config.rate, config.burst)
+    loop = asyncio.get_running_loop()
+
+    async def _one(phone: str):
+        try:
+            orders = await search_orders(session, phone, token, config, bucket, base_url)
+        except PathaoAuthError:
+            raise
+        except Exception as e:
+            on_result(phone, None, e)
+            return
+        if history is not None:
+            await loop.run_in_executor(None, history.record_phone, phone, orders, "api")
+        on_result(phone, summarize_phone(phone, orders), None)
+
+    await _run_pool(phones, _one, config.concurrency)
+
+
+async def _run_pool(items: Sequence, handler: Callable, concurrency: int):
+    """
+    `concurrency` workers pull from one shared iterator, which bounds the
+    requests in flight without creating a task per item up front.
+    """
+    pending = iter(items)
+
+    async def _worker():
+        for item in pending:
+            await handler(item)
+
+    workers = [asyncio.ensure_future(_worker()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+
+
+def exact_order_match(order_id: str, orders: List[Dict]) -> Optional[Dict]:
+    """The search hit whose merchant_order_id contains order_id, if any."""
+    return next((o for o in orders or [] if order_id in str(o.get("merchant_order_id", ""))), None)
+
+
+def match_order(order_id: str, orders: List[Dict]) -> Optional[Dict]:
+    """The search hit whose merchant_order_id contains order_id, else the first hit."""
+    if not orders:
+        return None
+    return exact_order_match(order_id, orders) or orders[0]
+
+
+def order_sync_row(order_id: str, match: Optional[Dict]) -> Dict[str, str]:
+    """WC Order Sync result row for one order."""
+    if not match:
+        return {"Order ID": order_id, "Pathao Status": "Not Found", "Consignment ID": "N/A"}
+    return {
+        "Order ID": order_id,
+        "Pathao Status": str(match.get("order_status", "Unknown")).title(),
+        "Consignment ID": str(match.get("consignment_id", "N/A")),
+    }
+
+
+def _unique_orders(orders: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """(order id, phone) pairs with duplicate order ids dropped (first phone kept)."""
+    unique: Dict[str, Tuple[str, str]] = {}
+    for order_id, phone in orders:
+        unique.setdefault(str(order_id), (str(order_id), phone or ""))
+    return list(unique.values())
+
+
+async def sync_orders(
+    session: aiohttp.ClientSession,
+    orders: Sequence[Tuple[str, str]],
+    token: TokenSource,
+    on_result: Callable[[str, Optional[Dict], Optional[Exception]], None],
+    config: Optional[PathaoCheckConfig] = None,
+    base_url: str = PATHAO_BASE_URL,
+    history=None,
+):
+    """
+    Look up (order id, phone) pairs: search by order id, falling back to
+    the phone when nothing matches. Each phone is searched at most once
+    and the result is shared by every order with that phone. Only hits
+    whose merchant_order_id names the order are recorded in `history`.
+    Calls on_result(order_id, order_sync_row, error) as each order resolves.
+    """
+    config = config or PathaoCheckConfig()
+    bucket = TokenBucket(config.rate, config.burst)
+    loop = asyncio.get_running_loop()
+    phone_searches: Dict[str, asyncio.Future] = {}
+
+    def _phone_search(phone: str) -> asyncio.Future:
+        task = phone_searches.get(phone)
+        if task is None:
+            task = phone_searches[phone] = asyncio.ensure_future(
+                search_orders(session, phone, token, config, bucket, base_url)
+            )
+        return task
+
+    async def _one(order: Tuple[str, str]):
+        order_id, phone = order
+        try:
+            data = await search_orders(session, order_id, token, config, bucket, base_url)
+            if not data and phone:
+                data = await _phone_search(phone)
+        except PathaoAuthError:
+            raise
+        except Exception as e:
+            on_result(order_id, None, e)
+            return
+        exact = exact_order_match(order_id, data)
+        if history is not None:
+            # A phone-fallback hit may be another consignment for the same
+            # customer: show it, but keep the order unresolved so it is re-queried.
+            await loop.run_in_executor(None, history.record_order_match, order_id, phone, exact)
+        on_result(order_id, order_sync_row(order_id, match_order(order_id, data)), None)
+
+    try:
+        await _run_pool(_unique_orders(orders), _one, config.concurrency)
+    finally:
+        for task in phone_searches.values():
+            task.cancel()
+
+
+@dataclass
+class BulkCheckProgress:
+    """Batch yielded by iter_bulk_check."""
+    rows: List[Dict]
+    failed: List[Tuple[str, str]]
+    done: int
+    total: int
+    elapsed: float
+    cached: int = 0  # phones answered from the delivery history
+
+
+def iter_bulk_check(
+    phones: Sequence[str],
+    token: TokenSource,
+    config: Optional[PathaoCheckConfig] = None,
+    base_url: str = PATHAO_BASE_URL,
+    poll_interval: float = 0.5,
+    history=None,
+    max_age: Optional[float] = None,
+) -> Iterator[BulkCheckProgress]:
+    """
+    Run check_phones on the shared HTTP loop and yield the rows completed
+    since the previous batch (every `poll_interval` seconds). Raises
+    PathaoAuthError or any fatal error once the queue is drained.
+
+    With a `history` store, phones checked within `max_age` seconds (the
+    store's TTL by default) come back in the first batch without an API call.
+    """
+    started = time.perf_counter()
+    cached = 0
+    if history is not None:
+        cached_rows = history.summaries(phones, only_fresh=True, max_age=max_age)
+        cached = len(cached_rows)
+        phones = history.stale_phones(phones, max_age)
+        if cached_rows:
+            yield BulkCheckProgress(cached_rows, [], cached, cached + len(phones), time.perf_counter() - started, cached)
+        if not phones:
+            return
+
+    yield from _stream(
+        lambda session, on_result: check_phones(
+            session, phones, token, on_result, config=config, base_url=base_url, history=history
+        ),
+        cached + len(phones), started, poll_interval, done=cached,
+    )
+
+
+def iter_order_sync(
+    orders: Iterable[Tuple[str, str]],
+    token: TokenSource,
+    config: Optional[PathaoCheckConfig] = None,
+    base_url: str = PATHAO_BASE_URL,
+    poll_interval: float = 0.5,
+    history=None,
+) -> Iterator[BulkCheckProgress]:
+    """
+    iter_bulk_check for (order id, phone) pairs, yielding order_sync_row
+    rows. With a `history` store, orders already matched to a consignment
+    in a FINAL_STATUSES state come back in the first batch; only new or
+    unresolved orders are searched.
+    """
+    started = time.perf_counter()
+    orders = _unique_orders(orders)
+    cached = 0
+    if history is not None:
+        resolved = history.resolved_orders([order_id for order_id, _ in orders], FINAL_STATUSES)
+        cached = len(resolved)
+        orders = [o for o in orders if o[0] not in resolved]
+        if resolved:
+            rows = [order_sync_row(order_id, match) for order_id, match in resolved.items()]
+            yield BulkCheckProgress(rows, [], cached, cached + len(orders), time.perf_counter() - started, cached)
+        if not orders:
+            return
+
+    yield from _stream(
+        lambda session, on_result: sync_orders(
+            session, orders, token, on_result, config=config, base_url=base_url, history=history
+        ),
+        cached + len(orders), started, poll_interval, done=cached,
+    )
+
+
+def _stream(run: Callable, total: int, started: float, poll_interval: float,
+            done: int = 0) -> Iterator[BulkCheckProgress]:
+    """Submit run(session, on_result) to the shared HTTP loop and drain its results."""
+    results: "queue.Queue[Tuple[str, Optional[Dict], Optional[Exception]]]" = queue.Queue()
+    future = get_http_client().submit(lambda session: run(session, lambda *r: results.put(r)))
+    try:
+        yield from _drain(results, future, total, started, poll_interval, done=done)
+    finally:
+        if not future.done():
+            future.cancel()
+
+
+def _drain(results: queue.Queue, future, total: int, started: float, poll_interval: float,
+           done: int = 0) -> Iterator[BulkCheckProgress]:
+    cached = done
+    while True:
+        finished = future.done()
+        rows, failed = [], []
+        while True:
+            try:
+                phone, row, error = results.get_nowait()
+            except queue.Empty:
+                break
+            done += 1
+            if row is not None:
+                rows.append(row)
+            else:
+                failed.append((phone, str(error) or type(error).__name__))
+        if rows or failed or finished:
+            yield BulkCheckProgress(rows, failed, done, total, time.perf_counter() - started, cached)
+        if finished:
+            future.result()
+            return
+        time.sleep(poll_interval)
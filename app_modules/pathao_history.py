@@ -0,0 +1,372 @@
+"""
+Pathao Delivery History
+=======================
+Local SQLite store of phone -> Pathao deliveries (status, consignment and
+merchant order id), so repeat customers' success rates are answered
+without calling the API.
+
+Filled from:
+- uploaded Pathao exports ("Check from File"),
+- bulk / single API checks (a phone's full search result),
+- WC Order Sync matches (individual orders only).
+
+A phone is *fresh* while its last full check (API search or export) is
+younger than the TTL; bulk checks only query Pathao for stale or missing
+phones. WC Order Sync results are also kept per merchant order id, so
+orders that reached a final status are not looked up again.
+
+load_export_index() parses an uploaded export once per file content and
+builds a sorted PhoneIndex for exact/prefix phone lookups.
+"""
+
+import bisect
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from app_modules.pathao_client import RETURN_STATUSES
+from app_modules.persistence import DATA_DIR
+from app_modules.wc_order_store import _phone_key
+
+HISTORY_TTL = 24 * 3600  # seconds a phone's checked history is trusted
+
+PHONE_KEYWORDS = ["phone", "mobile", "contact", "recipient_phone"]
+STATUS_KEYWORDS = ["status", "state", "order_status"]
+CONSIGNMENT_KEYWORDS = ["consignment"]
+ORDER_ID_KEYWORDS = ["merchant_order_id", "merchant order", "order id", "order_id", "invoice"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    delivery_key TEXT PRIMARY KEY,
+    phone_key TEXT NOT NULL,
+    consignment_id TEXT,
+    merchant_order_id TEXT,
+    status TEXT,
+    source TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_phone ON deliveries(phone_key);
+
+CREATE TABLE IF NOT EXISTS phones (
+    phone_key TEXT PRIMARY KEY,
+    checked_at REAL,
+    source TEXT
+);
+
+CREATE TABLE IF NOT EXISTS order_matches (
+    order_id TEXT PRIMARY KEY,
+    phone_key TEXT,
+    consignment_id TEXT,
+    status TEXT,
+    synced_at REAL
+);
+"""
+
+
+def find_column(columns: Iterable[str], keywords: Sequence[str]) -> Optional[str]:
+    """First column whose lowercase name contains one of `keywords`."""
+    return next((c for c in columns if any(k in str(c).lower() for k in keywords)), None)
+
+
+def _delivery_key(phone_key: str, consignment_id, merchant_order_id, status, seq: int = 0) -> str:
+    """Consignment id, else merchant order id, else the n-th (phone, status) row."""
+    if consignment_id:
+        return f"c:{consignment_id}"
+    if merchant_order_id:
+        return f"o:{merchant_order_id}"
+    digest = hashlib.sha1(f"{phone_key}|{status}|{seq}".encode("utf-8")).hexdigest()[:16]
+    return f"h:{digest}"
+
+
+def _clean(value) -> str:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return str(value).strip()
+
+
+class DeliveryHistoryStore:
+    """SQLite-backed phone -> deliveries cache. Safe to share across sessions."""
+
+    def __init__(self, path: str = ":memory:", ttl: float = HISTORY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    # ── Writes ───────────────────────────────────────────────────────────
+    def _rows(self, deliveries: Iterable[Dict], source: str, now: float) -> List[tuple]:
+        rows = []
+        seen: Dict[tuple, int] = {}
+        for d in deliveries:
+            key = _phone_key(d.get("phone") or d.get("recipient_phone"))
+            if not key:
+                continue
+            consignment = _clean(d.get("consignment_id"))
+            order_id = _clean(d.get("merchant_order_id"))
+            status = _clean(d.get("order_status") or d.get("status")).lower()
+            seq = seen[(key, status)] = seen.get((key, status), -1) + 1
+            rows.append((_delivery_key(key, consignment, order_id, status, seq), key, consignment, order_id, status, source, now))
+        return rows
+
+    def record_deliveries(self, deliveries: Iterable[Dict], source: str = "wc_sync") -> int:
+        """
+        Upsert individual deliveries (dicts with phone/recipient_phone,
+        consignment_id, merchant_order_id, order_status). Does not mark the
+        phones as fully checked.
+        """
+        rows = self._rows(deliveries, source, time.time())
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO deliveries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def record_phone(self, phone: str, orders: List[Dict], source: str = "api") -> int:
+        """Store a phone's complete search result and mark it checked now."""
+        key = _phone_key(phone)
+        if not key:
+            return 0
+        now = time.time()
+        rows = self._rows(({**o, "phone": phone} for o in orders), source, now)
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO deliveries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO phones VALUES (?, ?, ?)", (key, now, source))
+        return len(rows)
+
+    def import_export(self, df: pd.DataFrame, phone_col: Optional[str] = None,
+                      status_col: Optional[str] = None, source: str = "export") -> int:
+        """
+        Load a Pathao orders export. Every phone in the file is marked
+        checked, since the export holds the merchant's full history.
+        """
+        phone_col = phone_col or find_column(df.columns, PHONE_KEYWORDS)
+        if phone_col is None:
+            return 0
+        status_col = status_col or find_column(df.columns, STATUS_KEYWORDS)
+        cons_col = find_column(df.columns, CONSIGNMENT_KEYWORDS)
+        order_col = find_column(df.columns, ORDER_ID_KEYWORDS)
+
+        def _col(name):
+            return df[name].tolist() if name else [None] * len(df)
+
+        deliveries = [
+            {"phone": p, "order_status": s, "consignment_id": c, "merchant_order_id": o}
+            for p, s, c, o in zip(df[phone_col].tolist(), _col(status_col), _col(cons_col), _col(order_col))
+        ]
+        now = time.time()
+        rows = self._rows(deliveries, source, now)
+        phones = {(row[1], now, source) for row in rows}
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO deliveries VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.executemany("INSERT OR REPLACE INTO phones VALUES (?, ?, ?)", list(phones))
+        return len(rows)
+
+    def record_order_match(self, order_id: str, phone: str, match: Optional[Dict]):
+        """WC Order Sync result for one merchant order id (match None = not found)."""
+        match = match or {}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO order_matches VALUES (?, ?, ?, ?, ?)",
+                (str(order_id), _phone_key(phone), _clean(match.get("consignment_id")),
+                 _clean(match.get("order_status")).lower(), time.time()),
+            )
+        if match:
+            self.record_deliveries([{**match, "phone": match.get("recipient_phone") or phone}])
+
+    # ── Reads ────────────────────────────────────────────────────────────
+    def resolved_orders(self, order_ids: Sequence[str], statuses: Sequence[str]) -> Dict[str, Dict]:
+        """Stored matches (order_status, consignment_id) for orders whose status is in `statuses`."""
+        ids = [str(i) for i in order_ids]
+        statuses = [s.lower() for s in statuses]
+        found: Dict[str, Dict] = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                for order_id, consignment, status in self._conn.execute(
+                    f"""SELECT order_id, consignment_id, status FROM order_matches
+                        WHERE status IN ({','.join('?' * len(statuses))})
+                        AND order_id IN ({','.join('?' * len(chunk))})""",
+                    statuses + chunk,
+                ):
+                    found[order_id] = {"order_status": status, "consignment_id": consignment}
+        return found
+
+    def _keys(self, phones: Iterable[str]) -> Dict[str, str]:
+        """phone_key -> first given phone spelling."""
+        keys: Dict[str, str] = {}
+        for phone in phones:
+            key = _phone_key(phone)
+            if key and key not in keys:
+                keys[key] = phone
+        return keys
+
+    def fresh_keys(self, phones: Iterable[str], max_age: Optional[float] = None) -> set:
+        keys = list(self._keys(phones))
+        if not keys:
+            return set()
+        cutoff = time.time() - (self.ttl if max_age is None else max_age)
+        fresh = set()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                fresh.update(r[0] for r in self._conn.execute(
+                    f"SELECT phone_key FROM phones WHERE checked_at >= ? AND phone_key IN ({','.join('?' * len(chunk))})",
+                    [cutoff] + chunk,
+                ))
+        return fresh
+
+    def stale_phones(self, phones: Sequence[str], max_age: Optional[float] = None) -> List[str]:
+        """Phones (in input order) that have no check younger than max_age."""
+        fresh = self.fresh_keys(phones, max_age)
+        return [p for p in phones if _phone_key(p) not in fresh]
+
+    def summaries(self, phones: Iterable[str], only_fresh: bool = False,
+                  max_age: Optional[float] = None) -> List[Dict]:
+        """
+        summarize_phone-style rows from the stored deliveries for every
+        known phone: one with deliveries, or checked and found to have none.
+        With only_fresh, phones whose check is older than max_age are left out.
+        """
+        keys = self._keys(phones)
+        known = self.fresh_keys(keys.values(), max_age if only_fresh else float("inf"))
+        if only_fresh:
+            keys = {k: v for k, v in keys.items() if k in known}
+        if not keys:
+            return []
+        returns = ",".join(f"'{s}'" for s in RETURN_STATUSES)
+        counts = {}
+        key_list = list(keys)
+        with self._lock:
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                for key, total, delivered, returned in self._conn.execute(
+                    f"""SELECT phone_key, COUNT(*), SUM(status = 'delivered'), SUM(status IN ({returns}))
+                        FROM deliveries WHERE phone_key IN ({','.join('?' * len(chunk))})
+                        GROUP BY phone_key""",
+                    chunk,
+                ):
+                    counts[key] = (total, delivered or 0, returned or 0)
+        rows = []
+        for key, phone in keys.items():
+            if key not in counts and key not in known:
+                continue
+            total, delivered, returned = counts.get(key, (0, 0, 0))
+            rows.append({
+                "Phone": phone,
+                "Total Orders": total,
+                "Delivered": delivered,
+                "Returned/Cancelled": returned,
+                "Success Rate (%)": round(delivered / total * 100, 2) if total else 0,
+            })
+        return rows
+
+    def summary(self, phone: str) -> Optional[Dict]:
+        rows = self.summaries([phone])
+        return rows[0] if rows else None
+
+    def deliveries(self, phone: str) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT consignment_id, merchant_order_id, status, source, updated_at FROM deliveries "
+                "WHERE phone_key = ? ORDER BY updated_at DESC",
+                self._conn, params=(_phone_key(phone),),
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT phone_key) FROM deliveries").fetchone()[0]
+
+
+@st.cache_resource(show_spinner=False)
+def get_delivery_history() -> DeliveryHistoryStore:
+    """Process-wide Pathao delivery history."""
+    return DeliveryHistoryStore(os.path.join(DATA_DIR, "pathao_history.sqlite"))
+
+
+# ── Export search index ──────────────────────────────────────────────────
+def search_key(phone) -> str:
+    """Digits of a BD number without the 880/0 prefix ("01712..." -> "1712...")."""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if digits.startswith("880"):
+        digits = digits[3:]
+    return digits.lstrip("0")
+
+
+class PhoneIndex:
+    """
+    Sorted search keys of an export's phone column. lookup() resolves an
+    exact number or a prefix with two bisections; status_counts() tallies
+    pre-factorized status codes for the matched rows.
+    """
+
+    def __init__(self, phones: Sequence, statuses: Optional[Sequence] = None):
+        keys = [search_key(p) for p in phones]
+        order = sorted((i for i, k in enumerate(keys) if k), key=keys.__getitem__)
+        self.keys: List[str] = [keys[i] for i in order]
+        self.rows = np.asarray(order, dtype=np.int64)
+        if statuses is not None:
+            codes, labels = pd.factorize(pd.Series(statuses, dtype=object))  # missing -> -1
+            self.status_codes = codes
+            self.status_labels = list(labels)
+        else:
+            self.status_codes, self.status_labels = None, []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, query) -> np.ndarray:
+        """Row positions (file order) whose number equals or starts with `query`."""
+        key = search_key(query)
+        if not key:
+            return self.rows[:0]
+        lo = bisect.bisect_left(self.keys, key)
+        hi = bisect.bisect_right(self.keys, key + "\uffff", lo)
+        return np.sort(self.rows[lo:hi])
+
+    def status_counts(self, rows: np.ndarray) -> Dict[str, int]:
+        """Status -> count for `rows`, most frequent first."""
+        if self.status_codes is None or not len(rows):
+            return {}
+        codes = self.status_codes[rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.status_labels))
+        return {self.status_labels[i]: int(counts[i]) for i in np.argsort(-counts, kind="stable") if counts[i]}
+
+
+@dataclass
+class ExportIndex:
+    """A parsed Pathao export with its detected columns and phone index."""
+    df: pd.DataFrame
+    phone_col: Optional[str]
+    status_col: Optional[str]
+    index: Optional[PhoneIndex]
+
+
+def read_export(content: bytes, name: str) -> pd.DataFrame:
+    if name.lower().endswith(".csv"):
+        return pd.read_csv(BytesIO(content), dtype=str)
+    return pd.read_excel(BytesIO(content), dtype=str)
+
+
+@st.cache_resource(show_spinner="Indexing export...", max_entries=4)
+def load_export_index(file_hash: str, name: str, _content: bytes) -> ExportIndex:
+    """Parse and index an uploaded export once per file content (keyed by `file_hash`)."""
+    df = read_export(_content, name)
+    phone_col = find_column(df.columns, PHONE_KEYWORDS)
+    status_col = find_column(df.columns, STATUS_KEYWORDS)
+    index = None
+    if phone_col:
+        index = PhoneIndex(df[phone_col].tolist(), df[status_col].tolist() if status_col else None)
+    return ExportIndex(df, phone_col, status_col, index)
+
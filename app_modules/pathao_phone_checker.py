@@ -6,11 +6,21 @@ Check customer delivery history and reliability from Pathao records.
 import streamlit as st
 import pandas as pd
 import re
-import requests
-import time
+import hashlib
 from datetime import datetime
 import os
 
+from app_modules.pathao_client import (
+    ORDERS_PATH,
+    PATHAO_BASE_URL,
+    PathaoAuthError,
+    PathaoCheckConfig,
+    get_pathao_token_manager,
+    iter_bulk_check,
+    iter_order_sync,
+)
+from app_modules.pathao_history import HISTORY_TTL, get_delivery_history, load_export_index
+
 
 def standardize_phone(phone: str) -> str:
     """Standardize phone number to BD format."""
@@ -62,46 +72,53 @@ def render_pathao_phone_checker():
         
         if uploaded_file:
             try:
-                if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(uploaded_file, dtype=str)
-                else:
-                    df = pd.read_excel(uploaded_file, dtype=str)
-                    
-                # Attempt to find phone and status columns
-                phone_col = next((c for c in df.columns if any(k in c.lower() for k in ['phone', 'mobile', 'contact', 'recipient_phone'])), None)
-                status_col = next((c for c in df.columns if any(k in c.lower() for k in ['status', 'state', 'order_status'])), None)
+                # Parsed and indexed once per file content; reruns reuse the cached index
+                content = uploaded_file.getvalue()
+                file_hash = hashlib.md5(content).hexdigest()
+                export = load_export_index(file_hash, uploaded_file.name, content)
+                df, phone_col, status_col = export.df, export.phone_col, export.status_col
                 
                 if not phone_col:
                     st.error("Could not auto-detect a Phone Number column. Please ensure your file has a 'Phone' or 'Mobile' column.")
                     st.write("Available columns:", list(df.columns))
                 else:
-                    df['_std_phone'] = df[phone_col].apply(standardize_phone)
+                    history = get_delivery_history()
+                    # Feed the delivery history once per file, not on every rerun
+                    if st.session_state.get("pathao_history_imported") != file_hash:
+                        history.import_export(df, phone_col=phone_col, status_col=status_col)
+                        st.session_state["pathao_history_imported"] = file_hash
                     st.success(f"✅ Loaded {len(df):,} records successfully.")
                     
                     st.divider()
                     
                     col1, col2 = st.columns([3, 1])
                     with col1:
-                        search_phone = st.text_input("🔍 Enter Phone Number to Search", placeholder="e.g. 01712345678")
+                        search_phone = st.text_input("🔍 Enter Phone Number to Search", placeholder="e.g. 01712345678 or a prefix like 01712")
                     
                     if search_phone:
-                        std_search = standardize_phone(search_phone)
-                        if not std_search:
-                            std_search = search_phone
-
-                        results = df[df['_std_phone'].str.contains(std_search, na=False) | df[phone_col].str.contains(search_phone, na=False)]
+                        matched_rows = export.index.lookup(search_phone)
+                        results = df.iloc[matched_rows]
+                        
+                        known = history.summary(search_phone)
+                        if known:
+                            st.markdown("##### Delivery History (all sources)")
+                            m1, m2, m3, m4 = st.columns(4)
+                            m1.metric("Total Orders", known["Total Orders"])
+                            m2.metric("Delivered", known["Delivered"])
+                            m3.metric("Returned/Cancelled", known["Returned/Cancelled"])
+                            m4.metric("Success Rate", f"{known['Success Rate (%)']}%")
                         
                         if len(results) > 0:
                             st.markdown(f"**Found {len(results)} order(s) for this number.**")
                             
                             if status_col:
                                 st.markdown("##### Delivery Status Ratio")
-                                status_counts = results[status_col].value_counts()
+                                status_counts = export.index.status_counts(matched_rows)
                                 cols = st.columns(min(len(status_counts), 4) or 1)
                                 for i, (status, count) in enumerate(status_counts.items()):
                                     cols[i % 4].metric(status, count)
                             
-                            st.dataframe(results.drop(columns=['_std_phone']), use_container_width=True, hide_index=True)
+                            st.dataframe(results, use_container_width=True, hide_index=True)
                         else:
                             st.warning("No orders found for this phone number in the uploaded dataset.")
                             
@@ -140,37 +157,27 @@ def render_pathao_phone_checker():
             if not (client_id and client_secret and username and password and api_phone):
                 st.error("Please fill in all API credentials and the phone number.")
             else:
-                with st.spinner("Authenticating and Connecting to Pathao API..."):
+                with st.spinner("Connecting to Pathao API..."):
                     try:
-                        token_resp = requests.post(
-                            "https://api-hermes.pathao.com/aladdin/api/v1/issue-token",
-                            json={"client_id": client_id, "client_secret": client_secret, "username": username, "password": password, "grant_type": "password"},
-                            timeout=10
-                        )
+                        # Cached token: only the first check (or an expired token) authenticates
+                        tokens = get_pathao_token_manager(client_id, client_secret, username, password)
+                        orders_resp = tokens.get(f"{PATHAO_BASE_URL}{ORDERS_PATH}", params={"search": api_phone}, timeout=15)
                         
-                        if token_resp.status_code == 200:
-                            token = token_resp.json().get("access_token")
-                            headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept": "application/json"}
-                            orders_resp = requests.get(f"https://api-hermes.pathao.com/aladdin/api/v1/orders?search={api_phone}", headers=headers, timeout=15)
-                            
-                            if orders_resp.status_code == 200:
-                                data = orders_resp.json().get("data", {}).get("data", [])
-                                if data:
-                                    st.success(f"✅ Found {len(data)} order(s) for this phone number.")
-                                    df_api = pd.DataFrame(data)
-                                    st.dataframe(df_api, use_container_width=True, hide_index=True)
-                                else:
-                                    st.warning("No orders found for this phone number in your Pathao account.")
-                            elif orders_resp.status_code in [401, 403]:
-                                st.error("⚠️ The Pathao access token is invalid or has expired. Please verify your API credentials and permissions.")
+                        if orders_resp.status_code == 200:
+                            data = orders_resp.json().get("data", {}).get("data", [])
+                            get_delivery_history().record_phone(api_phone, data, source="api")
+                            if data:
+                                st.success(f"✅ Found {len(data)} order(s) for this phone number.")
+                                df_api = pd.DataFrame(data)
+                                st.dataframe(df_api, use_container_width=True, hide_index=True)
                             else:
-                                st.error(f"Failed to fetch orders. Pathao API responded with status {orders_resp.status_code}")
+                                st.warning("No orders found for this phone number in your Pathao account.")
+                        elif orders_resp.status_code in [401, 403]:
+                            st.error("⚠️ The Pathao access token is invalid or has expired. Please verify your API credentials and permissions.")
                         else:
-                            try:
-                                err_details = token_resp.json().get("error_description", "Please check your credentials.")
-                            except Exception:
-                                err_details = "Please check your credentials."
-                            st.error(f"⚠️ Failed to authenticate (Status {token_resp.status_code}). {err_details}")
+                            st.error(f"Failed to fetch orders. Pathao API responded with status {orders_resp.status_code}")
+                    except PathaoAuthError as e:
+                        st.error(f"⚠️ {e}")
                     except Exception as e:
                         st.error(f"Network error occurred: {str(e)}")
 
@@ -215,70 +222,80 @@ def render_pathao_phone_checker():
                     
             if phones_to_check:
                 st.divider()
-                c1, c2 = st.columns(2)
+                c1, c2, c3 = st.columns(3)
                 with c1:
-                    max_check = st.number_input("Max numbers to check (API Limit Prevention)", min_value=1, max_value=len(phones_to_check), value=min(50, len(phones_to_check)))
+                    max_check = st.number_input("Max numbers to check", min_value=1, max_value=len(phones_to_check), value=len(phones_to_check))
+                with c2:
+                    check_rate = st.number_input(
+                        "Requests per second", min_value=1.0, max_value=20.0,
+                        value=PathaoCheckConfig.rate, step=1.0,
+                        help="Token-bucket rate limit for Pathao API calls. Lower it if Pathao starts answering 429."
+                    )
+                with c3:
+                    history_hours = st.number_input(
+                        "Reuse history newer than (hours)", min_value=0, max_value=24 * 30,
+                        value=HISTORY_TTL // 3600,
+                        help="Numbers checked (or found in an uploaded export) within this window are answered from the local delivery history. 0 checks every number via the API."
+                    )
                 
                 if st.button("🚀 Start Bulk API Check", type="primary"):
                     phones_to_check = [standardize_phone(p) for p in phones_to_check[:max_check]]
-                    phones_to_check = [p for p in phones_to_check if p]
+                    phones_to_check = list(dict.fromkeys(p for p in phones_to_check if p))
                     
+                    tokens = get_pathao_token_manager(client_id, client_secret, username, password)
                     with st.spinner("Authenticating with Pathao API..."):
                         try:
-                            token_resp = requests.post(
-                                "https://api-hermes.pathao.com/aladdin/api/v1/issue-token",
-                                json={"client_id": client_id, "client_secret": client_secret, "username": username, "password": password, "grant_type": "password"},
-                                timeout=10
-                            )
+                            tokens.get_token()
+                            authenticated = True
+                        except PathaoAuthError:
+                            authenticated = False
+                            st.error("Failed to authenticate. Please check your credentials.")
+                        except Exception as e:
+                            authenticated = False
+                            st.error(f"Error during bulk check: {e}")
                             
-                            if token_resp.status_code == 200:
-                                token = token_resp.json().get("access_token")
-                                headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept": "application/json"}
-                                
-                                results = []
-                                progress_bar = st.progress(0)
-                                status_text = st.empty()
-                                
-                                for i, phone in enumerate(phones_to_check):
-                                    status_text.text(f"Checking {i+1}/{len(phones_to_check)}: {phone}")
-                                    try:
-                                        orders_resp = requests.get(f"https://api-hermes.pathao.com/aladdin/api/v1/orders?search={phone}", headers=headers, timeout=10)
-                                        if orders_resp.status_code == 200:
-                                            data = orders_resp.json().get("data", {}).get("data", [])
-                                            
-                                            total_orders = len(data)
-                                            delivered_count = sum(1 for order in data if str(order.get('order_status', '')).lower() == 'delivered')
-                                            cancelled_count = sum(1 for order in data if str(order.get('order_status', '')).lower() in ['cancelled', 'returned', 'return'])
-                                            
-                                            success_rate = (delivered_count / total_orders * 100) if total_orders > 0 else 0
-                                            
-                                            results.append({
-                                                "Phone": phone,
-                                                "Total Orders": total_orders,
-                                                "Delivered": delivered_count,
-                                                "Returned/Cancelled": cancelled_count,
-                                                "Success Rate (%)": round(success_rate, 2)
-                                            })
-                                    except Exception:
-                                        pass
-                                        
-                                    progress_bar.progress((i + 1) / len(phones_to_check))
-                                    time.sleep(0.2)
-                                    
-                                status_text.text("✅ Bulk check completed!")
-                                
-                                if results:
-                                    res_df = pd.DataFrame(results)
-                                    st.dataframe(res_df.sort_values("Total Orders", ascending=False), use_container_width=True, hide_index=True)
-                                    
-                                    csv = res_df.to_csv(index=False).encode('utf-8')
-                                    st.download_button("⬇️ Download Results (CSV)", data=csv, file_name="pathao_bulk_check_results.csv", mime="text/csv")
-                                else:
-                                    st.warning("No results retrieved.")
-                            else:
-                                st.error("Failed to authenticate. Please check your credentials.")
+                    if authenticated:
+                        results = []
+                        failed = []
+                        progress_bar = st.progress(0)
+                        status_text = st.empty()
+                        table = st.empty()
+                        
+                        try:
+                            # Rows stream in as the concurrent, rate-limited checks complete
+                            for batch in iter_bulk_check(
+                                phones_to_check, tokens, config=PathaoCheckConfig(rate=check_rate),
+                                history=get_delivery_history(), max_age=history_hours * 3600,
+                            ):
+                                results.extend(batch.rows)
+                                failed.extend(batch.failed)
+                                progress_bar.progress(batch.done / max(batch.total, 1))
+                                status_text.text(
+                                    f"Checked {batch.done:,}/{batch.total:,} · "
+                                    f"{batch.cached:,} from local history · "
+                                    f"{(batch.done - batch.cached) / max(batch.elapsed, 1e-6):.1f} numbers/s via API"
+                                )
+                                if batch.rows:
+                                    table.dataframe(pd.DataFrame(results), use_container_width=True, hide_index=True)
+                            status_text.text("✅ Bulk check completed!")
+                        except PathaoAuthError:
+                            st.error("⚠️ The Pathao access token is invalid or has expired. Please verify your API credentials and permissions.")
                         except Exception as e:
                             st.error(f"Error during bulk check: {e}")
+                            
+                        if failed:
+                            st.warning(f"{len(failed):,} number(s) could not be checked after retries.")
+                            with st.expander("Failed numbers"):
+                                st.dataframe(pd.DataFrame(failed, columns=["Phone", "Error"]), use_container_width=True, hide_index=True)
+                        
+                        if results:
+                            res_df = pd.DataFrame(results)
+                            table.dataframe(res_df.sort_values("Total Orders", ascending=False), use_container_width=True, hide_index=True)
+                            
+                            csv = res_df.to_csv(index=False).encode('utf-8')
+                            st.download_button("⬇️ Download Results (CSV)", data=csv, file_name="pathao_bulk_check_results.csv", mime="text/csv")
+                        else:
+                            st.warning("No results retrieved.")
 
     with tab_wc_sync:
         st.markdown("#### WooCommerce & Pathao Order Sync")
@@ -311,19 +328,18 @@ def render_pathao_phone_checker():
                 wc_status = st.selectbox("WooCommerce Order Status", ["any", "processing", "completed", "on-hold", "pending"], index=0)
             
             if st.button("🔄 Fetch & Sync Status", type="primary", key="sync_wc_pathao"):
-                from app_modules.wc_live_source import load_from_woocommerce
+                from app_modules.wc_order_store import load_from_order_store
                 
-                # Clear cache to guarantee a fresh fetch from WooCommerce
-                load_from_woocommerce.clear()
-                
-                with st.spinner("Fetching orders from WooCommerce..."):
+                with st.spinner("Syncing orders from WooCommerce..."):
                     try:
-                        wc_df, _, _ = load_from_woocommerce(
+                        # max_age=0: always pull the latest changes into the local store first
+                        wc_df, _, _ = load_from_order_store(
                             store_url=wc_url,
                             consumer_key=wc_key,
                             consumer_secret=wc_sec,
                             days_back=days_back,
-                            status=wc_status
+                            status=wc_status,
+                            max_age=0
                         )
                         
                         if wc_df.empty:
@@ -339,60 +355,45 @@ def render_pathao_phone_checker():
                             
                             st.info(f"Checking Pathao status for {len(orders_df)} unique orders...")
                             
-                            token_resp = requests.post(
-                                "https://api-hermes.pathao.com/aladdin/api/v1/issue-token",
-                                json={"client_id": client_id, "client_secret": client_secret, "username": username, "password": password, "grant_type": "password"},
-                                timeout=10
-                            )
-                            
-                            if token_resp.status_code == 200:
-                                token = token_resp.json().get("access_token")
-                                headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept": "application/json"}
-                                
-                                pathao_statuses = []
-                                pathao_consignment = []
-                                
+                            tokens = get_pathao_token_manager(client_id, client_secret, username, password)
+                            try:
+                                tokens.get_token()
+                                authenticated = True
+                            except PathaoAuthError as e:
+                                authenticated = False
+                                st.error(f"Failed to authenticate with Pathao API. {e}")
+
+                            if authenticated:
                                 progress_bar = st.progress(0)
                                 status_text = st.empty()
                                 
-                                for i, row in orders_df.iterrows():
-                                    order_id = str(row["Order ID"])
-                                    phone = str(row["Phone"])
-                                    
-                                    status_text.text(f"Checking Order {order_id}...")
-                                    p_status = "Not Found"
-                                    p_cons = "N/A"
-                                    
-                                    try:
-                                        resp = requests.get(f"https://api-hermes.pathao.com/aladdin/api/v1/orders?search={order_id}", headers=headers, timeout=10)
-                                        data = resp.json().get("data", {}).get("data", []) if resp.status_code == 200 else []
-                                            
-                                        if not data and phone:
-                                            std_phone = standardize_phone(phone)
-                                            if std_phone:
-                                                resp = requests.get(f"https://api-hermes.pathao.com/aladdin/api/v1/orders?search={std_phone}", headers=headers, timeout=10)
-                                                data = resp.json().get("data", {}).get("data", []) if resp.status_code == 200 else []
-                                                
-                                        if data:
-                                            match = next((o for o in data if str(order_id) in str(o.get('merchant_order_id', ''))), None)
-                                            if not match:
-                                                match = data[0]
-                                                
-                                            p_status = str(match.get('order_status', 'Unknown')).title()
-                                            p_cons = str(match.get('consignment_id', 'N/A'))
-                                    except Exception:
-                                        pass
-                                        
-                                    pathao_statuses.append(p_status)
-                                    pathao_consignment.append(p_cons)
-                                    
-                                    progress_bar.progress((i + 1) / len(orders_df))
-                                    time.sleep(0.1)
-                                    
-                                status_text.text("✅ Sync completed!")
+                                # Order-id searches run concurrently; the phone fallback is searched
+                                # once per phone, and orders already in a final state are skipped.
+                                lookups = [
+                                    (str(order_id), standardize_phone(phone))
+                                    for order_id, phone in zip(orders_df["Order ID"], orders_df["Phone"])
+                                ]
+                                matched = {}
+                                failed = []
+                                try:
+                                    for batch in iter_order_sync(lookups, tokens, history=get_delivery_history()):
+                                        matched.update({r["Order ID"]: r for r in batch.rows})
+                                        failed.extend(batch.failed)
+                                        progress_bar.progress(batch.done / max(batch.total, 1))
+                                        status_text.text(
+                                            f"Synced {batch.done:,}/{batch.total:,} orders · "
+                                            f"{batch.cached:,} already resolved"
+                                        )
+                                    status_text.text("✅ Sync completed!")
+                                except PathaoAuthError:
+                                    st.error("⚠️ The Pathao access token is invalid or has expired. Please verify your API credentials and permissions.")
+                                
+                                if failed:
+                                    st.warning(f"{len(failed):,} order(s) could not be checked after retries.")
                                 
-                                orders_df["Pathao Status"] = pathao_statuses
-                                orders_df["Consignment ID"] = pathao_consignment
+                                order_keys = orders_df["Order ID"].astype(str)
+                                orders_df["Pathao Status"] = order_keys.map(lambda k: matched.get(k, {}).get("Pathao Status", "Not Found"))
+                                orders_df["Consignment ID"] = order_keys.map(lambda k: matched.get(k, {}).get("Consignment ID", "N/A"))
                                 
                                 def color_status(val):
                                     if val == 'Delivered': return 'color: #10b981; font-weight: bold'
@@ -409,8 +410,5 @@ def render_pathao_phone_checker():
                                 
                                 csv = orders_df.to_csv(index=False).encode('utf-8')
                                 st.download_button("⬇️ Download Synced Orders (CSV)", data=csv, file_name=f"wc_pathao_sync_{datetime.now().strftime('%Y%m%d')}.csv", mime="text/csv")
-                                
-                            else:
-                                st.error("Failed to authenticate with Pathao API. Check credentials.")
                     except Exception as e:
                         st.error(f"Error during sync: {e}")
\ No newline at end of file
@@ -27,6 +27,7 @@ def save_state():
     state_to_save = {}
     keys_to_persist = [
         "inv_res_data",
+        "inv_res_key",
         "inv_active_l",
         "inv_t_col",
         "pathao_res_df",
@@ -42,6 +43,7 @@ def save_state():
         "live_selected_categories",
         "wc_compare_prev",
         "live_auto_refresh_toggle",
+        "wc_delta_sync_enabled",
     ]
 
     for key in keys_to_persist:
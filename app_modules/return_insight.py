@@ -8,10 +8,14 @@ URL: https://docs.google.com/spreadsheets/d/e/2PACX-1vQ4j3i94IWVlVYI5gErxzfmmaYN
 
 import io
 import re
+import sys
 import hashlib
+import threading
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Set
-from collections import Counter, defaultdict
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Set
+from collections import Counter, OrderedDict, defaultdict
 try:
     from rapidfuzz.fuzz import ratio as fuzzy_ratio
 except ImportError:
@@ -36,6 +40,10 @@ _SESSION_LAST_ROW_COUNT = "return_insight_last_count"
 # Fuzzy matching threshold
 FUZZY_THRESHOLD = 0.75
 
+# Insight result cache limits (shared by all sessions of this server process)
+INSIGHTS_CACHE_MAX_ENTRIES = 8
+INSIGHTS_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
 
 def _compute_row_hash(row: pd.Series) -> str:
     """Compute a hash for a row to uniquely identify it."""
@@ -391,6 +399,84 @@ def parse_product_details(text: str) -> List[Dict]:
     return products
 
 
+# Columns of the long-format returned item table (one row per parsed item)
+RETURN_ITEM_COLUMNS = ["source_row", "date", "name", "size", "count", "sku", "display_name"]
+
+_ITEM_COUNT_PATTERN = r'[xX]\s*\(?\s*(\d+)\s*\)?'
+
+
+def _standardize_product_names(names: pd.Series) -> pd.Series:
+    """Vectorized standardize_product_name for a string series."""
+    return (
+        names.fillna("").astype(str).str.strip()
+        .str.replace(r'\s*[\(\[][^\)\]]+[\)\]]', '', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.replace(r'[^\w\s]', '', regex=True)
+        .str.strip()
+    )
+
+
+def explode_product_details(details: pd.Series, dates: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Parse a whole 'Issue Or Product Details' column into a long-format item table.
+    
+    Same rules as parse_product_details, applied with column-wide string
+    operations: one output row per ';'-separated item, keyed back to the
+    source row label.
+    
+    Returns DataFrame with columns: source_row, date, name, size, count, sku, display_name
+    """
+    if details is None or details.empty:
+        return pd.DataFrame(columns=RETURN_ITEM_COLUMNS)
+
+    text = details.where(details.notna(), "").astype(str)
+    items = text.str.split(";").explode().str.strip()
+    items = items[items.notna() & (items != "")]
+    if items.empty:
+        return pd.DataFrame(columns=RETURN_ITEM_COLUMNS)
+
+    source_row = items.index.to_numpy()
+    items = items.reset_index(drop=True)
+
+    count = pd.to_numeric(items.str.extract(_ITEM_COUNT_PATTERN, expand=False), errors="coerce")
+    count = count.fillna(1).astype(int)
+    body = items.str.replace(_ITEM_COUNT_PATTERN, "", regex=True)
+
+    # En/em dash first; fall back to ' - ' only when there is no en/em dash
+    parts = body.str.split(r'\s*[–—]\s*', regex=True)
+    single = parts.str.len() == 1
+    parts = parts.where(~single, body.str.split(" - ", regex=False))
+    n_parts = parts.str.len()
+
+    first = parts.str[0].fillna("").str.strip()
+    second = parts.str[1].fillna("").str.strip()
+    last = parts.str[-1].fillna("").str.strip()
+    second_is_sku = (
+        second.str.contains(r'\d', regex=True, na=False)
+        | second.str.match(r'^[A-Z0-9\-]+$', na=False)
+    )
+
+    size = second.where((n_parts >= 3) | ((n_parts == 2) & ~second_is_sku), "")
+    sku = last.where(n_parts >= 3, second.where((n_parts == 2) & second_is_sku, ""))
+    name = _standardize_product_names(first)
+    display_name = name.where(sku == "", name + " (" + sku + ")")
+
+    if dates is not None:
+        item_dates = dates.reindex(source_row).to_numpy()
+    else:
+        item_dates = pd.NaT
+
+    return pd.DataFrame({
+        "source_row": source_row,
+        "date": item_dates,
+        "name": name,
+        "size": size,
+        "count": count,
+        "sku": sku,
+        "display_name": display_name,
+    })
+
+
 def load_sheet_data(url: str = DEFAULT_SHEET_URL) -> pd.DataFrame:
     """Load data from the Google Sheet URL."""
     resp = requests.get(url, timeout=30)
@@ -436,6 +522,18 @@ def detect_columns(df: pd.DataFrame) -> Dict[str, Optional[str]]:
 
 def clean_dataframe(df: pd.DataFrame, cols: Dict) -> pd.DataFrame:
     """Clean and prepare the return dataframe for analysis with fuzzy matching."""
+    df_clean, _ = clean_return_data(df, cols)
+    return df_clean
+
+
+def clean_return_data(df: pd.DataFrame, cols: Dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Clean the return dataframe and parse its product details once.
+    
+    Returns:
+        Tuple of (cleaned_df, returned_items) where returned_items is the
+        long-format table from explode_product_details.
+    """
     df = df.copy()
     
     # Clean date column
@@ -496,26 +594,32 @@ def clean_dataframe(df: pd.DataFrame, cols: Dict) -> pd.DataFrame:
     else:
         df["_delivery_issue_category"] = "Others"
     
-    # Parse Product Details column for multi-item returns
+    # Parse Product Details column for multi-item returns (one row per item)
     if cols.get("product_details"):
-        df["_parsed_products"] = df[cols["product_details"]].apply(parse_product_details)
+        items = explode_product_details(df[cols["product_details"]], df["_date"])
         # Count total items from parsed products
-        df["_parsed_item_count"] = df["_parsed_products"].apply(
-            lambda x: sum(p.get('count', 1) for p in x) if isinstance(x, list) else 0
+        df["_parsed_item_count"] = (
+            items.groupby("source_row")["count"].sum().reindex(df.index, fill_value=0).astype(int)
         )
     else:
-        df["_parsed_products"] = None
+        items = pd.DataFrame(columns=RETURN_ITEM_COLUMNS)
         df["_parsed_item_count"] = 0
     
     # Use parsed item count if available and quantity column wasn't found
     if not cols.get("quantity") and cols.get("product_details"):
         df["_qty"] = df["_parsed_item_count"].replace(0, 1)
     
-    return df
+    return df, items
 
 
-def compute_insights(df: pd.DataFrame, cols: Dict, fuzzy_threshold: float = FUZZY_THRESHOLD) -> Dict:
-    """Compute comprehensive return insights with fuzzy product grouping."""
+def compute_insights(df: pd.DataFrame, cols: Dict, fuzzy_threshold: float = FUZZY_THRESHOLD,
+                     items: Optional[pd.DataFrame] = None) -> Dict:
+    """
+    Compute comprehensive return insights with fuzzy product grouping.
+    
+    `items` is the returned item table from clean_return_data; it is rebuilt
+    from the product details column when not supplied.
+    """
     insights = {}
     
     # Basic counts
@@ -553,12 +657,13 @@ def compute_insights(df: pd.DataFrame, cols: Dict, fuzzy_threshold: float = FUZZ
             for variant in variants:
                 product_to_group[variant] = key
         
-        df["_product_group"] = df["_product_clean"].map(
+        # Keep the grouping as a local series so the caller's frame is not mutated
+        product_group = df["_product_clean"].map(
             lambda x: product_to_group.get(x, x) if pd.notna(x) else "Unknown"
-        )
+        ).rename("_product_group")
         
         # Grouped product metrics
-        product_returns = df.groupby("_product_group").agg({
+        product_returns = df.groupby(product_group).agg({
             "_qty": "sum",
             "_refund_total": "sum",
             "_product_clean": "count"  # return count
@@ -587,37 +692,32 @@ def compute_insights(df: pd.DataFrame, cols: Dict, fuzzy_threshold: float = FUZZ
         insights["status_breakdown"] = df[cols["status"]].value_counts()
     
     # Parsed product details breakdown (if available)
-    if cols.get("product_details") and df["_parsed_products"].notna().any():
-        # Extract all parsed products for analysis
-        all_parsed = []
-        for products in df["_parsed_products"].dropna():
-            if isinstance(products, list):
-                all_parsed.extend(products)
-        
-        if all_parsed:
-            # Create product summary from parsed details
-            parsed_df = pd.DataFrame(all_parsed)
-            if not parsed_df.empty and 'name' in parsed_df.columns:
-                # Use display_name for grouping to ensure SKU is always shown
-                if 'display_name' not in parsed_df.columns:
-                    parsed_df['display_name'] = parsed_df.apply(
-                        lambda x: f"{x['name']} ({x['sku']})" if x['sku'] else x['name'], axis=1
-                    )
-                
-                parsed_summary = parsed_df.groupby('display_name').agg({
-                    'count': 'sum',
-                    'sku': 'first'
-                }).sort_values('count', ascending=False)
-                insights["parsed_product_summary"] = parsed_summary.head(20)
-                
-                # Most returned sizes (grouped by display_name to show SKU with size)
-                if 'size' in parsed_df.columns and 'sku' in parsed_df.columns:
-                    parsed_df['size_with_sku'] = parsed_df.apply(
-                        lambda x: f"{x['size']} ({x['sku']})" if x['size'] and x['sku'] else x['size'] or f"No Size ({x['sku']})", 
-                        axis=1
-                    )
-                    size_counts = parsed_df[parsed_df['size'] != ''].groupby('size_with_sku')['count'].sum().sort_values(ascending=False)
-                    insights["size_breakdown"] = size_counts.head(10)
+    if cols.get("product_details"):
+        if items is None:
+            items = explode_product_details(df[cols["product_details"]], df["_date"])
+        if not items.empty:
+            # display_name always carries the SKU when there is one
+            parsed_summary = items.groupby('display_name').agg({
+                'count': 'sum',
+                'sku': 'first'
+            }).sort_values('count', ascending=False)
+            insights["parsed_product_summary"] = parsed_summary.head(20)
+            
+            # Most returned sizes (size shown with its SKU)
+            sized = items[items["size"] != ""]
+            size_with_sku = sized["size"].where(sized["sku"] == "", sized["size"] + " (" + sized["sku"] + ")")
+            size_counts = sized["count"].groupby(size_with_sku.rename("size_with_sku")).sum().sort_values(ascending=False)
+            insights["size_breakdown"] = size_counts.head(10)
+            
+            # Per-SKU daily return trend
+            dated = items[(items["sku"] != "") & items["date"].notna()]
+            if not dated.empty:
+                sku_trends = (
+                    dated.groupby([pd.to_datetime(dated["date"]).dt.date.rename("date"), "sku"])["count"]
+                    .sum()
+                    .reset_index()
+                )
+                insights["sku_return_trends"] = sku_trends
     
     # Daily return trends
     if df["_date"].notna().any():
@@ -635,8 +735,7 @@ def compute_insights(df: pd.DataFrame, cols: Dict, fuzzy_threshold: float = FUZZ
     
     # Hourly patterns
     if df["_date"].notna().any():
-        df["_hour"] = df["_date"].dt.hour
-        hourly = df.groupby("_hour").agg({
+        hourly = df.groupby(df["_date"].dt.hour.rename("_hour")).agg({
             "_refund_total": "sum",
             "_qty": "sum",
             "_product_clean": "count"
@@ -655,6 +754,252 @@ def compute_insights(df: pd.DataFrame, cols: Dict, fuzzy_threshold: float = FUZZ
     return insights
 
 
+def _data_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a dataframe (columns, values and row order)."""
+    digest = hashlib.md5("|".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _estimate_nbytes(obj: Any) -> int:
+    """Rough memory footprint of a cached value."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, Mapping):
+        return sys.getsizeof(obj) + sum(_estimate_nbytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_estimate_nbytes(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def _freeze(value: Any) -> Any:
+    """Return a read-only view of an insight value (dicts and lists become immutable)."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class ReturnInsightsResult:
+    """Cleaned return data plus its insights. `insights` is shared between reruns and read-only."""
+    df_clean: pd.DataFrame
+    insights: Mapping[str, Any]
+    items: Optional[pd.DataFrame] = None
+    nbytes: int = 0
+
+
+class InsightsCache:
+    """Thread-safe LRU cache of insight results bounded by entry count and memory."""
+
+    def __init__(self, max_entries: int = INSIGHTS_CACHE_MAX_ENTRIES,
+                 max_bytes: int = INSIGHTS_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, ReturnInsightsResult]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> Optional[ReturnInsightsResult]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: tuple, result: ReturnInsightsResult):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key).nbytes
+            # A single result larger than the whole budget is returned but never stored
+            if result.nbytes > self.max_bytes:
+                return
+            self._entries[key] = result
+            self._bytes += result.nbytes
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_INSIGHTS_CACHE = InsightsCache()
+
+
+def get_return_insights(df: pd.DataFrame, cols: Dict,
+                        fuzzy_threshold: float = FUZZY_THRESHOLD,
+                        cache: Optional[InsightsCache] = None) -> Tuple[ReturnInsightsResult, bool]:
+    """
+    Clean the raw return sheet and compute its insights, memoized by
+    (data fingerprint, column mapping, fuzzy threshold).
+
+    The cached insights are shared; df_clean and items are copied per
+    call so a caller editing them cannot corrupt the cache.
+
+    Returns:
+        Tuple of (result, cache_hit)
+    """
+    cache = _INSIGHTS_CACHE if cache is None else cache
+    key = (
+        _data_fingerprint(df),
+        tuple(sorted((k, v) for k, v in cols.items())),
+        round(float(fuzzy_threshold), 4),
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        return _detached(cached), True
+
+    df_clean, items = clean_return_data(df, cols)
+    insights = compute_insights(df_clean, cols, fuzzy_threshold=fuzzy_threshold, items=items)
+
+    # Expose the fuzzy group on the cleaned frame (explorer + CSV export)
+    if cols.get("product"):
+        product_to_group = {
+            variant: key_name
+            for key_name, variants in insights["fuzzy_groups"].items()
+            for variant in variants
+        }
+        # Same labels as compute_insights' grouping (missing product -> "Unknown")
+        df_clean["_product_group"] = (
+            df_clean["_product_clean"].map(product_to_group).fillna(df_clean["_product_clean"]).fillna("Unknown")
+        )
+
+    frozen = _freeze(insights)
+    result = ReturnInsightsResult(
+        df_clean=df_clean,
+        insights=frozen,
+        items=items,
+        nbytes=_estimate_nbytes(df_clean) + _estimate_nbytes(items) + _estimate_nbytes(frozen),
+    )
+    cache.put(key, result)
+    return _detached(result), False
+
+
+def _detached(result: ReturnInsightsResult) -> ReturnInsightsResult:
+    """The result with private copies of its frames (insights stay shared)."""
+    return replace(
+        result,
+        df_clean=result.df_clean.copy(),
+        items=None if result.items is None else result.items.copy(),
+    )
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def _order_line_index(_store, store_url: str, year: int, status: str, watermark: Optional[str], revision: int):
+    """OrderLineIndex over one year of stored orders; (watermark, revision) key it to the store's contents."""
+    from app_modules.return_rate import OrderLineIndex
+
+    statuses = [s.strip() for s in str(status or "any").split(",")]
+    orders_df = _store.query_dashboard_df(
+        start=f"{year}-01-01T00:00:00", end=f"{year}-12-31T23:59:59", statuses=statuses
+    )
+    return OrderLineIndex.from_dashboard_df(orders_df)
+
+
+def _load_order_line_index(year: int, status: str = "any"):
+    """
+    Read one year of orders from the local order store and index them for
+    return-rate joins. The index is rebuilt only after the store changes.
+    """
+    from app_modules.sales_dashboard import get_setting
+    from app_modules.wc_live_source import _validate_url
+    from app_modules.wc_order_store import get_store_sync
+
+    store_url = get_setting("WC_STORE_URL")
+    consumer_key = get_setting("WC_CONSUMER_KEY")
+    consumer_secret = get_setting("WC_CONSUMER_SECRET")
+    if not all([store_url, consumer_key, consumer_secret]):
+        return None
+
+    store_url = _validate_url(store_url)
+    sync = get_store_sync(store_url, consumer_key, consumer_secret)
+    sync.ensure_coverage(f"{year}-01-01T00:00:00")
+    sync.refresh()
+    return _order_line_index(sync.store, store_url, year, status, sync.watermark, sync.store.revision)
+
+
+def render_return_rate_analysis(result: ReturnInsightsResult, cols: Dict):
+    """Return counts joined against WooCommerce orders: true return rates."""
+    from app_modules.return_rate import compute_return_rates
+
+    st.markdown("#### 📐 Return Rate vs Orders")
+    with st.expander("Compare returns with WooCommerce orders", expanded=False):
+        this_year = datetime.now().year
+        c1, c2, c3 = st.columns([1, 2, 1])
+        year = c1.selectbox("Order Year", list(range(this_year, this_year - 5, -1)), key="ri_rate_year")
+        date_range = c2.date_input(
+            "Order Date Range",
+            value=(datetime(year, 1, 1).date(), min(datetime.now().date(), datetime(year, 12, 31).date())),
+            key=f"ri_rate_range_{year}",
+        )
+        min_orders = c3.number_input("Min Orders / Customer", min_value=1, value=2, key="ri_rate_min_orders")
+
+        if not st.button("📥 Load Orders & Compute Rates", key="ri_rate_load") and not st.session_state.get("ri_rate_loaded"):
+            st.caption("Loads the selected year's orders once, then every range change is computed locally.")
+            return
+        st.session_state["ri_rate_loaded"] = True
+
+        try:
+            with st.spinner(f"Loading {year} orders from WooCommerce..."):
+                index = _load_order_line_index(year)
+        except Exception as e:
+            st.error(f"Could not load WooCommerce orders: {e}")
+            return
+        if index is None:
+            st.warning("WooCommerce credentials are not configured (WC_STORE_URL / WC_CONSUMER_KEY / WC_CONSUMER_SECRET).")
+            return
+
+        if isinstance(date_range, (list, tuple)):
+            if len(date_range) != 2:
+                # Still picking the range: st.date_input returns only the start so far
+                st.caption("Select an end date to compute return rates.")
+                return
+            start, end = date_range
+        else:
+            start = end = date_range
+        tables = compute_return_rates(
+            result.df_clean, result.items, index,
+            start=start, end=end, order_id_col=cols.get("order_id"), min_orders=int(min_orders),
+        )
+
+        stats = tables.match_stats
+        m1, m2, m3, m4 = st.columns(4)
+        _metric_card(m1, "Orders in Range", f"{stats['orders_in_range']:,}", "🧾", "primary")
+        _metric_card(m2, "Matched by Order ID", f"{stats['order_id']:,}", "🔗", "success")
+        _metric_card(m3, "Matched by Phone", f"{stats['phone']:,}", "📞", "warning")
+        _metric_card(m4, "Unmatched Returns", f"{stats['unmatched']:,}", "❓", "danger")
+
+        t1, t2, t3, t4 = st.tabs(["Product", "Size", "City", "Customer"])
+        with t1:
+            st.dataframe(tables.by_product, use_container_width=True, hide_index=True)
+        with t2:
+            st.dataframe(tables.by_size, use_container_width=True, hide_index=True)
+        with t3:
+            st.dataframe(tables.by_city, use_container_width=True, hide_index=True)
+        with t4:
+            st.dataframe(tables.by_customer, use_container_width=True, hide_index=True)
+
+
 def render_return_trend_charts(insights: Dict):
     """Render return trend visualization charts."""
     if "daily_trends" in insights and not insights["daily_trends"].empty:
@@ -826,6 +1171,24 @@ def render_return_product_analysis(insights: Dict):
                 )
                 st.plotly_chart(fig_size, use_container_width=True)
         
+        if "sku_return_trends" in insights and not insights["sku_return_trends"].empty:
+            sku_trends = insights["sku_return_trends"]
+            top_skus = sku_trends.groupby("sku")["count"].sum().nlargest(8).index
+            fig_sku = px.line(
+                sku_trends[sku_trends["sku"].isin(top_skus)],
+                x="date",
+                y="count",
+                color="sku",
+                title="Return Trend - Top SKUs",
+                markers=True
+            )
+            fig_sku.update_layout(
+                plot_bgcolor="rgba(0,0,0,0)",
+                paper_bgcolor="rgba(0,0,0,0)",
+                font=dict(color="#94a3b8")
+            )
+            st.plotly_chart(fig_sku, use_container_width=True)
+        
         with st.expander("📋 View Parsed Product Details"):
             st.dataframe(parsed_summary_display, use_container_width=True)
 
@@ -1009,6 +1372,7 @@ def render_sheet_insights_tab():
             st.session_state.pop(_SESSION_COLS, None)
             st.session_state.pop(_SESSION_ROW_HASHES, None)
             st.session_state.pop(_SESSION_LAST_ROW_COUNT, None)
+            _INSIGHTS_CACHE.clear()
             st.success("Cache cleared!")
             st.rerun()
     
@@ -1074,16 +1438,15 @@ def render_sheet_insights_tab():
         cols = {k: (v if v != "(none)" else None) for k, v in cols.items()}
         st.session_state[_SESSION_COLS] = cols
     
-    # Clean data
+    # Clean data and compute insights (memoized - chart-only reruns hit the cache)
     try:
-        df_clean = clean_dataframe(df, cols)
+        with st.spinner("Computing return insights with fuzzy matching..."):
+            result, _ = get_return_insights(df, cols, fuzzy_threshold=fuzzy_threshold)
     except Exception as e:
         st.error(f"Data cleaning error: {e}")
-        df_clean = df.copy()
-    
-    # Compute insights
-    with st.spinner("Computing return insights with fuzzy matching..."):
-        insights = compute_insights(df_clean, cols, fuzzy_threshold=fuzzy_threshold)
+        return
+    df_clean = result.df_clean
+    insights = result.insights
     
     # Core Return Metrics Cards
     st.markdown("#### 🔄 Return Overview")
@@ -1130,9 +1493,14 @@ def render_sheet_insights_tab():
     
     # Product Analysis with Fuzzy Grouping
     render_return_product_analysis(insights)
-    
+
     st.markdown("---")
-    
+
+    # Return rates against WooCommerce orders
+    render_return_rate_analysis(result, cols)
+
+    st.markdown("---")
+
     # Top Returning Customers
     if "top_returning_customers" in insights:
         st.markdown("#### 👥 Top Returning Customers")
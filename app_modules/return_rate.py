@@ -0,0 +1,262 @@
+"""
+Return Rate Engine
+==================
+Joins Return Insight rows against WooCommerce order lines (the frames
+produced by wc_live_source.transform_orders_to_dashboard_df) and computes
+return-rate tables per product, size, city and customer over a date range.
+
+Order lines are indexed once by order id, phone and normalized product name;
+returns are matched with hash joins (order id first, then the customer's
+latest order on or before the return date).
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def normalize_order_keys(values: pd.Series) -> pd.Series:
+    """'#193252', '193252.0' and 193252 all become '193252'."""
+    return (
+        values.astype(str)
+        .str.strip()
+        .str.replace(r"\.0$", "", regex=True)
+        .str.extract(r"(\d+)", expand=False)
+        .fillna("")
+    )
+
+
+def normalize_phone_keys(values: pd.Series) -> pd.Series:
+    """Last 10 digits of a BD phone number (drops +88 / 88 / 0 prefixes)."""
+    digits = values.fillna("").astype(str).str.replace(r"\D", "", regex=True)
+    return digits.str[-10:].where(digits.str.len() >= 10, "")
+
+
+def normalize_product_keys(names: pd.Series) -> pd.Series:
+    """Lowercase, punctuation-free product title used to join returns with orders."""
+    return (
+        names.fillna("").astype(str).str.strip()
+        .str.replace(r"\s*[\(\[][^\)\]]+[\)\]]", "", regex=True)
+        .str.replace(r"[^\w\s]", "", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+        .str.lower()
+    )
+
+
+def split_title_size(names: pd.Series) -> pd.DataFrame:
+    """Split WooCommerce line item names 'Title - Size' on the last ' - '."""
+    parts = names.fillna("").astype(str).str.rsplit(" - ", n=1, expand=True)
+    if parts.shape[1] == 1:
+        parts[1] = None
+    return pd.DataFrame({
+        "title": parts[0].str.strip(),
+        "size": parts[1].fillna("").str.strip().str.upper(),
+    })
+
+
+@dataclass
+class OrderLineIndex:
+    """Order lines with normalized join keys, built once per order frame."""
+    lines: pd.DataFrame
+    orders: pd.DataFrame
+
+    @classmethod
+    def from_dashboard_df(cls, orders_df: pd.DataFrame) -> "OrderLineIndex":
+        """
+        Build the index from a transform_orders_to_dashboard_df frame
+        (Order ID, Date, Product Name, Quantity, Phone, Customer Name, City).
+        """
+        n = len(orders_df)
+
+        def col(name, default=""):
+            return orders_df[name] if name in orders_df.columns else pd.Series([default] * n, index=orders_df.index)
+
+        title_size = split_title_size(col("Product Name"))
+        lines = pd.DataFrame({
+            "order_key": normalize_order_keys(col("Order ID")).to_numpy(),
+            "date": pd.to_datetime(col("Date", None), errors="coerce").to_numpy(),
+            "product_key": normalize_product_keys(title_size["title"]).to_numpy(),
+            "size": title_size["size"].to_numpy(),
+            "qty": pd.to_numeric(col("Quantity", 0), errors="coerce").fillna(0).to_numpy(),
+            "phone_key": normalize_phone_keys(col("Phone")).to_numpy(),
+            "customer": col("Customer Name").fillna("").astype(str).to_numpy(),
+            "city": col("City").fillna("").astype(str).str.strip().str.title().to_numpy(),
+        })
+        for key in ("order_key", "product_key", "size", "phone_key", "city"):
+            lines[key] = lines[key].astype("category")
+
+        orders = (
+            lines.groupby("order_key", observed=True, sort=False)
+            .agg(date=("date", "first"), phone_key=("phone_key", "first"),
+                 customer=("customer", "first"), city=("city", "first"), qty=("qty", "sum"))
+            .reset_index()
+        )
+        orders["order_key"] = orders["order_key"].astype(str)
+        orders["phone_key"] = orders["phone_key"].astype(str)
+        orders["city"] = orders["city"].astype(str)
+        return cls(lines=lines, orders=orders)
+
+    def lines_between(self, start: Optional[date], end: Optional[date]) -> pd.DataFrame:
+        return self.lines[_date_mask(self.lines["date"], start, end)]
+
+    def orders_between(self, start: Optional[date], end: Optional[date]) -> pd.DataFrame:
+        return self.orders[_date_mask(self.orders["date"], start, end)]
+
+
+@dataclass
+class ReturnRateTables:
+    """Return-rate tables plus a summary of how returns were matched to orders."""
+    by_product: pd.DataFrame
+    by_size: pd.DataFrame
+    by_city: pd.DataFrame
+    by_customer: pd.DataFrame
+    match_stats: Dict[str, int] = field(default_factory=dict)
+
+
+def _date_mask(dates: pd.Series, start: Optional[date], end: Optional[date]) -> pd.Series:
+    mask = pd.Series(True, index=dates.index)
+    if start is not None:
+        mask &= dates >= pd.Timestamp(start)
+    if end is not None:
+        mask &= dates < pd.Timestamp(end) + pd.Timedelta(days=1)
+    return mask
+
+
+def match_returns_to_orders(returns_df: pd.DataFrame, index: OrderLineIndex,
+                            order_id_col: Optional[str] = None) -> pd.DataFrame:
+    """
+    Attach the matching WooCommerce order to every return row.
+
+    Uses the cleaned Return Insight frame (_date, _phone, _qty). Rows are
+    matched by order id, then by phone to that customer's latest order
+    placed on or before the return date.
+
+    Returns a frame indexed like returns_df with order_key, order_date,
+    city, phone_key, customer and match ('order_id' | 'phone' | 'unmatched').
+    """
+    ret = pd.DataFrame(index=returns_df.index)
+    ret["return_date"] = pd.to_datetime(returns_df.get("_date"), errors="coerce")
+    ret["phone_key"] = normalize_phone_keys(returns_df.get("_phone", pd.Series("", index=returns_df.index)))
+    if order_id_col and order_id_col in returns_df.columns:
+        ret["order_key"] = normalize_order_keys(returns_df[order_id_col])
+    else:
+        ret["order_key"] = ""
+
+    orders = index.orders.set_index("order_key")
+    by_id = ret[["order_key"]].join(orders[["date", "city", "phone_key", "customer"]], on="order_key", rsuffix="_order")
+    matched_id = by_id["date"].notna() & (ret["order_key"] != "")
+
+    out = pd.DataFrame(index=ret.index)
+    out["order_key"] = ret["order_key"].where(matched_id, "")
+    out["order_date"] = by_id["date"].where(matched_id)
+    out["city"] = by_id["city"].where(matched_id, "")
+    out["phone_key"] = by_id["phone_key"].where(matched_id, ret["phone_key"])
+    out["customer"] = by_id["customer"].where(matched_id, "")
+    out["match"] = np.where(matched_id, "order_id", "unmatched")
+
+    # Phone fallback: latest order of that phone on or before the return date
+    pending = ret[~matched_id & (ret["phone_key"] != "") & ret["return_date"].notna()]
+    if not pending.empty:
+        left = pending.assign(_row=pending.index).sort_values("return_date")
+        right = (
+            index.orders[index.orders["phone_key"] != ""]
+            .dropna(subset=["date"])
+            .sort_values("date")[["date", "order_key", "phone_key", "city", "customer"]]
+        )
+        if not right.empty:
+            asof = pd.merge_asof(
+                left[["_row", "return_date", "phone_key"]],
+                right,
+                left_on="return_date",
+                right_on="date",
+                by="phone_key",
+                direction="backward",
+            ).dropna(subset=["order_key"]).set_index("_row")
+            rows = asof.index
+            out.loc[rows, "order_key"] = asof["order_key"]
+            out.loc[rows, "order_date"] = asof["date"]
+            out.loc[rows, "city"] = asof["city"]
+            out.loc[rows, "customer"] = asof["customer"]
+            out.loc[rows, "match"] = "phone"
+
+    out["effective_date"] = out["order_date"].where(out["order_date"].notna(), ret["return_date"])
+    return out
+
+
+def _rate_table(ordered: pd.Series, returned: pd.Series, label: str,
+                ordered_name: str, returned_name: str) -> pd.DataFrame:
+    table = pd.concat([ordered.rename(ordered_name), returned.rename(returned_name)], axis=1).fillna(0)
+    table = table[table[ordered_name] > 0]
+    table["Return Rate (%)"] = (table[returned_name] / table[ordered_name] * 100).round(2)
+    table.index.name = label
+    return table.sort_values([returned_name, "Return Rate (%)"], ascending=False).reset_index()
+
+
+def compute_return_rates(returns_df: pd.DataFrame, items: Optional[pd.DataFrame],
+                         index: OrderLineIndex, start: Optional[date] = None,
+                         end: Optional[date] = None, order_id_col: Optional[str] = None,
+                         min_orders: int = 1) -> ReturnRateTables:
+    """
+    Return-rate tables for orders placed between start and end (inclusive).
+
+    Args:
+        returns_df: cleaned Return Insight frame (clean_return_data)
+        items: returned item table (explode_product_details); product and size
+               rates fall back to _product_clean/_qty when it is missing
+        index: OrderLineIndex over the WooCommerce order lines
+        order_id_col: returns column holding the WooCommerce order number
+        min_orders: drop customers with fewer orders than this
+    """
+    matches = match_returns_to_orders(returns_df, index, order_id_col)
+    in_range = _date_mask(matches["effective_date"], start, end)
+    matches = matches[in_range]
+
+    lines = index.lines_between(start, end)
+    orders = index.orders_between(start, end)
+
+    # Product + size: ordered units vs returned units
+    if items is not None and not items.empty:
+        ret_items = items[items["source_row"].isin(matches.index)]
+        ret_product = normalize_product_keys(ret_items["name"])
+        ret_size = ret_items["size"].fillna("").astype(str).str.strip().str.upper()
+        ret_units = ret_items["count"]
+    else:
+        subset = returns_df.loc[matches.index]
+        ret_product = normalize_product_keys(subset.get("_product_clean", pd.Series("", index=subset.index)))
+        ret_size = pd.Series("", index=subset.index)
+        ret_units = pd.to_numeric(subset.get("_qty", 1), errors="coerce").fillna(1)
+
+    ordered_by_product = lines.groupby("product_key", observed=True)["qty"].sum()
+    ordered_by_product.index = ordered_by_product.index.astype(str)
+    returned_by_product = ret_units.groupby(ret_product.to_numpy()).sum()
+    by_product = _rate_table(ordered_by_product, returned_by_product, "Product", "Units Ordered", "Units Returned")
+
+    ordered_by_size = lines[lines["size"] != ""].groupby("size", observed=True)["qty"].sum()
+    ordered_by_size.index = ordered_by_size.index.astype(str)
+    sized = (ret_size != "").to_numpy()
+    returned_by_size = ret_units[sized].groupby(ret_size[sized].to_numpy()).sum()
+    by_size = _rate_table(ordered_by_size, returned_by_size, "Size", "Units Ordered", "Units Returned")
+
+    # City: distinct orders vs distinct returned orders
+    matched = matches[matches["order_key"] != ""]
+    orders_by_city = orders[orders["city"] != ""].groupby("city")["order_key"].nunique()
+    returned_by_city = matched[matched["city"] != ""].groupby("city")["order_key"].nunique()
+    by_city = _rate_table(orders_by_city, returned_by_city, "City", "Orders", "Returned Orders")
+
+    # Customer: orders per phone vs return rows per phone
+    orders_by_phone = orders[orders["phone_key"] != ""].groupby("phone_key")["order_key"].nunique()
+    returned_by_phone = matches[matches["phone_key"] != ""].groupby("phone_key").size()
+    by_customer = _rate_table(orders_by_phone, returned_by_phone, "Phone", "Orders", "Returns")
+    by_customer = by_customer[by_customer["Orders"] >= min_orders]
+    names = orders.drop_duplicates("phone_key").set_index("phone_key")["customer"]
+    by_customer.insert(1, "Customer", by_customer["Phone"].map(names).fillna(""))
+    by_customer["Phone"] = "0" + by_customer["Phone"].astype(str)
+
+    stats = matches["match"].value_counts().to_dict()
+    stats = {k: int(stats.get(k, 0)) for k in ("order_id", "phone", "unmatched")}
+    stats["orders_in_range"] = int(len(orders))
+    return ReturnRateTables(by_product, by_size, by_city, by_customer.reset_index(drop=True), stats)
@@ -420,7 +420,11 @@ def compute_period_metrics(df_curr, df_prev, live_mapping):
         
     curr_kpi = _kpi(df_curr)
     prev_kpi = _kpi(df_prev)
-    
+    return curr_kpi, prev_kpi, _recent_orders(df_curr, live_mapping)
+
+
+def _recent_orders(df_curr, live_mapping):
+    """One row per order in the current period, newest first."""
     recent_orders_df = pd.DataFrame()
     if df_curr is not None and not df_curr.empty:
         date_col = live_mapping.get("date")
@@ -448,7 +452,7 @@ def compute_period_metrics(df_curr, df_prev, live_mapping):
             
         recent_orders_df = temp_df
         
-    return curr_kpi, prev_kpi, recent_orders_df
+    return recent_orders_df
 
 
 def get_latest_incoming_file(folder_path):
@@ -535,6 +539,11 @@ def _read_csv_with_last_modified(csv_url):
 @st.cache_data(ttl=30, show_spinner=False)
 def load_from_google_sheet():
     """Loads live data from a Google Sheet worksheet (CSV export)."""
+    return _fetch_google_sheet()
+
+
+def _fetch_google_sheet():
+    """Uncached Google Sheet download (also run by the background sync worker)."""
     sheet_url = get_setting("GSHEET_URL", DEFAULT_GSHEET_URL)
     if sheet_url:
         csv_url = normalize_gsheet_url_to_csv(sheet_url)
@@ -556,16 +565,37 @@ def load_from_google_sheet():
     return df_live, source_name, modified_at
 
 
-def load_live_source(source_mode, wc_credentials=None):
-    """Routes loading by selected source mode."""
+def load_live_source(source_mode, wc_credentials=None, background=False):
+    """
+    Routes loading by selected source mode.
+
+    With background=True the Google Sheet and the delta-synced WooCommerce
+    store are served from the server-wide sync worker's latest snapshot,
+    so the render never waits on the network (except for the first sync).
+    """
     res = None
+    sync_time = datetime.now()
     if source_mode == "Google Sheet":
-        res = load_from_google_sheet()
+        if background:
+            from app_modules.live_sync_worker import get_sync_worker, read_snapshot
+            snapshot = read_snapshot(get_sync_worker("gsheet", lambda: _fetch_google_sheet))
+            res, sync_time = snapshot.payload, snapshot.published_at
+        else:
+            res = load_from_google_sheet()
     elif source_mode == "🛒 WooCommerce Store":
         if wc_credentials is None:
             raise ValueError("WooCommerce credentials not provided")
         from app_modules.wc_live_source import load_from_woocommerce
-        res = load_from_woocommerce(
+        from app_modules.wc_order_store import load_from_order_store
+        from app_modules.live_sync_worker import get_wc_sync_worker, load_wc_snapshot
+        use_worker = background and wc_credentials.get("delta_sync")
+        if use_worker:
+            loader = load_wc_snapshot
+        elif wc_credentials.get("delta_sync"):
+            loader = load_from_order_store
+        else:
+            loader = load_from_woocommerce
+        res = loader(
             store_url=wc_credentials["store_url"],
             consumer_key=wc_credentials["consumer_key"],
             consumer_secret=wc_credentials["consumer_secret"],
@@ -574,9 +604,23 @@ def load_live_source(source_mode, wc_credentials=None):
             after=wc_credentials.get("after"),
             before=wc_credentials.get("before")
         )
+        if use_worker:
+            snapshot = get_wc_sync_worker(
+                wc_credentials["store_url"], wc_credentials["consumer_key"],
+                wc_credentials["consumer_secret"], wc_credentials.get("api_version", "wc/v3")
+            ).latest()
+            sync_time = snapshot.published_at if snapshot else sync_time
+        if wc_credentials.get("delta_sync"):
+            from app_modules.wc_order_store import get_store_sync
+            st.session_state.wc_fetch_report = get_store_sync(
+                wc_credentials["store_url"], wc_credentials["consumer_key"],
+                wc_credentials["consumer_secret"], wc_credentials.get("api_version", "wc/v3")
+            ).last_report
+        else:
+            st.session_state.wc_fetch_report = res[0].attrs.get("fetch_report")
 
     if res:
-        st.session_state.live_sync_time = datetime.now()
+        st.session_state.live_sync_time = sync_time
         return res
     raise ValueError(f"Unsupported source mode: {source_mode}")
 
@@ -807,6 +851,47 @@ def _delta_str(today_val, yesterday_val):
     return f"{sign}{diff:,.0f} ({arrow}{abs(pct):.1f}%)"
 
 
+def _classify_status_counts(status_counts: dict, metrics: dict) -> dict:
+    """Fill status_breakdown and the shipped/processing/pending/cancelled buckets."""
+    metrics["status_breakdown"] = status_counts
+    for status, count in status_counts.items():
+        status_str = str(status).lower()
+        if any(k in status_str for k in ['shipped', 'delivered', 'completed', 'done', 'finish']):
+            metrics["shipped_orders"] += count
+        elif any(k in status_str for k in ['processing', 'in progress', 'packed', 'ready']):
+            metrics["processing_orders"] += count
+        elif any(k in status_str for k in ['pending', 'new', 'received']):
+            metrics["pending_orders"] += count
+        elif any(k in status_str for k in ['cancel', 'refund', 'return']):
+            metrics["cancelled_orders"] += count
+    return metrics
+
+
+def _rollup_order_status_metrics(rollup, start, end, statuses=None, df_raw=None) -> dict:
+    """_compute_order_status_metrics answered from the sales rollup cube."""
+    metrics = {
+        "shipped_orders": 0,
+        "processing_orders": 0,
+        "pending_orders": 0,
+        "cancelled_orders": 0,
+        "total_items": 0,
+        "total_revenue": 0.0,
+        "latest_shipped": [],
+        "status_breakdown": {}
+    }
+    status_counts = rollup.status_counts(start, end, statuses)
+    if not status_counts:
+        return metrics
+    _classify_status_counts(status_counts, metrics)
+    kpi = rollup.kpis(start, end, statuses)
+    metrics["total_items"] = kpi["qty"]
+    metrics["total_revenue"] = kpi["revenue"]
+    # The latest-orders table needs row-level data
+    if df_raw is not None and not df_raw.empty:
+        metrics["latest_shipped"] = _compute_order_status_metrics(df_raw)["latest_shipped"]
+    return metrics
+
+
 def _compute_order_status_metrics(df: pd.DataFrame) -> dict:
     """
     Compute order status metrics from raw dataframe.
@@ -861,19 +946,7 @@ def _compute_order_status_metrics(df: pd.DataFrame) -> dict:
     
     # Compute status breakdown
     if status_col:
-        status_counts = df[status_col].value_counts().to_dict()
-        metrics["status_breakdown"] = status_counts
-        
-        for status, count in status_counts.items():
-            status_str = str(status).lower()
-            if any(k in status_str for k in ['shipped', 'delivered', 'completed', 'done', 'finish']):
-                metrics["shipped_orders"] += count
-            elif any(k in status_str for k in ['processing', 'in progress', 'packed', 'ready']):
-                metrics["processing_orders"] += count
-            elif any(k in status_str for k in ['pending', 'new', 'received']):
-                metrics["pending_orders"] += count
-            elif any(k in status_str for k in ['cancel', 'refund', 'return']):
-                metrics["cancelled_orders"] += count
+        _classify_status_counts(df[status_col].value_counts().to_dict(), metrics)
     
     # Compute total items
     if qty_col:
@@ -929,11 +1002,56 @@ def _compute_order_status_metrics(df: pd.DataFrame) -> dict:
     return metrics
 
 
+def _render_trend_chart(trend_agg: pd.DataFrame, trend_granularity: str):
+    """Revenue trend bar chart + CSV export for `_period`/`_revenue` rows."""
+    if not trend_agg.empty:
+        x_label = "Week Starting" if trend_granularity == "Weekly" else "Date"
+        fig_trend = px.bar(
+            trend_agg, x="_period", y="_revenue",
+            text_auto=".2s",
+            labels={"_period": x_label, "_revenue": "Revenue (TK)"},
+            color_discrete_sequence=["#3b82f6"]
+        )
+        fig_trend.update_traces(
+            marker_line_color="#1d4ed8",
+            marker_line_width=1,
+            opacity=0.9
+        )
+        fig_trend.update_layout(
+            margin=dict(l=12, r=12, t=30, b=12),
+            plot_bgcolor="rgba(0,0,0,0)",
+            paper_bgcolor="rgba(0,0,0,0)",
+            font=dict(color="#94a3b8")
+        )
+        st.plotly_chart(fig_trend, use_container_width=True, config={"displayModeBar": False})
+
+        # Export option for trend data
+        trend_export = trend_agg.copy()
+        if trend_granularity == "Weekly":
+            trend_export["_period"] = pd.to_datetime(trend_export["_period"]).dt.strftime("%Y-%m-%d")
+
+        trend_export.rename(columns={"_period": x_label, "_revenue": "Revenue (TK)"}, inplace=True)
+        st.download_button(
+            label=f"📥 Download {trend_granularity} Trend Data (CSV)",
+            data=trend_export.to_csv(index=False).encode("utf-8"),
+            file_name=f"{trend_granularity.lower()}_revenue_trend_{datetime.now().strftime('%Y%m%d')}.csv",
+            mime="text/csv"
+        )
+    else:
+        st.info("No data available for the trend chart with current filters.")
+
+
 def render_dashboard_output(
     drill, summ, top, timeframe, basket, source_name, last_updated="N/A",
-    df_raw=None, live_mapping=None, df_prev=None, period_labels=None
+    df_raw=None, live_mapping=None, df_prev=None, period_labels=None,
+    rollup=None, rollup_statuses=None
 ):
-    """Renders common dashboard widgets/charts/tables/export."""
+    """
+    Renders common dashboard widgets/charts/tables/export.
+
+    When a SalesRollup and period_labels are given, KPIs, order status and
+    the revenue trend are read from the cube instead of df_raw/df_prev.
+    """
     tz_bd = timezone(timedelta(hours=6))
     today_key = datetime.now(tz_bd).strftime("%Y-%m-%d")
     source_key = os.path.basename(str(source_name))
@@ -946,13 +1064,21 @@ def render_dashboard_output(
     t_rev = summ["Total Amount"].sum()
 
     # ── Period metrics comparison ────────────────────────────
-    curr_kpi, prev_kpi, recent_orders_df = (
-        compute_period_metrics(df_raw, df_prev, live_mapping)
-        if (df_raw is not None and live_mapping is not None)
-        else ({"qty": 0, "orders": 0, "revenue": 0, "avg_basket": 0},
-              {"qty": 0, "orders": 0, "revenue": 0, "avg_basket": 0},
-              pd.DataFrame())
-    )
+    use_rollup = rollup is not None and period_labels is not None and live_mapping is not None
+    if use_rollup:
+        cur_start, cur_end = period_labels
+        span = (cur_end - cur_start).days + 1
+        curr_kpi = rollup.kpis(cur_start, cur_end, rollup_statuses)
+        prev_kpi = rollup.kpis(cur_start - timedelta(days=span), cur_start - timedelta(days=1), rollup_statuses)
+        recent_orders_df = _recent_orders(df_raw, live_mapping)
+    else:
+        curr_kpi, prev_kpi, recent_orders_df = (
+            compute_period_metrics(df_raw, df_prev, live_mapping)
+            if (df_raw is not None and live_mapping is not None)
+            else ({"qty": 0, "orders": 0, "revenue": 0, "avg_basket": 0},
+                  {"qty": 0, "orders": 0, "revenue": 0, "avg_basket": 0},
+                  pd.DataFrame())
+        )
     has_data = curr_kpi["orders"] > 0
 
     with st.container():
@@ -960,7 +1086,7 @@ def render_dashboard_output(
         st.subheader("Core Metrics")
 
         if has_data:
-            if df_prev is not None and not df_prev.empty:
+            if (df_prev is not None and not df_prev.empty) or (use_rollup and prev_kpi["orders"] > 0):
                 if period_labels:
                     start_d, end_d = period_labels
                     curr_label = f"{start_d.strftime('%b %d')} - {end_d.strftime('%b %d')}"
@@ -1034,7 +1160,11 @@ def render_dashboard_output(
 
         # ── Order Status Metrics ─────────────────────────────────────────
         if df_raw is not None and not df_raw.empty:
-            order_metrics = _compute_order_status_metrics(df_raw)
+            order_metrics = (
+                _rollup_order_status_metrics(rollup, *period_labels, rollup_statuses, df_raw=df_raw)
+                if use_rollup
+                else _compute_order_status_metrics(df_raw)
+            )
             
             if order_metrics["status_breakdown"]:
                 st.subheader("📦 Order Status")
@@ -1243,7 +1373,10 @@ def render_dashboard_output(
     with col_t2:
         trend_granularity = st.radio("Granularity", ["Daily", "Weekly"], horizontal=True, key="live_trend_granularity", label_visibility="collapsed")
         
-    if live_mapping.get("date") and live_mapping["date"] in df_raw.columns:
+    if use_rollup:
+        trend_agg = rollup.trend(*period_labels, rollup_statuses, selected_categories, trend_granularity)
+        _render_trend_chart(trend_agg, trend_granularity)
+    elif live_mapping.get("date") and live_mapping["date"] in df_raw.columns:
         trend_df = df_raw.copy()
         trend_df["_date"] = pd.to_datetime(trend_df[live_mapping["date"]], errors="coerce")
         trend_df = trend_df.dropna(subset=["_date"])
@@ -1268,41 +1401,7 @@ def render_dashboard_output(
             
             trend_agg = trend_df.groupby("_period").agg({"_revenue": "sum"}).reset_index()
             
-            if not trend_agg.empty:
-                x_label = "Week Starting" if trend_granularity == "Weekly" else "Date"
-                fig_trend = px.bar(
-                    trend_agg, x="_period", y="_revenue",
-                    text_auto=".2s",
-                    labels={"_period": x_label, "_revenue": "Revenue (TK)"},
-                    color_discrete_sequence=["#3b82f6"]
-                )
-                fig_trend.update_traces(
-                    marker_line_color="#1d4ed8",
-                    marker_line_width=1,
-                    opacity=0.9
-                )
-                fig_trend.update_layout(
-                    margin=dict(l=12, r=12, t=30, b=12),
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    font=dict(color="#94a3b8")
-                )
-                st.plotly_chart(fig_trend, use_container_width=True, config={"displayModeBar": False})
-                
-                # Export option for trend data
-                trend_export = trend_agg.copy()
-                if trend_granularity == "Weekly":
-                    trend_export["_period"] = pd.to_datetime(trend_export["_period"]).dt.strftime("%Y-%m-%d")
-                
-                trend_export.rename(columns={"_period": x_label, "_revenue": "Revenue (TK)"}, inplace=True)
-                st.download_button(
-                    label=f"📥 Download {trend_granularity} Trend Data (CSV)",
-                    data=trend_export.to_csv(index=False).encode("utf-8"),
-                    file_name=f"{trend_granularity.lower()}_revenue_trend_{datetime.now().strftime('%Y%m%d')}.csv",
-                    mime="text/csv"
-                )
-            else:
-                st.info("No data available for the trend chart with current filters.")
+            _render_trend_chart(trend_agg, trend_granularity)
     else:
         st.info("Date column not available for trend analysis.")
 
@@ -1525,12 +1624,33 @@ def render_manual_tab():
         st.error(f"File error: {e}")
 
 
+def _get_live_rollup(df_live, live_mapping, source_name, status_col=None):
+    """Session-held SalesRollup for the live source, synced with the latest frame."""
+    if not live_mapping.get("date"):
+        return None
+    from app_modules.sales_rollup import SalesRollup
+
+    signature = (source_name, tuple(sorted(live_mapping.items(), key=lambda kv: kv[0])), status_col)
+    held = st.session_state.get("live_sales_rollup")
+    if held is None or held[0] != signature:
+        held = (signature, SalesRollup(live_mapping, status_col=status_col))
+        st.session_state.live_sales_rollup = held
+    try:
+        held[1].sync_frame(df_live)
+    except Exception as e:
+        log_system_event("ROLLUP_ERROR", str(e))
+        st.session_state.live_sales_rollup = None
+        return None
+    return held[1]
+
+
 @safe_render(fallback_message="Live Dashboard failed to render. Please check logs.")
 def render_live_tab():
     def _reset_live_state():
         st.session_state.live_sync_time = None
         st.session_state.live_res = None
         st.session_state.live_uploaded_file = None
+        st.session_state.live_sales_rollup = None
 
     render_reset_confirm("Live Dashboard", "live", _reset_live_state)
     """Always running dashboard from selected source or upload."""
@@ -1612,6 +1732,13 @@ def render_live_tab():
                     key="wc_live_status",
                     help="Filter orders by status. Select one or more."
                 )
+
+                delta_sync = st.toggle(
+                    "Delta sync",
+                    value=True,
+                    key="wc_delta_sync_enabled",
+                    help="Read from the local order store. A background worker (one per server) syncs orders created or modified since the last sync; page loads never wait on the API."
+                )
                 
             # Calculate actual fetch start date based on comparison toggle
             delta_days = (wc_end_date - wc_start_date).days + 1
@@ -1628,7 +1755,8 @@ def render_live_tab():
                 "before": f"{wc_end_date}T23:59:59",
                 "current_start": wc_start_date,
                 "current_end": wc_end_date,
-                "compare_prev": compare_prev
+                "compare_prev": compare_prev,
+                "delta_sync": delta_sync
             }
         else:
             st.error("WooCommerce secrets (WC_STORE_URL, etc.) not found in secrets.toml. Please configure them.")
@@ -1647,9 +1775,20 @@ def render_live_tab():
             st.caption(f"🔄 Last synced: **{sync_label}** · next auto-refresh in ~{next_in}s")
         else:
             st.caption("🔄 Auto-refreshes every 30 seconds")
+        if wc_credentials is not None:
+            fetch_report = st.session_state.get("wc_fetch_report")
+            if fetch_report is not None:
+                st.caption(f"📦 Last fetch — {fetch_report.summary()}")
     with rc2:
         if st.button("⚡ Force Refresh", use_container_width=True, type="primary", key="live_force_refresh"):
             st.cache_data.clear()
+            if wc_credentials is not None and wc_credentials.get("delta_sync"):
+                from app_modules.live_sync_worker import get_wc_sync_worker, refresh_now
+                with st.spinner("Syncing orders..."):
+                    refresh_now(get_wc_sync_worker(
+                        wc_credentials["store_url"], wc_credentials["consumer_key"],
+                        wc_credentials["consumer_secret"], wc_credentials["api_version"]
+                    ))
             st.session_state.live_sync_time = None
             st.rerun()
     with rc3:
@@ -1664,7 +1803,7 @@ def render_live_tab():
             return
         progress_wc = st.empty()
         with st.spinner("Fetching orders from WooCommerce..."):
-            df_live, source_name, modified_at = load_live_source(source_mode, wc_credentials=wc_credentials)
+            df_live, source_name, modified_at = load_live_source(source_mode, wc_credentials=wc_credentials, background=True)
             progress_wc.empty()
 
         auto_cols = find_columns(df_live)
@@ -1690,6 +1829,10 @@ def render_live_tab():
                 status_col = col
                 break
 
+        # Daily rollup cube: only new/changed orders are re-parsed on each refresh
+        rollup = _get_live_rollup(df_live, live_mapping, source_name, status_col)
+        selected_statuses = None
+
         if status_col:
             st.divider()
             all_statuses = sorted(df_live[status_col].dropna().astype(str).unique().tolist())
@@ -1726,12 +1869,17 @@ def render_live_tab():
             st.warning("No orders found for the selected current period.")
             return
 
-        drill, summ, top, timeframe, basket = process_data(df_current, live_mapping)
+        period = (wc_credentials["current_start"], wc_credentials["current_end"])
+        if rollup is not None:
+            drill, summ, top, timeframe, basket = rollup.process_outputs(*period, selected_statuses)
+        else:
+            drill, summ, top, timeframe, basket = process_data(df_current, live_mapping)
         if drill is not None:
             render_dashboard_output(
                 drill, summ, top, timeframe, basket, source_name, modified_at,
                 df_raw=df_current, live_mapping=live_mapping,
-                df_prev=df_prev, period_labels=(wc_credentials["current_start"], wc_credentials["current_end"])
+                df_prev=df_prev, period_labels=period,
+                rollup=rollup, rollup_statuses=selected_statuses
             )
 
     except Exception as e:
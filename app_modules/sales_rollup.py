@@ -0,0 +1,344 @@
+"""
+Daily Sales Rollup
+==================
+Pre-aggregated (day, category, price, status) cube for the Live Dashboard.
+
+Raw line items are parsed once (numeric/date coercion, get_category) when
+their order first arrives or changes; each cube cell keeps qty, revenue,
+amount, line and order counts plus a distinct-order sketch (the sorted
+64-bit hashes of the cell's order keys) so order counts stay exact when
+cells are merged across days or categories.
+
+"Choose Any" placeholder lines are kept in their own `listed=False` cells:
+process_data's tables skip them, while the period KPIs and status counts
+count every line exactly as compute_period_metrics and the Order Status
+panel do.
+
+Period KPIs, category summaries, drilldowns, top products and daily/weekly
+trends are answered from the cube instead of re-scanning line items.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROLLUP_DIMS = ["day", "category", "price", "status", "listed"]
+
+
+def _hash_keys(keys: pd.Series) -> np.ndarray:
+    return pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy(dtype=np.uint64)
+
+
+def _union_count(sketches: Iterable[np.ndarray]) -> int:
+    """Distinct orders across a set of cell sketches."""
+    arrays = [s for s in sketches if s is not None and len(s)]
+    if not arrays:
+        return 0
+    if len(arrays) == 1:
+        return len(arrays[0])
+    return int(np.unique(np.concatenate(arrays)).size)
+
+
+class SalesRollup:
+    """
+    Incrementally maintained sales cube for one data source.
+
+    Call sync_frame() with the latest raw frame on every rerun: only orders
+    that are new, changed or gone are re-parsed, and only the days they
+    touch are re-aggregated.
+    """
+
+    def __init__(self, mapping: Dict[str, str], status_col: Optional[str] = None, categorize=None):
+        if categorize is None:
+            from app_modules.sales_dashboard import get_category as categorize
+        self.mapping = dict(mapping)
+        self.status_col = status_col
+        self._categorize = categorize
+        self._categories: Dict[str, str] = {}
+        self._fingerprints = pd.Series(dtype="int64")
+        self._lines = pd.DataFrame(
+            columns=["order_key", "order_hash", "kpi_hash", "day", "category", "price", "status", "listed",
+                     "name", "qty", "revenue", "kpi_qty", "amount"]
+        )
+        self.cube = pd.DataFrame()
+        self.product_cube = pd.DataFrame()
+
+    # ── Maintenance ──────────────────────────────────────────────────────
+    def _order_keys(self, df: pd.DataFrame) -> pd.Series:
+        order_col = self.mapping.get("order_id")
+        phone_col = self.mapping.get("phone")
+        if order_col and order_col in df.columns:
+            keys = df[order_col].astype(str)
+            if phone_col and phone_col in df.columns:
+                keys = keys + "|" + df[phone_col].astype(str)
+            return keys
+        if phone_col and phone_col in df.columns:
+            return df[phone_col].astype(str)
+        return pd.Series(df.index.astype(str), index=df.index)
+
+    def _source_columns(self, df: pd.DataFrame) -> List[str]:
+        cols = [self.mapping.get(k) for k in ("name", "cost", "qty", "date")]
+        cols += [self.status_col, "Total Amount"]
+        return [c for c in dict.fromkeys(cols) if c and c in df.columns]
+
+    def _category_of(self, names: pd.Series) -> pd.Series:
+        missing = [n for n in names.unique() if n not in self._categories]
+        for name in missing:
+            self._categories[name] = self._categorize(name)
+        return names.map(self._categories)
+
+    def prepare_lines(self, df: pd.DataFrame, keys: pd.Series) -> pd.DataFrame:
+        """
+        Parse raw line items once. qty/revenue follow process_data's cleaning
+        rules; kpi_qty/amount/kpi_hash follow compute_period_metrics.
+        """
+        names = df[self.mapping["name"]].fillna("Unknown Product").astype(str)
+        listed = ~names.str.contains("Choose Any", case=False, na=False)
+
+        price = pd.to_numeric(df[self.mapping["cost"]], errors="coerce").fillna(0)
+        kpi_qty = pd.to_numeric(df[self.mapping["qty"]], errors="coerce").fillna(0)
+        qty = kpi_qty.clip(lower=0)
+        revenue = price * qty
+        if "Total Amount" in df.columns:
+            amount = pd.to_numeric(df["Total Amount"], errors="coerce").fillna(0)
+        else:
+            amount = price * kpi_qty
+        order_col = self.mapping.get("order_id")
+        if order_col and order_col in df.columns:
+            kpi_hash = _hash_keys(df[order_col])
+        else:
+            kpi_hash = _hash_keys(keys)
+        date_col = self.mapping.get("date")
+        if date_col and date_col in df.columns:
+            day = pd.to_datetime(df[date_col], errors="coerce").dt.normalize()
+        else:
+            day = pd.Series(pd.NaT, index=df.index)
+        status = (
+            df[self.status_col].fillna("").astype(str)
+            if self.status_col and self.status_col in df.columns
+            else pd.Series("", index=df.index)
+        )
+        return pd.DataFrame({
+            "order_key": keys.to_numpy(),
+            "order_hash": _hash_keys(keys),
+            "kpi_hash": kpi_hash,
+            "day": day.to_numpy(),
+            "category": self._category_of(names).to_numpy(),
+            "price": price.to_numpy(),
+            "status": status.to_numpy(),
+            "listed": listed.to_numpy(),
+            "name": names.to_numpy(),
+            "qty": qty.to_numpy(),
+            "revenue": revenue.to_numpy(),
+            "kpi_qty": kpi_qty.to_numpy(),
+            "amount": amount.to_numpy(),
+        })
+
+    def sync_frame(self, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Bring the cube in line with `df` (the full current raw frame).
+
+        Returns:
+            Counts of added/changed/removed orders and re-aggregated days
+        """
+        stats = {"added": 0, "changed": 0, "removed": 0, "days": 0}
+        if df is None:
+            return stats
+        keys = self._order_keys(df)
+        row_hash = pd.util.hash_pandas_object(df[self._source_columns(df)], index=False)
+        fingerprints = (row_hash % np.uint64(2 ** 61)).astype("int64").groupby(keys.to_numpy()).sum()
+
+        previous = self._fingerprints.reindex(fingerprints.index)
+        added = previous.isna()
+        changed = ~added & (previous != fingerprints)
+        removed = self._fingerprints.index.difference(fingerprints.index)
+        stats.update(added=int(added.sum()), changed=int(changed.sum()), removed=len(removed))
+        touched = fingerprints.index[added | changed].union(removed)
+        if touched.empty:
+            return stats
+
+        stale = self._lines["order_key"].isin(touched)
+        fresh_rows = keys.isin(fingerprints.index[added | changed])
+        fresh = self.prepare_lines(df[fresh_rows], keys[fresh_rows])
+        days = pd.Index(self._lines.loc[stale, "day"]).append(pd.Index(fresh["day"])).unique()
+
+        parts = [part for part in (self._lines[~stale], fresh) if not part.empty]
+        self._lines = pd.concat(parts, ignore_index=True) if parts else fresh
+        self._lines[["order_hash", "kpi_hash"]] = self._lines[["order_hash", "kpi_hash"]].astype(np.uint64)
+        self._fingerprints = fingerprints
+        self._rebuild_days(days)
+        stats["days"] = len(days)
+        return stats
+
+    def _rebuild_days(self, days: pd.Index):
+        if self.cube.empty:
+            keep_cube, keep_products = self.cube, self.product_cube
+        else:
+            keep_cube = self.cube[~self.cube.index.get_level_values("day").isin(days)]
+            keep_products = self.product_cube[~self.product_cube.index.get_level_values("day").isin(days)]
+
+        lines = self._lines[self._lines["day"].isin(days)]
+
+        if lines.empty:
+            self.cube, self.product_cube = keep_cube, keep_products
+            return
+
+        grouped = lines.groupby(ROLLUP_DIMS, dropna=False, sort=False)
+        cells = grouped.agg(
+            qty=("qty", "sum"), revenue=("revenue", "sum"), kpi_qty=("kpi_qty", "sum"),
+            amount=("amount", "sum"), lines=("qty", "size")
+        )
+        cells["order_hashes"] = grouped["order_hash"].unique()
+        cells["kpi_hashes"] = grouped["kpi_hash"].unique()
+        cells["orders"] = cells["order_hashes"].map(len)
+
+        lines = lines[lines["listed"].astype(bool)]
+        products = lines.groupby(["day", "category", "status", "name"], dropna=False, sort=False).agg(
+            qty=("qty", "sum"), revenue=("revenue", "sum")
+        )
+        self.cube = pd.concat([keep_cube, cells]) if not keep_cube.empty else cells
+        self.product_cube = pd.concat([keep_products, products]) if not keep_products.empty else products
+
+    # ── Queries ──────────────────────────────────────────────────────────
+    @staticmethod
+    def _mask(frame: pd.DataFrame, start: Optional[date], end: Optional[date],
+              statuses: Optional[List[str]], categories: Optional[List[str]],
+              listed_only: bool = False) -> pd.Series:
+        idx = frame.index
+        mask = np.ones(len(frame), dtype=bool)
+        if listed_only:
+            mask &= np.asarray(idx.get_level_values("listed"), dtype=bool)
+        if start is not None or end is not None:
+            day = idx.get_level_values("day")
+            if start is not None:
+                mask &= np.asarray(day >= pd.Timestamp(start))
+            if end is not None:
+                mask &= np.asarray(day <= pd.Timestamp(end))
+        if statuses is not None:
+            mask &= np.asarray(idx.get_level_values("status").isin(statuses))
+        if categories is not None:
+            mask &= np.asarray(idx.get_level_values("category").isin(categories))
+        return mask
+
+    def cells(self, start: Optional[date] = None, end: Optional[date] = None,
+              statuses: Optional[List[str]] = None, categories: Optional[List[str]] = None,
+              listed_only: bool = True) -> pd.DataFrame:
+        """Cube cells in the period; listed_only=False includes "Choose Any" lines."""
+        if self.cube.empty:
+            return self.cube
+        return self.cube[self._mask(self.cube, start, end, statuses, categories, listed_only)]
+
+    def kpis(self, start=None, end=None, statuses=None, categories=None) -> Dict[str, float]:
+        """compute_period_metrics' qty, orders, revenue, avg_basket (every line counts)."""
+        cells = self.cells(start, end, statuses, categories, listed_only=False)
+        if cells.empty:
+            return {"qty": 0, "orders": 0, "revenue": 0, "avg_basket": 0}
+        if self.mapping.get("order_id"):
+            orders = _union_count(cells["kpi_hashes"])
+        else:
+            orders = int(cells["lines"].sum())
+        revenue = float(cells["amount"].sum())
+        return {
+            "qty": float(cells["kpi_qty"].sum()),
+            "orders": orders,
+            "revenue": revenue,
+            "avg_basket": revenue / orders if orders > 0 else 0,
+        }
+
+    def category_summary(self, start=None, end=None, statuses=None, categories=None) -> pd.DataFrame:
+        """process_data's summary table."""
+        cells = self.cells(start, end, statuses, categories)
+        if cells.empty:
+            return pd.DataFrame(columns=["Category", "Total Qty", "Total Amount"])
+        summary = cells.groupby(level="category")[["qty", "revenue"]].sum().reset_index()
+        summary.columns = ["Category", "Total Qty", "Total Amount"]
+        total_rev = summary["Total Amount"].sum()
+        total_qty = summary["Total Qty"].sum()
+        if total_rev > 0:
+            summary["Revenue Share (%)"] = (summary["Total Amount"] / total_rev * 100).round(2)
+        if total_qty > 0:
+            summary["Quantity Share (%)"] = (summary["Total Qty"] / total_qty * 100).round(2)
+        return summary
+
+    def drilldown(self, start=None, end=None, statuses=None, categories=None) -> pd.DataFrame:
+        """process_data's (Category, Price) drilldown table."""
+        cells = self.cells(start, end, statuses, categories)
+        if cells.empty:
+            return pd.DataFrame(columns=["Category", "Price (TK)", "Total Qty", "Total Amount"])
+        drill = cells.groupby(level=["category", "price"])[["qty", "revenue"]].sum().reset_index()
+        drill.columns = ["Category", "Price (TK)", "Total Qty", "Total Amount"]
+        return drill
+
+    def top_products(self, start=None, end=None, statuses=None, categories=None) -> pd.DataFrame:
+        """process_data's product ranking."""
+        products = self.product_cube
+        if not products.empty:
+            products = products[self._mask(products, start, end, statuses, categories)]
+        if products.empty:
+            return pd.DataFrame(columns=["Product Name", "Total Qty", "Total Amount", "Category"])
+        top = (
+            products.reset_index()
+            .groupby("name")
+            .agg(qty=("qty", "sum"), revenue=("revenue", "sum"), category=("category", "first"))
+            .reset_index()
+        )
+        top.columns = ["Product Name", "Total Qty", "Total Amount", "Category"]
+        return top.sort_values("Total Amount", ascending=False)
+
+    def basket(self, start=None, end=None, statuses=None, categories=None) -> Dict[str, float]:
+        """process_data's basket metrics (mean qty/value per order)."""
+        cells = self.cells(start, end, statuses, categories)
+        orders = _union_count(cells["order_hashes"]) if not cells.empty else 0
+        has_order_cols = any(self.mapping.get(k) for k in ("order_id", "phone"))
+        if not orders or not has_order_cols:
+            return {"avg_basket_qty": 0, "avg_basket_value": 0, "total_orders": 0}
+        return {
+            "avg_basket_qty": float(cells["qty"].sum()) / orders,
+            "avg_basket_value": float(cells["revenue"].sum()) / orders,
+            "total_orders": orders,
+        }
+
+    def trend(self, start=None, end=None, statuses=None, categories=None, granularity: str = "Daily") -> pd.DataFrame:
+        """Revenue per day (or week start) as `_period`, `_revenue`."""
+        cells = self.cells(start, end, statuses, categories)
+        if cells.empty:
+            return pd.DataFrame(columns=["_period", "_revenue"])
+        daily = cells.groupby(level="day")["revenue"].sum()
+        daily = daily[daily.index.notna()]
+        if granularity == "Weekly":
+            periods = daily.index.to_period("W").start_time
+        else:
+            periods = daily.index.date
+        trend = daily.groupby(periods).sum().reset_index()
+        trend.columns = ["_period", "_revenue"]
+        return trend
+
+    def status_counts(self, start=None, end=None, statuses=None, categories=None) -> Dict[str, int]:
+        """Line-item counts per status (the value_counts used by the Order Status panel)."""
+        cells = self.cells(start, end, statuses, categories, listed_only=False)
+        if cells.empty:
+            return {}
+        counts = cells.groupby(level="status")["lines"].sum()
+        return {k: int(v) for k, v in counts.items() if k != ""}
+
+    def timeframe_suffix(self, start=None, end=None, statuses=None) -> str:
+        cells = self.cells(start, end, statuses)
+        days = cells.index.get_level_values("day").dropna() if not cells.empty else pd.Index([])
+        if days.empty:
+            return ""
+        first, last = days.min(), days.max()
+        if first.to_period("M") == last.to_period("M"):
+            return first.strftime("%B_%Y")
+        return f"{first.strftime('%d%b')}_to_{last.strftime('%d%b_%y')}"
+
+    def process_outputs(self, start=None, end=None, statuses=None) -> Tuple:
+        """(drill, summary, top, timeframe, basket) - the process_data tuple for a period."""
+        return (
+            self.drilldown(start, end, statuses),
+            self.category_summary(start, end, statuses),
+            self.top_products(start, end, statuses),
+            self.timeframe_suffix(start, end, statuses),
+            self.basket(start, end, statuses),
+        )
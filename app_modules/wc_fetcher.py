@@ -0,0 +1,291 @@
+"""
+WooCommerce Paginated Fetcher
+=============================
+Shared page fetcher for the WooCommerce REST API (orders, customers, ...).
+
+- Reads page 1, then the remaining X-WP-TotalPages pages with at most
+  `concurrency` requests in flight.
+- Retries each page on its own on 429/5xx, timeouts and connection
+  errors, honouring Retry-After and otherwise backing off exponentially
+  with full jitter.
+- Records per-page latency, attempts, items and payload bytes in the
+  FetchReport returned with the items.
+- With FetchConfig(sample_projection=True) (benchmarks/debugging), a
+  `_fields` fetch also samples page 1 once per endpoint without it, so
+  the report can state the bytes and time the projection saves.
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import aiohttp
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class FetchConfig:
+    """Tuning knobs for fetch_all_pages."""
+    concurrency: int = 4
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    retry_statuses: Tuple[int, ...] = RETRY_STATUSES
+    sample_projection: bool = False  # costs one extra full page-1 request per endpoint
+
+
+@dataclass
+class PageStat:
+    page: int
+    latency: float
+    attempts: int
+    items: int
+    status: int
+    bytes: int = 0
+
+
+@dataclass
+class ProjectionSample:
+    """Page 1 fetched with and without a `_fields` projection."""
+    fields: str
+    items: int
+    projected_bytes: int
+    full_bytes: int
+    projected_latency: float
+    full_latency: float
+
+    @property
+    def ratio(self) -> float:
+        """Projected / full payload size."""
+        return self.projected_bytes / self.full_bytes if self.full_bytes else 1.0
+
+    @property
+    def saved_pct(self) -> float:
+        return (1 - self.ratio) * 100
+
+
+@dataclass
+class FetchReport:
+    """Per-page timings of one paginated fetch."""
+    label: str = ""
+    total_pages: int = 0
+    total_items: int = 0
+    elapsed: float = 0.0
+    pages: List[PageStat] = field(default_factory=list)
+    fields: Optional[str] = None
+    projection: Optional[ProjectionSample] = None
+
+    @property
+    def retries(self) -> int:
+        return sum(p.attempts - 1 for p in self.pages)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(p.bytes for p in self.pages)
+
+    @property
+    def estimated_full_bytes(self) -> Optional[int]:
+        """Payload this fetch would have cost without `_fields`."""
+        if self.projection is None:
+            return None
+        return int(self.total_bytes / max(self.projection.ratio, 1e-9))
+
+    @property
+    def slowest(self) -> Optional[PageStat]:
+        return max(self.pages, key=lambda p: p.latency, default=None)
+
+    def summary(self) -> str:
+        if not self.pages:
+            return f"{self.label}: no pages fetched"
+        latencies = sorted(p.latency for p in self.pages)
+        p50 = latencies[len(latencies) // 2]
+        text = (
+            f"{self.label}: {len(self.pages)}/{self.total_pages} pages, {self.total_items} items, "
+            f"{self.total_bytes / 1e6:.2f} MB in {self.elapsed:.2f}s "
+            f"(p50 {p50:.2f}s, max {latencies[-1]:.2f}s, {self.retries} retries)"
+        )
+        if self.projection is not None:
+            sample = self.projection
+            text += (
+                f"; _fields saved ~{sample.saved_pct:.0f}% "
+                f"({(self.estimated_full_bytes - self.total_bytes) / 1e6:.2f} MB, "
+                f"page 1 {sample.projected_latency:.2f}s vs {sample.full_latency:.2f}s full)"
+            )
+        return text
+
+
+
+_PROJECTION_SAMPLES: Dict[Tuple[str, str], ProjectionSample] = {}
+
+
+def fields_param(fields: Optional[Union[str, Sequence[str]]]) -> Optional[str]:
+    """`_fields` value for a field list; None/empty means full objects."""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        return fields
+    return ",".join(dict.fromkeys(fields))
+
+
+def _retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, config: FetchConfig, retry_after: Optional[float] = None) -> float:
+    """Retry-After when the server sent one, else full-jitter exponential backoff."""
+    if retry_after is not None:
+        return min(retry_after, config.backoff_max)
+    cap = min(config.backoff_max, config.backoff_base * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+async def fetch_page(
+    session: aiohttp.ClientSession,
+    url: str,
+    params: Dict[str, Any],
+    page: int,
+    auth: Optional[aiohttp.BasicAuth] = None,
+    config: Optional[FetchConfig] = None,
+) -> Tuple[List[Dict], Mapping[str, str], PageStat]:
+    """
+    GET one page, retrying transient failures.
+
+    Returns:
+        (items, response headers (case-insensitive), PageStat). Raises the last error once
+        retries are exhausted; 4xx other than 429 are raised immediately.
+    """
+    config = config or FetchConfig()
+    page_params = dict(params, page=page)
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        retry_after = None
+        try:
+            async with session.get(url, auth=auth, params=page_params) as response:
+                if response.status in config.retry_statuses and attempt <= config.max_retries:
+                    retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history,
+                        status=response.status, message=response.reason or "", headers=response.headers,
+                    )
+                response.raise_for_status()
+                body = await response.read()
+                items = json.loads(body) if body else []
+                stat = PageStat(
+                    page, time.perf_counter() - started, attempt, len(items or []), response.status, len(body)
+                )
+                # copy() keeps the case-insensitive CIMultiDict lookup
+                return items or [], response.headers.copy(), stat
+        except aiohttp.ClientResponseError as e:
+            if e.status not in config.retry_statuses or attempt > config.max_retries:
+                raise
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError):
+            if attempt > config.max_retries:
+                raise
+        await asyncio.sleep(backoff_delay(attempt - 1, config, retry_after))
+
+
+async def _projection_sample(
+    session: aiohttp.ClientSession,
+    url: str,
+    params: Dict[str, Any],
+    auth: Optional[aiohttp.BasicAuth],
+    config: FetchConfig,
+    projected: PageStat,
+) -> Optional[ProjectionSample]:
+    """Fetch page 1 once without `_fields` (cached per url+fields)."""
+    key = (url, params["_fields"])
+    if key not in _PROJECTION_SAMPLES:
+        full_params = {k: v for k, v in params.items() if k != "_fields"}
+        try:
+            _, _, full = await fetch_page(session, url, full_params, 1, auth, config)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        _PROJECTION_SAMPLES[key] = ProjectionSample(
+            params["_fields"], projected.items, projected.bytes, full.bytes, projected.latency, full.latency
+        )
+    return _PROJECTION_SAMPLES[key]
+
+
+async def fetch_all_pages(
+    session: aiohttp.ClientSession,
+    url: str,
+    params: Dict[str, Any],
+    auth: Optional[aiohttp.BasicAuth] = None,
+    config: Optional[FetchConfig] = None,
+    on_page: Optional[Callable[[int, List[Dict]], None]] = None,
+    on_progress: Optional[Callable[[int, int, int], None]] = None,
+    label: str = "",
+) -> Tuple[List[Dict], FetchReport]:
+    """
+    Fetch every page of a WooCommerce collection endpoint.
+
+    Args:
+        on_page: called as on_page(page, items) as each page arrives; when
+                 given, items are handed over instead of being collected
+                 and the returned list is empty
+        on_progress: called as on_progress(pages_done, total_pages, items_so_far)
+
+    Returns:
+        (items, FetchReport)
+    """
+    config = config or FetchConfig()
+    report = FetchReport(label=label, fields=params.get("_fields"))
+    started = time.perf_counter()
+    collected: List[Dict] = []
+
+    def _consume(page: int, items: List[Dict], stat: PageStat):
+        report.pages.append(stat)
+        report.total_items += len(items)
+        if on_page is not None:
+            on_page(page, items)
+        else:
+            collected.extend(items)
+        if on_progress is not None:
+            on_progress(len(report.pages), report.total_pages, report.total_items)
+
+    items, headers, stat = await fetch_page(session, url, params, 1, auth, config)
+    report.total_pages = int(headers.get("X-WP-TotalPages", 1) or 1)
+    if not items:
+        report.total_pages = min(report.total_pages, 1)
+    _consume(1, items, stat)
+
+    if items and report.total_pages > 1:
+        semaphore = asyncio.Semaphore(max(1, config.concurrency))
+
+        async def _bounded(page: int):
+            async with semaphore:
+                page_items, _, page_stat = await fetch_page(session, url, params, page, auth, config)
+            # Consume inside the task: finished tasks must not keep page JSON alive
+            _consume(page, page_items, page_stat)
+
+        tasks = [asyncio.ensure_future(_bounded(p)) for p in range(2, report.total_pages + 1)]
+        try:
+            for future in asyncio.as_completed(tasks):
+                await future
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    report.elapsed = time.perf_counter() - started
+    if report.fields and items and config.sample_projection:
+        report.projection = await _projection_sample(session, url, params, auth, config, stat)
+    return collected, report
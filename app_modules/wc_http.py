@@ -0,0 +1,167 @@
+"""
+Process-wide async HTTP client
+==============================
+One aiohttp ClientSession living on a long-running background event loop,
+shared by every WooCommerce (and Pathao) call in the process. Keep-alive pooling and DNS
+caching mean Streamlit reruns and repeated syncs reuse warm TLS
+connections instead of paying a new loop, session and handshake each time.
+
+Synchronous code calls `get_http_client().run(lambda session: coro)`.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import aiohttp
+
+HTTP_POOL_LIMIT = 32
+HTTP_POOL_LIMIT_PER_HOST = 8
+HTTP_DNS_CACHE_TTL = 300
+HTTP_KEEPALIVE_TIMEOUT = 60
+HTTP_TIMEOUT = 60
+
+
+@asynccontextmanager
+async def session_scope(session: Optional[aiohttp.ClientSession] = None,
+                        timeout: float = HTTP_TIMEOUT) -> AsyncIterator[aiohttp.ClientSession]:
+    """Yield the given session, or a temporary one closed on exit."""
+    if session is not None:
+        yield session
+        return
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as owned:
+        yield owned
+
+
+class ProgressRelay:
+    """
+    Progress target usable from the loop thread. Updates are buffered and
+    replayed on the caller's thread (Streamlit elements are not thread-safe).
+    """
+
+    def __init__(self, target: Any):
+        self.target = target
+        self._lock = threading.Lock()
+        self._progress = None
+        self._text = None
+
+    def progress(self, value: float, text: Optional[str] = None):
+        with self._lock:
+            self._progress = (value, text)
+
+    def text(self, body: str):
+        with self._lock:
+            self._text = body
+
+    def flush(self):
+        with self._lock:
+            progress, text = self._progress, self._text
+            self._progress = self._text = None
+        if self.target is None:
+            return
+        if text is not None:
+            self.target.text(text)
+        if progress is not None:
+            self.target.progress(min(max(progress[0], 0.0), 1.0), text=progress[1])
+
+
+class AsyncHTTPClient:
+    """aiohttp session + event loop on a daemon thread, with a sync facade."""
+
+    def __init__(self, limit: int = HTTP_POOL_LIMIT, limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+                 dns_cache_ttl: int = HTTP_DNS_CACHE_TTL, keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+                 timeout: float = HTTP_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _start(self):
+        ready = threading.Event()
+
+        def _run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._loop = loop
+            ready.set()
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=_run, name="wc-http-loop", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    def submit(self, factory: Callable[[aiohttp.ClientSession], Awaitable[Any]]) -> concurrent.futures.Future:
+        """Schedule factory(session) on the background loop."""
+        async def _call():
+            return await factory(await self._get_session())
+        return asyncio.run_coroutine_threadsafe(_call(), self.loop)
+
+    def run(self, factory: Callable[[aiohttp.ClientSession], Awaitable[Any]],
+            relay: Optional[ProgressRelay] = None, poll_interval: float = 0.1) -> Any:
+        """Run factory(session) on the background loop and block for its result."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("AsyncHTTPClient.run() cannot be called from its own event loop")
+        future = self.submit(factory)
+        try:
+            while True:
+                try:
+                    return future.result(timeout=poll_interval)
+                except concurrent.futures.TimeoutError:
+                    if relay is not None:
+                        relay.flush()
+        finally:
+            if relay is not None:
+                relay.flush()
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(5)
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(5)
+
+
+_CLIENT: Optional[AsyncHTTPClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_http_client() -> AsyncHTTPClient:
+    """The process-wide AsyncHTTPClient (created on first use)."""
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = AsyncHTTPClient()
+            atexit.register(_CLIENT.close)
+        return _CLIENT
@@ -0,0 +1,399 @@
+"""
+WooCommerce Local Order Store
+=============================
+Embedded SQLite copy of the store's orders and line items (status, billing
+and shipping fields included), kept fresh by a single delta-sync process.
+
+The Live Dashboard, Return Insight, the dynamic extractor and the Pathao
+"WC Order Sync" tab read orders from here instead of calling the REST API:
+date-range, status and phone lookups are indexed queries.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from app_modules.persistence import DATA_DIR
+from app_modules.wc_live_source import (
+    DASHBOARD_COLUMNS,
+    DELTA_ORDER_FIELDS,
+    WCDeltaSync,
+    _coerce_dashboard_types,
+    _order_to_rows,
+    _validate_url,
+    fetch_wc_orders,
+)
+
+STORE_HISTORY_DAYS = 90  # window synced on first use; older ranges are backfilled on demand
+STORE_MIN_SYNC_INTERVAL = 30  # seconds; reads within this window skip the API entirely
+STORE_ORDER_FIELDS = DELTA_ORDER_FIELDS + ("total", "currency", "payment_method", "customer_id")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    status TEXT,
+    date_created TEXT,
+    date_modified TEXT,
+    total REAL,
+    currency TEXT,
+    payment_method TEXT,
+    customer_id INTEGER,
+    first_name TEXT,
+    last_name TEXT,
+    email TEXT,
+    phone TEXT,
+    phone_key TEXT,
+    address TEXT,
+    city TEXT,
+    shipping_city TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(date_created);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created ON orders(status, date_created);
+CREATE INDEX IF NOT EXISTS idx_orders_phone ON orders(phone_key);
+
+CREATE TABLE IF NOT EXISTS line_items (
+    order_id TEXT NOT NULL,
+    line_no INTEGER NOT NULL,
+    product_id INTEGER,
+    variation_id INTEGER,
+    name TEXT,
+    sku TEXT,
+    quantity INTEGER,
+    unit_price REAL,
+    total REAL,
+    PRIMARY KEY (order_id, line_no)
+);
+
+CREATE TABLE IF NOT EXISTS sync_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _phone_key(phone) -> str:
+    """Last 10 digits of a BD phone number, '' when too short."""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return digits[-10:] if len(digits) >= 10 else ""
+
+
+def _range_bounds(start, end) -> Tuple[Optional[str], Optional[str]]:
+    """ISO bounds for `date_created >= lo AND date_created < hi` (end date inclusive)."""
+    lo = hi = None
+    if start is not None:
+        lo = pd.Timestamp(start).strftime("%Y-%m-%dT%H:%M:%S")
+    if end is not None:
+        end_ts = pd.Timestamp(end)
+        if end_ts == end_ts.normalize():
+            end_ts += pd.Timedelta(days=1)
+        else:
+            end_ts += pd.Timedelta(seconds=1)
+        hi = end_ts.strftime("%Y-%m-%dT%H:%M:%S")
+    return lo, hi
+
+
+class WCOrderStore:
+    """SQLite-backed order + line item store. Safe to share across sessions."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.revision = 0  # bumped on every write to orders/line items (cache key for derived data)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    # ── Writes ───────────────────────────────────────────────────────────
+    def upsert_orders(self, orders: Iterable[Dict], only_newer: bool = False) -> int:
+        """
+        Insert or replace orders together with their line items. With
+        only_newer, orders older (by date_modified) than the stored copy are
+        skipped, so out-of-order webhook deliveries cannot roll data back.
+        """
+        orders = list(orders)
+        if only_newer and orders:
+            stored = self.date_modified([o.get("id") for o in orders])
+            orders = [
+                o for o in orders
+                if not stored.get(str(o.get("id"))) or (o.get("date_modified") or "") >= stored[str(o.get("id"))]
+            ]
+        order_rows, item_rows, ids = [], [], []
+        for order in orders:
+            order_id = str(order.get("id"))
+            billing = order.get("billing") or {}
+            shipping = order.get("shipping") or {}
+            ids.append((order_id,))
+            order_rows.append((
+                order_id,
+                order.get("status"),
+                order.get("date_created"),
+                order.get("date_modified"),
+                float(order.get("total") or 0),
+                order.get("currency"),
+                order.get("payment_method"),
+                order.get("customer_id"),
+                billing.get("first_name", ""),
+                billing.get("last_name", ""),
+                billing.get("email", ""),
+                billing.get("phone", ""),
+                _phone_key(billing.get("phone")),
+                billing.get("address_1", ""),
+                billing.get("city", ""),
+                shipping.get("city", ""),
+            ))
+            items = [i for i in order.get("line_items", []) if i.get("type") == "line_item"]
+            for line_no, (item, row) in enumerate(zip(items, _order_to_rows(order))):
+                item_rows.append((
+                    order_id, line_no, item.get("product_id"), item.get("variation_id"),
+                    row["Product Name"], item.get("sku", ""), row["Quantity"], row["Price"], row["Total Amount"],
+                ))
+
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM line_items WHERE order_id = ?", ids)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", order_rows
+            )
+            self._conn.executemany("INSERT INTO line_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", item_rows)
+            if order_rows:
+                self.revision += 1
+        return len(order_rows)
+
+    def date_modified(self, order_ids: Iterable) -> Dict[str, str]:
+        """Stored date_modified per order id (ids not held are omitted)."""
+        ids = [str(i) for i in order_ids]
+        if not ids:
+            return {}
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, date_modified FROM orders WHERE id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+        return {order_id: modified or "" for order_id, modified in rows}
+
+    def delete_orders(self, order_ids: Iterable[str]) -> int:
+        ids = [(str(i),) for i in order_ids]
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM line_items WHERE order_id = ?", ids)
+            cur = self._conn.executemany("DELETE FROM orders WHERE id = ?", ids)
+            if cur.rowcount:
+                self.revision += 1
+        return max(cur.rowcount, 0)
+
+    def delete_created_after(self, after: Optional[str]) -> int:
+        """Drop every order created at/after `after` (all orders when None)."""
+        where, params = ("WHERE date_created >= ?", (after,)) if after else ("", ())
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM line_items WHERE order_id IN (SELECT id FROM orders {where})", params)
+            cur = self._conn.execute(f"DELETE FROM orders {where}", params)
+            if cur.rowcount:
+                self.revision += 1
+        return max(cur.rowcount, 0)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: Optional[str]):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync_meta VALUES (?, ?)", (key, value))
+
+    # ── Reads ────────────────────────────────────────────────────────────
+    def _where(self, start=None, end=None, statuses: Optional[List[str]] = None,
+               phone: Optional[str] = None, alias: str = "o") -> Tuple[str, list]:
+        clauses, params = [], []
+        lo, hi = _range_bounds(start, end)
+        if lo:
+            clauses.append(f"{alias}.date_created >= ?")
+            params.append(lo)
+        if hi:
+            clauses.append(f"{alias}.date_created < ?")
+            params.append(hi)
+        statuses = [s for s in (statuses or []) if s and s != "any"]
+        if statuses:
+            clauses.append(f"{alias}.status IN ({','.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if phone is not None:
+            clauses.append(f"{alias}.phone_key = ?")
+            params.append(_phone_key(phone))
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def order_ids(self, created_after: Optional[str] = None) -> List[str]:
+        where, params = self._where(start=created_after)
+        with self._lock:
+            return [r[0] for r in self._conn.execute(f"SELECT o.id FROM orders o{where}", params)]
+
+    def query_orders(self, start=None, end=None, statuses: Optional[List[str]] = None,
+                     phone: Optional[str] = None) -> pd.DataFrame:
+        """One row per order with status, totals and billing fields."""
+        where, params = self._where(start, end, statuses, phone)
+        with self._lock:
+            df = pd.read_sql_query(f"SELECT o.* FROM orders o{where} ORDER BY o.date_created", self._conn, params=params)
+        df["date_created"] = pd.to_datetime(df["date_created"], errors="coerce")
+        return df
+
+    def query_dashboard_df(self, start=None, end=None, statuses: Optional[List[str]] = None,
+                           phone: Optional[str] = None) -> pd.DataFrame:
+        """Line items in transform_orders_to_dashboard_df format."""
+        where, params = self._where(start, end, statuses, phone)
+        sql = f"""
+            SELECT o.id AS "Order ID", o.date_created AS "Date", li.name AS "Product Name",
+                   li.unit_price AS "Price", li.quantity AS "Quantity", o.phone AS "Phone",
+                   li.total AS "Total Amount",
+                   TRIM(COALESCE(o.first_name, '') || ' ' || COALESCE(o.last_name, '')) AS "Customer Name",
+                   COALESCE(NULLIF(o.city, ''), o.shipping_city, '') AS "City"
+            FROM orders o JOIN line_items li ON li.order_id = o.id
+            {where}
+            ORDER BY o.date_created, li.order_id, li.line_no
+        """
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=params)
+        return _coerce_dashboard_types(df[DASHBOARD_COLUMNS])
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+
+class StoreDeltaSync(WCDeltaSync):
+    """WCDeltaSync writing into a WCOrderStore; watermark and coverage persist in the DB."""
+
+    fields = STORE_ORDER_FIELDS
+
+    def __init__(self, store: WCOrderStore, store_url: str, consumer_key: str, consumer_secret: str,
+                 api_version: str = "wc/v3", history_days: int = STORE_HISTORY_DAYS, **kwargs):
+        self.store = store
+        coverage = store.get_meta("coverage_start")
+        if not coverage:
+            tz_bd = timezone(timedelta(hours=6))
+            coverage = (datetime.now(tz_bd) - timedelta(days=history_days)).strftime("%Y-%m-%dT00:00:00")
+        super().__init__(store_url, consumer_key, consumer_secret, api_version,
+                         status="any", after=coverage, before=None, **kwargs)
+        self.watermark = store.get_meta("watermark")
+        self._sync_lock = threading.Lock()
+
+    def _replace_all(self, orders: List[Dict]):
+        self.store.delete_created_after(self.after)
+        self.store.upsert_orders(orders)
+
+    def _upsert(self, orders: List[Dict]):
+        self.store.upsert_orders(orders)
+
+    def _remove(self, order_ids: List[str]) -> int:
+        return self.store.delete_orders(order_ids) if order_ids else 0
+
+    def _held_ids(self) -> List[str]:
+        return self.store.order_ids(created_after=self.after)
+
+    def sync(self) -> Dict[str, int]:
+        stats = super().sync()
+        self.store.set_meta("coverage_start", self.after)
+        self.store.set_meta("watermark", self.watermark)
+        self.store.set_meta("synced_at", self.synced_at.strftime("%Y-%m-%d %H:%M:%S"))
+        return stats
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return self.store.query_dashboard_df(start=self.after)
+
+    def ensure_coverage(self, after: Optional[str]):
+        """
+        Backfill orders created between `after` and the current coverage start.
+        The delta watermark is left alone: only sync() may move it, so a
+        backfill before the first sync cannot skip the initial full fetch.
+        """
+        if not after or after >= self.after:
+            return
+        with self._sync_lock:
+            if after >= self.after:
+                return
+            orders = fetch_wc_orders(
+                store_url=self.store_url,
+                consumer_key=self.consumer_key,
+                consumer_secret=self.consumer_secret,
+                api_version=self.api_version,
+                per_page=100,
+                after=after,
+                before=self.after,
+                status="any",
+                fields=self.fields,
+                on_report=self._keep_report,
+            )
+            self.store.upsert_orders(orders)
+            self.after = after
+            self.store.set_meta("coverage_start", after)
+
+    def refresh(self, max_age: float = STORE_MIN_SYNC_INTERVAL, wait: bool = True) -> Optional[Dict[str, int]]:
+        """
+        Sync unless the last sync is younger than `max_age` seconds. Only one
+        caller syncs at a time; with wait=False concurrent callers skip.
+        """
+        if self.synced_at and (datetime.now() - self.synced_at).total_seconds() < max_age:
+            return None
+        if not self._sync_lock.acquire(blocking=wait):
+            return None
+        try:
+            if self.synced_at and (datetime.now() - self.synced_at).total_seconds() < max_age:
+                return None
+            return self.sync()
+        finally:
+            self._sync_lock.release()
+
+
+def _store_path(store_url: str) -> str:
+    host = re.sub(r"[^\w.-]", "_", _validate_url(store_url).split("://", 1)[-1])
+    return os.path.join(DATA_DIR, f"wc_orders_{host}.sqlite")
+
+
+@st.cache_resource(show_spinner=False)
+def get_order_store(store_url: str) -> WCOrderStore:
+    """Process-wide order store for one WooCommerce site."""
+    return WCOrderStore(_store_path(store_url))
+
+
+@st.cache_resource(show_spinner=False)
+def get_store_sync(store_url: str, consumer_key: str, consumer_secret: str,
+                   api_version: str = "wc/v3") -> StoreDeltaSync:
+    """The single sync process feeding get_order_store(store_url)."""
+    return StoreDeltaSync(get_order_store(store_url), store_url, consumer_key, consumer_secret, api_version)
+
+
+def load_from_order_store(
+    store_url: str,
+    consumer_key: str,
+    consumer_secret: str,
+    api_version: str = "wc/v3",
+    days_back: int = 30,
+    status: str = "completed",
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    max_age: float = STORE_MIN_SYNC_INTERVAL
+) -> tuple:
+    """
+    Drop-in replacement for load_from_woocommerce backed by the local store.
+
+    Returns:
+        tuple: (df, source_name, modified_at)
+    """
+    if not after or not before:
+        tz_bd = timezone(timedelta(hours=6))
+        end_date = datetime.now(tz_bd)
+        start_date = end_date - timedelta(days=days_back)
+        after = start_date.strftime("%Y-%m-%dT%H:%M:%S")
+        before = end_date.strftime("%Y-%m-%dT%H:%M:%S")
+
+    sync = get_store_sync(_validate_url(store_url), consumer_key, consumer_secret, api_version)
+    sync.ensure_coverage(after)
+    sync.refresh(max_age=max_age)
+
+    statuses = [s.strip() for s in str(status or "any").split(",")]
+    df = sync.store.query_dashboard_df(start=after, end=before, statuses=statuses)
+    source_name = f"wc_{store_url.replace('https://', '').replace('http://', '')}"
+    modified_at = (sync.synced_at or datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+    return df, source_name, modified_at
@@ -0,0 +1,191 @@
+"""
+WooCommerce Webhook Receiver
+============================
+Optional local HTTP endpoint for WooCommerce order webhooks. Deliveries for
+`order.created` / `order.updated` (and `order.deleted`) are verified against
+the webhook secret and written to the local order store as they arrive, so
+polling only has to run as a slow reconciliation pass.
+
+Enable by setting WC_WEBHOOK_SECRET (and optionally WC_WEBHOOK_PORT) and
+pointing the store's webhooks (WooCommerce > Settings > Advanced > Webhooks)
+at http://<host>:<port>/wc-webhook.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import web
+
+from app_modules.error_handler import log_error
+
+WEBHOOK_PATH = "/wc-webhook"
+WEBHOOK_DEFAULT_PORT = 8765
+UPSERT_TOPICS = ("order.created", "order.updated", "order.restored")
+DELETE_TOPICS = ("order.deleted",)
+
+
+def sign_payload(body: bytes, secret: str) -> str:
+    """X-WC-Webhook-Signature value: base64(HMAC-SHA256(secret, raw body))."""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+def verify_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """Constant-time check of a delivery's X-WC-Webhook-Signature header."""
+    if not signature or not secret:
+        return False
+    return hmac.compare_digest(sign_payload(body, secret), signature.strip())
+
+
+class WebhookReceiver:
+    """
+    aiohttp server on a daemon thread that applies verified order webhooks
+    to a WCOrderStore. `on_change(topic, order_id)` runs after each write.
+    """
+
+    def __init__(self, store, secret: str, host: str = "0.0.0.0", port: int = WEBHOOK_DEFAULT_PORT,
+                 path: str = WEBHOOK_PATH, on_change: Optional[Callable[[str, str], None]] = None):
+        self.store = store
+        self.secret = secret
+        self.host = host
+        self.port = port
+        self.path = path
+        self.on_change = on_change
+        self.stats: Dict[str, int] = {"received": 0, "applied": 0, "rejected": 0, "ignored": 0}
+        self.last_event_at: Optional[datetime] = None
+        self.latencies: List[float] = []
+        self._seen_deliveries: Dict[str, float] = {}
+        self._loop = None
+        self._runner = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host = "127.0.0.1" if self.host in ("0.0.0.0", "") else self.host
+        return f"http://{host}:{self.port}{self.path}"
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _apply(self, topic: str, order: Dict) -> bool:
+        order_id = str(order.get("id", ""))
+        if not order_id:
+            return False
+        if topic in DELETE_TOPICS:
+            self.store.delete_orders([order_id])
+        elif order.get("status") == "trash":
+            self.store.delete_orders([order_id])
+        else:
+            if not self.store.upsert_orders([order], only_newer=True):
+                return False
+        if self.on_change is not None:
+            self.on_change(topic, order_id)
+        return True
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        started = time.perf_counter()
+        body = await request.read()
+        self.stats["received"] += 1
+        topic = request.headers.get("X-WC-Webhook-Topic", "")
+
+        if not verify_signature(body, request.headers.get("X-WC-Webhook-Signature"), self.secret):
+            self.stats["rejected"] += 1
+            return web.json_response({"ok": False, "error": "invalid signature"}, status=401)
+
+        # WooCommerce pings a new webhook with a form body (webhook_id=..); acknowledge it
+        if topic not in UPSERT_TOPICS + DELETE_TOPICS:
+            self.stats["ignored"] += 1
+            return web.json_response({"ok": True, "ignored": topic or "ping"})
+
+        delivery_id = request.headers.get("X-WC-Webhook-Delivery-ID")
+        if delivery_id and delivery_id in self._seen_deliveries:
+            self.stats["ignored"] += 1
+            return web.json_response({"ok": True, "duplicate": delivery_id})
+
+        try:
+            order = json.loads(body)
+        except ValueError:
+            self.stats["rejected"] += 1
+            return web.json_response({"ok": False, "error": "invalid JSON"}, status=400)
+
+        try:
+            applied = await asyncio.get_running_loop().run_in_executor(None, self._apply, topic, order)
+        except Exception as e:
+            log_error(e, context="WooCommerce Webhook", details={"topic": topic})
+            return web.json_response({"ok": False, "error": str(e)}, status=500)
+
+        if delivery_id:
+            self._seen_deliveries[delivery_id] = time.time()
+            if len(self._seen_deliveries) > 5000:
+                for key in sorted(self._seen_deliveries, key=self._seen_deliveries.get)[:1000]:
+                    self._seen_deliveries.pop(key, None)
+        self.stats["applied" if applied else "ignored"] += 1
+        self.last_event_at = datetime.now()
+        self.latencies = (self.latencies + [time.perf_counter() - started])[-200:]
+        return web.json_response({"ok": True, "applied": applied})
+
+    def start(self) -> "WebhookReceiver":
+        if self.running:
+            return self
+        ready = threading.Event()
+        errors: List[BaseException] = []
+
+        def _run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            app = web.Application()
+            app.router.add_post(self.path, self._handle)
+            self._runner = web.AppRunner(app, access_log=None)
+            try:
+                self._loop.run_until_complete(self._runner.setup())
+                site = web.TCPSite(self._runner, self.host, self.port)
+                self._loop.run_until_complete(site.start())
+                self.port = site._server.sockets[0].getsockname()[1]
+            except BaseException as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_run, name="wc-webhook", daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        if errors:
+            raise errors[0]
+        return self
+
+    def stop(self):
+        if self._loop is not None and self.running:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+
+
+_RECEIVERS: Dict[str, WebhookReceiver] = {}
+_RECEIVERS_LOCK = threading.Lock()
+
+
+def get_webhook_receiver(store_url: str, store, secret: str, port: int = WEBHOOK_DEFAULT_PORT,
+                         on_change: Optional[Callable[[str, str], None]] = None) -> Optional[WebhookReceiver]:
+    """The receiver for `store_url`, started once per server process (None if it cannot bind)."""
+    with _RECEIVERS_LOCK:
+        receiver = _RECEIVERS.get(store_url)
+        if receiver is None:
+            receiver = WebhookReceiver(store, secret, port=port, on_change=on_change)
+            try:
+                receiver.start()
+            except OSError as e:
+                log_error(e, context="WooCommerce Webhook", details={"port": port})
+                return None
+            _RECEIVERS[store_url] = receiver
+        return receiver
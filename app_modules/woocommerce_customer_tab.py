@@ -9,11 +9,13 @@ import requests
 from datetime import datetime, timedelta
 import asyncio
 import aiohttp
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Callable, Sequence, Tuple, Union
 import time
 import urllib.parse
 
 from app_modules.error_handler import log_error
+from app_modules.wc_fetcher import FetchConfig, FetchReport, fetch_all_pages, fields_param
+from app_modules.wc_http import ProgressRelay, get_http_client, session_scope
 from app_modules.persistence import clear_state_keys
 from app_modules.ui_components import section_card, to_excel_bytes
 from app_modules.unified_reporting import (
@@ -63,19 +65,15 @@ def _validate_url(url: str) -> str:
     return url.rstrip('/')
 
 
+# Customer fields read by extract_customer_data (meta_data holds the WhatsApp keys)
+CUSTOMER_FIELDS = ("id", "email", "first_name", "last_name", "date_created", "billing", "meta_data")
+
+
 def _make_auth(consumer_key: str, consumer_secret: str) -> tuple:
     """Create authentication tuple for requests."""
     return (consumer_key, consumer_secret)
 
 
-async def _fetch_page_async(session: aiohttp.ClientSession, url: str, auth: aiohttp.BasicAuth, params: dict, page: int) -> List[Dict]:
-    """Helper to fetch a single page of customers asynchronously."""
-    params["page"] = page
-    async with session.get(url, auth=auth, params=params) as response:
-        response.raise_for_status()
-        return await response.json()
-
-
 async def _fetch_wc_customers_async(
     store_url: str,
     consumer_key: str,
@@ -84,52 +82,44 @@ async def _fetch_wc_customers_async(
     per_page: int = 100,
     after: Optional[str] = None,
     before: Optional[str] = None,
-    progress_bar: Optional[Any] = None
+    progress_bar: Optional[Any] = None,
+    fetch_config: Optional[FetchConfig] = None,
+    session: Optional[aiohttp.ClientSession] = None,
+    fields: Optional[Union[str, Sequence[str]]] = None,
+    on_report: Optional[Callable[[FetchReport], None]] = None
 ) -> List[Dict]:
     """Asynchronously fetch all customers from WooCommerce API with pagination."""
     base_url = f"{store_url}/wp-json/{api_version}/customers"
     auth = aiohttp.BasicAuth(consumer_key, consumer_secret)
-    all_customers = []
-
-    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
-        # First request to get total pages
-        params = {"per_page": per_page, "page": 1}
-        if after:
-            params["after"] = after
-        if before:
-            params["before"] = before
-
-        try:
-            async with session.get(base_url, auth=auth, params=params) as response:
-                response.raise_for_status()
-                total_pages = int(response.headers.get("X-WP-TotalPages", 1))
-                total_items = int(response.headers.get("X-WP-Total", 0))
-                if progress_bar:
-                    progress_bar.text(f"Fetching {total_items} customers...")
-
-                first_page_customers = await response.json()
-                if not first_page_customers:
-                    return []
-                all_customers.extend(first_page_customers)
-
-                if progress_bar:
-                    progress_bar.progress(1 / total_pages, text=f"Fetched page 1/{total_pages}")
-        except aiohttp.ClientResponseError as e:
-            if e.status == 401:
-                raise Exception("Authentication failed. Please check your Consumer Key and Secret.")
-            raise Exception(f"API Error: {e.status} - {e.message}")
-        except asyncio.TimeoutError:
-            raise Exception("Request timed out. Please check your connection.")
-        except aiohttp.ClientConnectionError:
-            raise Exception("Could not connect to the store. Please verify the URL.")
-
-        if total_pages > 1:
-            tasks = [_fetch_page_async(session, base_url, auth, params.copy(), page) for page in range(2, total_pages + 1)]
-            for i, future in enumerate(asyncio.as_completed(tasks)):
-                page_customers = await future
-                all_customers.extend(page_customers)
-                if progress_bar:
-                    progress_bar.progress((i + 2) / total_pages, text=f"Fetched page {i + 2}/{total_pages} ({len(all_customers)} customers)")
+
+    params = {"per_page": per_page}
+    if after:
+        params["after"] = after
+    if before:
+        params["before"] = before
+    if fields_param(fields):
+        params["_fields"] = fields_param(fields)
+
+    def _progress(done: int, total: int, items: int):
+        if progress_bar:
+            progress_bar.progress(done / max(total, 1), text=f"Fetched page {done}/{total} ({items} customers)")
+
+    try:
+        async with session_scope(session) as http:
+            all_customers, report = await fetch_all_pages(
+                http, base_url, params, auth=auth, config=fetch_config,
+                on_progress=_progress, label="customers"
+            )
+    except aiohttp.ClientResponseError as e:
+        if e.status == 401:
+            raise Exception("Authentication failed. Please check your Consumer Key and Secret.")
+        raise Exception(f"API Error: {e.status} - {e.message}")
+    except asyncio.TimeoutError:
+        raise Exception("Request timed out. Please check your connection.")
+    except aiohttp.ClientConnectionError:
+        raise Exception("Could not connect to the store. Please verify the URL.")
+    if on_report is not None:
+        on_report(report)
     return all_customers
 
 
@@ -141,7 +131,10 @@ def fetch_wc_customers(
     per_page: int = 100,
     after: Optional[str] = None,
     before: Optional[str] = None,
-    progress_bar: Optional[Any] = None
+    progress_bar: Optional[Any] = None,
+    fetch_config: Optional[FetchConfig] = None,
+    fields: Optional[Union[str, Sequence[str]]] = None,
+    on_report: Optional[Callable[[FetchReport], None]] = None
 ) -> List[Dict]:
     """
     Fetch all customers from WooCommerce API with pagination.
@@ -155,12 +148,16 @@ def fetch_wc_customers(
         after: ISO8601 date to filter customers created after
         before: ISO8601 date to filter customers created before
         progress_bar: Optional Streamlit progress bar
+        fetch_config: Concurrency/retry settings (default FetchConfig())
+        fields: `_fields` projection (e.g. CUSTOMER_FIELDS); None fetches full objects
+        on_report: Called with the fetch's FetchReport once all pages are in
         
     Returns:
         List of customer dictionaries
     """
-    try:
-        return asyncio.run(_fetch_wc_customers_async(
+    relay = ProgressRelay(progress_bar) if progress_bar else None
+    return get_http_client().run(
+        lambda session: _fetch_wc_customers_async(
             store_url=store_url,
             consumer_key=consumer_key,
             consumer_secret=consumer_secret,
@@ -168,10 +165,14 @@ def fetch_wc_customers(
             per_page=per_page,
             after=after,
             before=before,
-            progress_bar=progress_bar
-        ))
-    except Exception as e:
-        raise e
+            progress_bar=relay,
+            fetch_config=fetch_config,
+            session=session,
+            fields=fields,
+            on_report=on_report
+        ),
+        relay=relay
+    )
 
 
 def extract_customer_data(customers: List[Dict]) -> pd.DataFrame:
@@ -417,13 +418,16 @@ consumer_secret = "cs_xxxxxxxxxxxxxxxxxxxxxxxx"
                     st.error("Please provide Store URL, Consumer Key, and Consumer Secret.")
                 else:
                     progress_bar = st.progress(0, text="Connecting to WooCommerce...")
+                    reports: List[FetchReport] = []
                     try:
                         customers = fetch_wc_customers(
                             store_url=_validate_url(store_url),
                             consumer_key=consumer_key,
                             consumer_secret=consumer_secret,
                             api_version=api_version,
-                            progress_bar=progress_bar
+                            progress_bar=progress_bar,
+                            fields=CUSTOMER_FIELDS,
+                            on_report=reports.append
                         )
                         
                         if not customers:
@@ -468,6 +472,8 @@ consumer_secret = "cs_xxxxxxxxxxxxxxxxxxxxxxxx"
                         st.session_state["wc_fetch_success"] = True
                         progress_bar.empty()
                         st.success(f"✅ Successfully fetched and processed {len(df)} customers!")
+                        if reports:
+                            st.caption(f"📦 {reports[-1].summary()}")
                         
                     except Exception as e:
                         progress_bar.empty()
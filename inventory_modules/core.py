@@ -1,12 +1,34 @@
+import hashlib
 import math
 import io
+import multiprocessing
+import os
 import re
-from dataclasses import dataclass
-from typing import Dict, Tuple, Optional
-
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
 import pandas as pd
 from fuzzywuzzy import process
 
+try:
+    from rapidfuzz import fuzz as rf_fuzz, process as rf_process, utils as rf_utils
+except ImportError:
+    rf_process = None
+
+FUZZY_THRESHOLD = 85  # Require high confidence for auto-match
+FUZZY_TOP_K = 20  # candidates scored per unmatched key
+FUZZY_TIME_LIMIT = 10.0  # seconds for the whole fuzzy stage (candidates + scoring)
+FUZZY_SCORE_CHUNK = 20000  # pairs scored per batch between deadline checks
+FUZZY_FALLBACK_CHUNK = 500  # the same for the pure-Python fuzzywuzzy scorer
+FUZZY_FALLBACK_MAX_PAIRS = 20000  # pairs the fuzzywuzzy scorer may take on at all
+
 
 def normalize_key(val) -> str:
     """Normalize values from Excel/CSV so keys match reliably (e.g., 123.0 -> '123')."""
@@ -47,6 +69,62 @@ def normalize_size(val) -> str:
     return s
 
 
+_NO_SIZE_VARIANTS = ["no_size", "no size", "nosize", "no-size"]
+# "123.0" style spreadsheet numbers read as text (what normalize_key trims)
+_FLOAT_TEXT = r"^(?:\d+\.?\d*|\.\d+)\.0$"
+
+
+def normalize_keys(values: pd.Series) -> pd.Series:
+    """Column-wise normalize_key: string cells via .str ops, other cells once per distinct value."""
+    s = pd.Series(values)
+    try:
+        text = s.str.strip()
+    except AttributeError:  # no string cells at all (numeric or date column)
+        text = None
+    if text is None or not text.notna().any():
+        # Also object columns holding only non-strings (e.g. floats and datetimes):
+        # .str yields all-NaN there rather than raising
+        mapping = {v: normalize_key(v) for v in s.dropna().unique()}
+        return s.map(mapping).fillna("").astype(object)
+
+    trim = text.str.match(_FLOAT_TEXT, na=False)
+    text = text.where(~trim, text.str[:-2])
+    # Numbers/dates mixed into an object column (common in Excel sheets)
+    other = text.isna() & s.notna()
+    if other.any():
+        text[other] = s[other].map(normalize_key)
+    return text.fillna("").astype(object)
+
+
+def normalize_skus(values: pd.Series) -> pd.Series:
+    """Column-wise normalize_sku."""
+    return (
+        normalize_keys(values)
+        .str.replace(r"[^a-zA-Z0-9]", "", regex=True)
+        .str.upper()
+    )
+
+
+def normalize_sizes(values: pd.Series) -> pd.Series:
+    """Column-wise normalize_size."""
+    s = pd.Series(values)
+    text = s.astype(str).str.strip()
+    missing = s.isna() | (text == "")
+    text = text.where(~text.str.endswith(".0"), text.str[:-2])
+    missing |= text.str.casefold().isin(_NO_SIZE_VARIANTS)
+    return text.mask(missing, "NO_SIZE").astype(object)
+
+
+def parse_quantities(values: pd.Series) -> np.ndarray:
+    """Stock counts as int64: thousands separators dropped, blanks/garbage -> 0, fractions truncated."""
+    s = pd.Series(values)
+    if s.dtype == object or pd.api.types.is_string_dtype(s):
+        s = s.astype(str).str.replace(",", "", regex=False).str.strip()
+    qty = np.array(pd.to_numeric(s, errors="coerce"), dtype=float)
+    qty[~np.isfinite(qty)] = 0
+    return np.trunc(qty).astype(np.int64)
+
+
 def item_name_to_title_size(item_name: str) -> Tuple[str, str]:
     """
     Convert product list 'Item Name' into (title, size).
@@ -79,6 +157,25 @@ def build_title_size_key(title: str, size: str) -> str:
     return title_norm.casefold()
 
 
+def title_size_keys(item_names: pd.Series) -> pd.Series:
+    """Column-wise build_title_size_key(*item_name_to_title_size(name))."""
+    name = normalize_keys(item_names)
+    split = name.str.rsplit(" - ", n=1)
+    has_sep = name.str.contains(" - ", regex=False)
+    left = split.str[0].str.strip()
+    right = normalize_sizes(split.str[1].where(has_sep, "").str.strip())
+    sized = has_sep & (left != "") & (right != "") & (right != "NO_SIZE")
+    title = left.where(sized, name.str.strip())
+    size = right.where(sized, "NO_SIZE")
+
+    title = normalize_keys(title).str.strip()
+    size = normalize_sizes(size)
+    keys = title.where(
+        ~((size != "") & (size != "NO_SIZE")), title + " - " + size
+    ).str.casefold()
+    return keys.where(title != "", "")
+
+
 def identify_columns(
     df: pd.DataFrame,
 ) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
@@ -141,105 +238,602 @@ def get_group_by_column(df: pd.DataFrame) -> Optional[str]:
     return None
 
 
+def title_size_values(
+    df: pd.DataFrame, title_col: str, size_col: Optional[str]
+) -> pd.Series:
+    """'Title - Size' for every row ("Title" alone when the size is missing)."""
+    title = normalize_keys(df[title_col])
+    if not size_col or size_col not in df.columns:
+        return title
+    size = normalize_sizes(df[size_col])
+    sized = (title != "") & (size != "") & (size != "NO_SIZE")
+    return title.where(~sized, title + " - " + size)
+
+
 def add_title_size_column(
     df: pd.DataFrame, title_col: str, size_col: Optional[str]
 ) -> pd.DataFrame:
     """Add a 'Title - Size' column to an inventory dataframe."""
-
-    def _joined(r):
-        title = normalize_key(r.get(title_col, ""))
-        size = "NO_SIZE"
-        if size_col and size_col in df.columns:
-            size = normalize_size(r.get(size_col, ""))
-        if title and size and size != "NO_SIZE":
-            return f"{title} - {size}"
-        return title
-
     df = df.copy()
-    df["Title - Size"] = df.apply(_joined, axis=1)
+    df["Title - Size"] = title_size_values(df, title_col, size_col)
     return df
 
 
-def _read_uploaded(file_obj) -> pd.DataFrame:
-    file_obj.seek(0)
-    if getattr(file_obj, "name", "").endswith(".csv"):
-        return pd.read_csv(file_obj)
-    return pd.read_excel(file_obj)
+class InventoryMatrix(Mapping):
+    """
+    Stock counts as an items x locations int64 matrix.
 
+    Rows are Title-Size keys (casefolded) and normalized SKUs, in first-seen
+    order; `index` maps a key to its row. `sku_index` maps each SKU to the
+    Title-Size key it was listed under. Reads like the old
+    {key: {location: qty}} dict, so `key in inv`, `inv[key][loc]` and
+    `inv.get(key, {})` keep working.
+    """
 
-def load_inventory_from_uploads(uploaded_files: Dict[str, object]):
+    def __init__(
+        self,
+        keys: List[str],
+        locations: List[str],
+        quantities: np.ndarray,
+        sku_index: Optional[Dict[str, str]] = None,
+    ):
+        self.locations = list(locations)
+        self.matrix = np.asarray(quantities, dtype=np.int64).reshape(
+            len(keys), len(self.locations)
+        )
+        self.index: Dict[str, int] = {k: i for i, k in enumerate(keys)}
+        self.sku_index: Dict[str, str] = dict(sku_index or {})
+
+    @classmethod
+    def from_mapping(
+        cls,
+        inventory: Dict[str, Dict[str, int]],
+        locations: Optional[List[str]] = None,
+        sku_index: Optional[Dict[str, str]] = None,
+    ) -> "InventoryMatrix":
+        """Matrix from a {key: {location: qty}} dict (all locations it mentions by default)."""
+        keys = list(inventory)
+        if locations is None:
+            locations = list(dict.fromkeys(loc for k in keys for loc in inventory[k]))
+        quantities = np.array(
+            [[int(inventory[k].get(loc, 0)) for loc in locations] for k in keys],
+            dtype=np.int64,
+        )
+        return cls(keys, locations, quantities, sku_index)
+
+    def __getitem__(self, key: str) -> Dict[str, int]:
+        row = self.matrix[self.index[key]]
+        return dict(zip(self.locations, row.tolist()))
+
+    def __contains__(self, key) -> bool:
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def row(self, key: str) -> int:
+        """Row of `key`, or -1."""
+        return self.index.get(key, -1)
+
+    def totals(self) -> np.ndarray:
+        return self.matrix.sum(axis=1)
+
+    def name_keys(self) -> List[str]:
+        """Title-Size keys only (rows that are not SKUs)."""
+        return [k for k in self.index if k not in self.sku_index]
+
+
+def _read_location_bytes(content: bytes, name: str) -> pd.DataFrame:
+    if name.endswith(".csv"):
+        return pd.read_csv(io.BytesIO(content))
+    return pd.read_excel(io.BytesIO(content))
+
+
+def _location_entries(
+    df: pd.DataFrame, qty_col: Optional[str], sku_col: Optional[str]
+) -> pd.DataFrame:
     """
-    Build inventory mapping from uploaded inventory files.
-    Matching is based only on 'Title - Size' (computed from Title + Size).
+    Stock entries (key, title, qty, seq) of one enriched location file.
+
+    Row i contributes its Title-Size key at seq 2i and, when it has one, its
+    SKU at seq 2i+1 (`title` is the Title-Size key the entry belongs to).
+    Rows without a Title-Size are dropped.
     """
-    inventory: Dict[str, Dict[str, int]] = {}
-    sku_to_title_size: Dict[str, str] = (
-        {}
-    )  # sku_key -> Title-Size key (for SKU match validation)
-    all_locations = list(uploaded_files.keys())
-    warnings = []
-    enriched_dfs: Dict[str, pd.DataFrame] = {}
+    if qty_col and qty_col in df.columns:
+        qty = parse_quantities(df[qty_col])
+    else:
+        qty = np.zeros(len(df), dtype=np.int64)
+    keys = normalize_keys(df["Title - Size"]).str.casefold().to_numpy()
+    seq = 2 * np.arange(len(df))
+    names = pd.DataFrame({"key": keys, "title": keys, "qty": qty, "seq": seq})
+    names = names[names["key"] != ""]
+    if not sku_col or sku_col not in df.columns:
+        return names
+
+    skus = names.assign(
+        key=normalize_skus(df[sku_col]).to_numpy()[names.index], seq=names["seq"] + 1
+    )
+    skus = skus[skus["key"] != ""]
+    return pd.concat([names, skus]).sort_values("seq", kind="stable")
+
+
+@dataclass
+class ParsedLocation:
+    """One location file read, enriched with 'Title - Size' and reduced to stock entries."""
+
+    df: Optional[pd.DataFrame] = None
+    entries: Optional[pd.DataFrame] = None
+    warnings: List[str] = field(default_factory=list)
+
+
+def parse_location_file(loc_name: str, content: bytes, file_name: str) -> ParsedLocation:
+    """Parse one uploaded location file (runs in a worker process)."""
+    try:
+        df = _read_location_bytes(content, file_name)
+        size_col, qty_col, title_col, sku_col = identify_columns(df)
+
+        if not title_col:
+            return ParsedLocation(
+                warnings=[f"⚠️ {loc_name}: Missing 'Title/Item Name' column. Skipped."]
+            )
+
+        warnings = []
+        if not qty_col:
+            warnings.append(
+                f"⚠️ {loc_name}: Missing 'Quantity' column. Assuming 0 stock."
+            )
+
+        df = add_title_size_column(df, title_col=title_col, size_col=size_col)
+        return ParsedLocation(df, _location_entries(df, qty_col, sku_col), warnings)
+
+    except Exception as e:
+        return ParsedLocation(warnings=[f"❌ Error in {loc_name}: {e}"])
+
+
+class LocationParseCache:
+    """
+    ParsedLocation per (location, content md5), least recently used dropped
+    first. Shared across reruns so unchanged uploads are not parsed again.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Tuple[str, str], ParsedLocation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[ParsedLocation]:
+        with self._lock:
+            parsed = self._items.get(key)
+            if parsed is not None:
+                self._items.move_to_end(key)
+            return parsed
+
+    def put(self, key: Tuple[str, str], parsed: ParsedLocation):
+        with self._lock:
+            self._items[key] = parsed
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+_PARSE_POOL: Optional[ProcessPoolExecutor] = None
+_PARSE_POOL_LOCK = threading.Lock()
+
+
+def _parse_pool() -> ProcessPoolExecutor:
+    """
+    Process-wide parse pool, created on first use. Workers are spawned, not
+    forked: forking the threaded Streamlit server can copy locks held by
+    other threads into the child and deadlock it. Spawning is slow, so the
+    pool is kept for the life of the process (workers start on demand).
+    """
+    global _PARSE_POOL
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is None:
+            _PARSE_POOL = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _PARSE_POOL
+
+
+def _drop_parse_pool(pool: ProcessPoolExecutor):
+    global _PARSE_POOL
+    with _PARSE_POOL_LOCK:
+        if _PARSE_POOL is pool:
+            _PARSE_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_in_pool(
+    jobs: Dict[str, Tuple[bytes, str]], max_workers: Optional[int]
+) -> Dict[str, ParsedLocation]:
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return {loc: parse_location_file(loc, *job) for loc, job in jobs.items()}
+    pool = None
+    try:
+        # Excel parsing holds the GIL, so files are spread over processes
+        pool = _parse_pool()
+        futures = {
+            loc: pool.submit(parse_location_file, loc, *job)
+            for loc, job in jobs.items()
+        }
+        return {loc: fut.result() for loc, fut in futures.items()}
+    except (BrokenProcessPool, OSError):
+        if pool is not None:
+            _drop_parse_pool(pool)
+        return {loc: parse_location_file(loc, *job) for loc, job in jobs.items()}
+
+
+def parse_location_uploads(
+    uploaded_files: Dict[str, object],
+    cache: Optional[LocationParseCache] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, ParsedLocation]:
+    """
+    Parse every uploaded location file; files not in `cache` are parsed
+    concurrently with a process pool, then cached by content hash.
+    """
+    parsed: Dict[str, ParsedLocation] = {}
+    jobs: Dict[str, Tuple[bytes, str]] = {}
+    keys: Dict[str, Tuple[str, str]] = {}
 
     for loc_name, file_obj in uploaded_files.items():
         if file_obj is None:
             continue
         try:
-            df = _read_uploaded(file_obj)
-            size_col, qty_col, title_col, sku_col = identify_columns(df)
-
-            if not title_col:
-                warnings.append(
-                    f"⚠️ {loc_name}: Missing 'Title/Item Name' column. Skipped."
-                )
-                continue
-
-            if not qty_col:
-                warnings.append(
-                    f"⚠️ {loc_name}: Missing 'Quantity' column. Assuming 0 stock."
-                )
-
-            df = add_title_size_column(df, title_col=title_col, size_col=size_col)
-            enriched_dfs[loc_name] = df
-
-            for _, row in df.iterrows():
-                qty = 0
-                if qty_col and qty_col in df.columns:
-                    try:
-                        val = row[qty_col]
-                        if pd.notna(val):
-                            if isinstance(val, str):
-                                val = val.replace(",", "").strip()
-                                if val == "":
-                                    val = 0
-                            qty = int(float(val))
-                    except Exception:
-                        qty = 0
-
-                joined = normalize_key(row.get("Title - Size", ""))
-                key = joined.casefold() if joined else ""
-                if not key:
-                    continue
-                if key not in inventory:
-                    inventory[key] = {loc: 0 for loc in all_locations}
-                inventory[key][loc_name] += qty
-                # Also index by SKU; record which Title-Size this SKU has (require item name == Title-Size when matching by SKU)
-                if sku_col and sku_col in df.columns:
-                    sku_val = row.get(sku_col, "")
-                    sku_key = normalize_sku(sku_val)
-                    if sku_key:
-                        if sku_key not in inventory:
-                            inventory[sku_key] = {loc: 0 for loc in all_locations}
-                        inventory[sku_key][loc_name] += qty
-                        sku_to_title_size[sku_key] = (
-                            key  # SKU -> Title-Size key for this row
-                        )
-
+            file_obj.seek(0)
+            content = file_obj.read()
         except Exception as e:
-            warnings.append(f"❌ Error in {loc_name}: {e}")
+            parsed[loc_name] = ParsedLocation(warnings=[f"❌ Error in {loc_name}: {e}"])
+            continue
+        keys[loc_name] = (loc_name, hashlib.md5(content).hexdigest())
+        hit = cache.get(keys[loc_name]) if cache is not None else None
+        if hit is not None:
+            parsed[loc_name] = hit
+        else:
+            jobs[loc_name] = (content, getattr(file_obj, "name", ""))
 
+    if jobs:
+        for loc_name, result in _parse_in_pool(jobs, max_workers).items():
+            parsed[loc_name] = result
+            if cache is not None:
+                cache.put(keys[loc_name], result)
+    return parsed
+
+
+def build_inventory(
+    all_locations: List[str], parsed: Dict[str, ParsedLocation]
+) -> Tuple["InventoryMatrix", List[str], Dict[str, pd.DataFrame], Dict[str, str]]:
+    """Aggregate parsed location files into (InventoryMatrix, warnings, enriched_dfs, sku_to_title_size)."""
+    warnings = []
+    enriched_dfs: Dict[str, pd.DataFrame] = {}
+    parts: List[pd.DataFrame] = []
+    for loc_pos, loc_name in enumerate(all_locations):
+        result = parsed.get(loc_name)
+        if result is None:
+            continue
+        warnings.extend(result.warnings)
+        if result.df is not None:
+            enriched_dfs[loc_name] = result.df
+            parts.append(result.entries.assign(loc=loc_pos))
+
+    if not parts:
+        empty = InventoryMatrix([], all_locations, np.zeros((0, len(all_locations))))
+        return empty, warnings, enriched_dfs, {}
+
+    entries = pd.concat(parts, ignore_index=True)
+    codes, keys = pd.factorize(entries["key"])
+    stock = entries.groupby([codes, entries["loc"].to_numpy()], sort=False)["qty"].sum()
+    quantities = np.zeros((len(keys), len(all_locations)), dtype=np.int64)
+    quantities[
+        stock.index.get_level_values(0), stock.index.get_level_values(1)
+    ] = stock.to_numpy()
+
+    is_sku = (entries["seq"].to_numpy() % 2) == 1
+    sku_to_title_size: Dict[str, str] = dict(
+        zip(entries["key"].to_numpy()[is_sku], entries["title"].to_numpy()[is_sku])
+    )
+    inventory = InventoryMatrix(list(keys), all_locations, quantities, sku_to_title_size)
     return inventory, warnings, enriched_dfs, sku_to_title_size
 
 
+def load_inventory_from_uploads(
+    uploaded_files: Dict[str, object],
+    cache: Optional[LocationParseCache] = None,
+    max_workers: Optional[int] = None,
+):
+    """
+    Build inventory mapping from uploaded inventory files.
+    Matching is based only on 'Title - Size' (computed from Title + Size).
+
+    Returns (InventoryMatrix, warnings, enriched_dfs, sku_to_title_size).
+    SKUs are rows of the matrix too; sku_to_title_size keeps the Title-Size
+    key of the last row that listed each SKU. Pass a LocationParseCache to
+    skip re-parsing files whose content has not changed.
+    """
+    parsed = parse_location_uploads(uploaded_files, cache, max_workers)
+    return build_inventory(list(uploaded_files.keys()), parsed)
+
+
+def _requested_quantities(df: pd.DataFrame, qty_col: Optional[str]) -> np.ndarray:
+    """Ordered quantity per row (1 when missing or unreadable)."""
+    if not qty_col or qty_col not in df.columns:
+        return np.ones(len(df), dtype=np.int64)
+    col = df[qty_col]
+    if col.dtype == object:
+        col = col.map(lambda v: v.strip() if isinstance(v, str) else v)
+    qty = np.array(pd.to_numeric(col, errors="coerce"), dtype=float)
+    qty[~np.isfinite(qty)] = 1
+    return np.trunc(qty).astype(np.int64)
+
+
+_WORD = re.compile(r"\w+")
+
+
+def _title_and_size(key: str) -> Tuple[str, str]:
+    if " - " in key:
+        title, size = key.rsplit(" - ", 1)
+        return title, size
+    return key, ""
+
+
+class FuzzyKeyIndex:
+    """
+    Blocking index for fuzzy Title-Size matching.
+
+    Keys are bucketed by size and by the 3-character prefix of each title
+    word, so "polo shirtt - m" is only compared with "- m" keys sharing
+    "pol"/"shi". Per query, the blocks are read smallest first up to
+    `max_block_ids` ids, and the `top_k` keys sharing the most blocks are
+    the candidates.
+    """
+
+    def __init__(self, keys: List[str], top_k: int = FUZZY_TOP_K, max_block_ids: int = 5000):
+        self.keys = list(keys)
+        self.top_k = top_k
+        self.max_block_ids = max_block_ids
+        blocks = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for block in self._blocks(key):
+                blocks[block].append(i)
+        self.blocks = {b: np.array(ids, dtype=np.int64) for b, ids in blocks.items()}
+
+    @staticmethod
+    def _blocks(key: str) -> set:
+        title, size = _title_and_size(key)
+        return {(size, word[:3]) for word in _WORD.findall(title)}
+
+    def candidates(self, key: str) -> np.ndarray:
+        """Ids of up to top_k keys to score against `key`, in key order."""
+        postings = sorted(
+            (self.blocks[b] for b in self._blocks(key) if b in self.blocks), key=len
+        )
+        if not postings:
+            return np.empty(0, dtype=np.int64)
+        taken, budget = [], self.max_block_ids
+        for ids in postings:
+            if taken and len(ids) > budget:
+                break
+            taken.append(ids[:budget])
+            budget -= len(taken[-1])
+        ids, shared = np.unique(np.concatenate(taken), return_counts=True)
+        if len(ids) > self.top_k:
+            ids = np.sort(ids[np.argpartition(-shared, self.top_k - 1)[: self.top_k]])
+        return ids
+
+
+def _score_pairs(queries: List[str], choices: List[str]) -> np.ndarray:
+    """WRatio (0-100) of each (query, choice) pair."""
+    if rf_process is not None:
+        return rf_process.cpdist(
+            queries,
+            choices,
+            scorer=rf_fuzz.WRatio,
+            processor=rf_utils.default_process,
+            workers=-1,
+        )
+    return np.array(
+        [process.extractOne(q, [c])[1] for q, c in zip(queries, choices)], dtype=float
+    )
+
+
+def fuzzy_match_keys(
+    queries: List[str],
+    index: FuzzyKeyIndex,
+    threshold: int = FUZZY_THRESHOLD,
+    time_limit: Optional[float] = FUZZY_TIME_LIMIT,
+) -> List[Tuple[Optional[str], str]]:
+    """
+    (inventory key or None, status) per query: its best blocked candidate
+    when the score reaches `threshold`.
+
+    `time_limit` covers the whole stage: candidate gathering and scoring.
+    Pairs are scored in batches that end on a query boundary, with the
+    deadline checked between batches. Without rapidfuzz, the slow fallback
+    scorer also stops taking queries after FUZZY_FALLBACK_MAX_PAIRS pairs.
+    Queries left unscored are reported as timed out.
+    """
+    deadline = time.monotonic() + time_limit if time_limit is not None else None
+
+    def _expired() -> bool:
+        return deadline is not None and time.monotonic() > deadline
+
+    if rf_process is not None:
+        chunk, max_pairs = FUZZY_SCORE_CHUNK, None
+    else:
+        chunk, max_pairs = FUZZY_FALLBACK_CHUNK, FUZZY_FALLBACK_MAX_PAIRS
+    pair_query, pair_choice = [], []
+    reached = len(queries)
+    for qi, key in enumerate(queries):
+        if _expired():
+            reached = qi
+            break
+        ids = index.candidates(key)
+        if max_pairs is not None and len(pair_query) + len(ids) > max_pairs:
+            reached = qi
+            break
+        pair_query.extend([qi] * len(ids))
+        pair_choice.extend(ids.tolist())
+
+    pair_query = np.asarray(pair_query, dtype=np.int64)
+    scores = np.empty(len(pair_query), dtype=float)
+    scored = 0
+    while scored < len(pair_query) and not _expired():
+        end = min(scored + chunk, len(pair_query))
+        # Extend to the last pair of the current query so no query is half-scored
+        end = int(np.searchsorted(pair_query, pair_query[end - 1], side="right"))
+        scores[scored:end] = _score_pairs(
+            [queries[q] for q in pair_query[scored:end]],
+            [index.keys[c] for c in pair_choice[scored:end]],
+        )
+        scored = end
+    if scored < len(pair_query):
+        reached = min(reached, int(pair_query[scored]))
+
+    results: List[Tuple[Optional[str], str]] = [(None, "No Match")] * len(queries)
+    for qi in range(reached, len(queries)):
+        results[qi] = (None, "No Match (Fuzzy search timed out)")
+    if not scored:
+        return results
+
+    pairs = pd.DataFrame(
+        {"query": pair_query[:scored], "choice": pair_choice[:scored], "score": scores[:scored]}
+    )
+    best = pairs.loc[pairs.groupby("query", sort=False)["score"].idxmax()]
+    for qi, ci, score in best.itertuples(index=False):
+        best_match, score = index.keys[ci], int(round(score))
+        if score >= threshold:
+            results[qi] = (best_match, f"Fuzzy Match ({score}%) -> {best_match}")
+        else:
+            results[qi] = (None, f"No Match (Closest: {best_match} @ {score}%)")
+    return results
+
+
+def match_inventory_keys(
+    pl_keys: pd.Series,
+    pl_skus: pd.Series,
+    inventory: InventoryMatrix,
+    sku_to_inv_key: Dict[str, str],
+    fuzzy_threshold: int = FUZZY_THRESHOLD,
+    fuzzy_time_limit: Optional[float] = FUZZY_TIME_LIMIT,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resolve product rows to inventory keys, one masked join per rule.
+    Returns (inventory key or None, match status) arrays.
+
+    Embroidered Cotton Panjabi rows match by SKU only. Other rows try the
+    exact Title-Size key, then the SKU, then a fuzzy name match of the same
+    size (see FuzzyKeyIndex).
+    """
+    n = len(pl_keys)
+    keys = pl_keys.to_numpy(dtype=object)
+    has_key = keys != ""
+    name_hit = has_key & pl_keys.isin(inventory.index.keys()).to_numpy()
+
+    skus = pl_skus.to_numpy(dtype=object)
+    has_sku = skus != ""
+    sku_titles = pl_skus.map(sku_to_inv_key).to_numpy(dtype=object)
+    sku_hit = has_sku & pl_skus.isin(sku_to_inv_key.keys()).to_numpy()
+    sku_agrees = sku_hit & (sku_titles == keys)
+
+    inv_keys = np.full(n, None, dtype=object)
+    statuses = np.full(n, "No Match", dtype=object)
+
+    # Strict SKU rule for Embroidered Cotton Panjabi
+    panjabi = has_key & pl_keys.str.contains(
+        "embroidered cotton panjabi", regex=False
+    ).to_numpy()
+    stage = panjabi & sku_hit
+    inv_keys[stage] = sku_titles[stage]
+    statuses[stage] = "SKU Match (Strict mode for Panjabi -> " + sku_titles[stage].astype(str) + ")"
+    statuses[stage & name_hit & sku_agrees] = "Perfect Match (Name + SKU)"
+    statuses[panjabi & ~sku_hit] = (
+        "No Match (Strict SKU required for Embroidered Cotton Panjabi)"
+    )
+
+    # Priority 1: Exact Name Match
+    stage = ~panjabi & name_hit
+    inv_keys[stage] = keys[stage]
+    statuses[stage & ~has_sku] = "Exact Name Match"
+    statuses[stage & has_sku & ~sku_hit] = "Name Match (SKU not in Inv)"
+    statuses[stage & sku_hit] = "Name Match (SKU mismatch)"
+    statuses[stage & sku_agrees] = "Perfect Match (Name + SKU)"
+
+    # Priority 2: Strict Normalized SKU Match
+    stage = ~panjabi & ~name_hit & sku_hit
+    inv_keys[stage] = sku_titles[stage]
+    statuses[stage] = "SKU Match (Name mismatch -> " + sku_titles[stage].astype(str) + ")"
+
+    # Priority 3: Fuzzy Name Match (Correction for typos), once per distinct key
+    stage = ~panjabi & ~name_hit & ~sku_hit & has_key
+    if stage.any():
+        # We only fuzzy match against non-SKU keys (Title-Size keys)
+        index = FuzzyKeyIndex([k for k in inventory.index if k not in sku_to_inv_key])
+        rows = np.flatnonzero(stage)
+        codes, distinct = pd.factorize(keys[rows])
+        matches = fuzzy_match_keys(
+            list(distinct), index, fuzzy_threshold, fuzzy_time_limit
+        )
+        inv_keys[rows] = np.array([m[0] for m in matches], dtype=object)[codes]
+        statuses[rows] = np.array([m[1] for m in matches], dtype=object)[codes]
+
+    return inv_keys, statuses
+
+
+def _dispatch_suggestions(
+    df: pd.DataFrame,
+    stock: np.ndarray,
+    needed: np.ndarray,
+    locations: list[str],
+) -> List[str]:
+    """
+    Per order: the first location that can ship every line, else greedily the
+    location covering the most remaining lines until nothing more is covered.
+    """
+    suggestions = ["N/A"] * len(df)
+    group_col = get_group_by_column(df)
+    if not group_col:
+        return suggestions
+
+    covers = stock >= needed[:, None]  # rows x locations
+    for rows in df.groupby(group_col).indices.values():
+        remaining = np.asarray(rows)
+        if not locations:
+            for idx in remaining:
+                suggestions[idx] = "OOS / No Match"
+            continue
+
+        # 1. A SINGLE location that can fulfill ALL items (in 'locations' order)
+        full = covers[remaining].all(axis=0)
+        if full.any():
+            loc = locations[int(np.argmax(full))]
+            for idx in remaining:
+                suggestions[idx] = loc
+            continue
+
+        # 2. Multi-parcel minimization: loc with MOST fulfillment, then repeat
+        while len(remaining):
+            counts = covers[remaining].sum(axis=0)
+            best = int(np.argmax(counts))
+            if counts[best] == 0:
+                for idx in remaining:
+                    suggestions[idx] = "OOS / No Match"
+                break
+            hit = covers[remaining, best]
+            for idx in remaining[hit]:
+                suggestions[idx] = locations[best]
+            remaining = remaining[~hit]
+    return suggestions
+
+
 def add_stock_columns_from_inventory(
     product_df: pd.DataFrame,
     item_name_col: str,
@@ -247,212 +841,160 @@ def add_stock_columns_from_inventory(
     locations: list[str],
     sku_col: Optional[str] = None,
     sku_to_title_size: Optional[Dict[str, str]] = None,
+    fuzzy_threshold: int = FUZZY_THRESHOLD,
+    fuzzy_time_limit: Optional[float] = FUZZY_TIME_LIMIT,
 ) -> Tuple[pd.DataFrame, int]:
     """
     Add one column per location to product_df by matching Item Name -> Title - Size,
     or by SKU when available. When matching by SKU, item name must equal that SKU's Title-Size.
+    Names with no exact or SKU match take the closest same-size key scoring
+    at least `fuzzy_threshold` (0-100).
+    `inventory` is an InventoryMatrix or a {key: {location: qty}} dict.
     Returns (output_df, matched_row_count).
     """
     df = product_df.copy()
-    matched = set()
     sku_to_inv_key = sku_to_title_size or {}
-
-    # Pre-calculate match status and stock keys for each row
-    match_statuses = []
-    stock_sources = []  # list of inventory keys to pull stock from
-
-    # Helper to safe-get SKU from row
-    def get_sku(r):
-        if sku_col and sku_col in df.columns:
-            val = r.get(sku_col, "")
-            if val:
-                return normalize_sku(val)
-        return ""
-
-    for i, row in df.iterrows():
-        # 1. Get Product List SKU and Item Name Key
-        pl_sku = get_sku(row)
-        title, size = item_name_to_title_size(row.get(item_name_col, ""))
-        pl_key = build_title_size_key(title, size)
-
-        inv_key = None
-        status = "No Match"
-
-        # 2. MATCHING LOGIC
-        is_embroidered_panjabi = pl_key and "embroidered cotton panjabi" in pl_key
-
-        if is_embroidered_panjabi:
-            if pl_sku and pl_sku in sku_to_inv_key:
-                inv_key = sku_to_inv_key[pl_sku]
-                if pl_key and pl_key in inventory and sku_to_inv_key[pl_sku] == pl_key:
-                    status = "Perfect Match (Name + SKU)"
-                else:
-                    status = f"SKU Match (Strict mode for Panjabi -> {inv_key})"
-            else:
-                status = "No Match (Strict SKU required for Embroidered Cotton Panjabi)"
-        else:
-            # Priority 1: Exact Name Match
-            if pl_key and pl_key in inventory:
-                inv_key = pl_key
-                status = "Exact Name Match"
-                if pl_sku:
-                    if pl_sku in sku_to_inv_key:
-                        status = (
-                            "Perfect Match (Name + SKU)"
-                            if sku_to_inv_key[pl_sku] == pl_key
-                            else f"Name Match (SKU mismatch)"
-                        )
-                    else:
-                        status = "Name Match (SKU not in Inv)"
-
-            # Priority 2: Strict Normalized SKU Match
-            elif pl_sku and pl_sku in sku_to_inv_key:
-                inv_key = sku_to_inv_key[pl_sku]
-                status = f"SKU Match (Name mismatch -> {inv_key})"
-
-            # Priority 3: Fuzzy Name Match (Correction for typos)
-            elif pl_key:
-                # We only fuzzy match against non-SKU keys (Title-Size keys)
-                name_keys = [k for k in inventory.keys() if k not in sku_to_inv_key]
-                if name_keys:
-                    best_match, score = process.extractOne(pl_key, name_keys)
-                    if score >= 85:  # Require high confidence for auto-match
-                        inv_key = best_match
-                        status = f"Fuzzy Match ({score}%) -> {best_match}"
-                    else:
-                        status = f"No Match (Closest: {best_match} @ {score}%)"
-                else:
-                    status = "No Match"
-            else:
-                status = "No Match"
-
-        match_statuses.append(status)
-        stock_sources.append(inv_key)
-        if inv_key:
-            matched.add(i)
-
-    # Assign Status Column
-    df["Match Status"] = match_statuses
-
-    # 3. Assign Stock Columns & Calculate Fulfillment Summary
-    stock_summary = []
+    if not isinstance(inventory, InventoryMatrix):
+        inventory = InventoryMatrix.from_mapping(inventory)
+
+    # 1. Product List SKU and Item Name keys for all rows
+    pl_keys = title_size_keys(df[item_name_col].reset_index(drop=True))
+    if sku_col and sku_col in df.columns:
+        raw_sku = df[sku_col].reset_index(drop=True)
+        falsy = raw_sku.isna() | raw_sku.isin([0, ""])
+        pl_skus = normalize_skus(raw_sku).where(~falsy, "")
+    else:
+        pl_skus = pd.Series("", index=pl_keys.index, dtype=object)
+
+    # 2. MATCHING LOGIC
+    inv_keys, statuses = match_inventory_keys(
+        pl_keys, pl_skus, inventory, sku_to_inv_key, fuzzy_threshold, fuzzy_time_limit
+    )
+    df["Match Status"] = statuses
+
+    # 3. Stock per location & Fulfillment Summary
+    rows = pd.Series(inv_keys).map(inventory.index).fillna(-1).to_numpy(dtype=np.int64)
+    found = rows >= 0
+    # row -1 (no inventory key) reads the appended 0
+    total_avail = np.append(inventory.totals(), 0)[rows]
+
+    stock = np.zeros((len(df), len(locations)), dtype=np.int64)
+    for j, loc in enumerate(locations):
+        if loc in inventory.locations:
+            col = inventory.locations.index(loc)
+            stock[found, j] = inventory.matrix[rows[found], col]
 
     # Try to find a quantity column in the product list (how many did the user order?)
     _, qty_to_buy_col, _, _ = identify_columns(df)
-
-    for i, source_key in enumerate(stock_sources):
-        total_avail = 0
-        if source_key and source_key in inventory:
-            total_avail = sum(inventory[source_key].values())
-
-        # Determine Status
-        requested_qty = 1  # Default
-        if qty_to_buy_col and qty_to_buy_col in df.columns:
-            try:
-                val = df.iloc[i][qty_to_buy_col]
-                requested_qty = int(float(val)) if pd.notna(val) else 1
-            except:
-                requested_qty = 1
-
-        if not source_key:
-            stock_summary.append("❌ No Match")
-        elif total_avail == 0:
-            stock_summary.append("❌ OOS")
-        elif total_avail >= requested_qty:
-            stock_summary.append("✅ Available")
-        else:
-            stock_summary.append(f"⚠️ Partial ({total_avail}/{requested_qty})")
-
-    df["Fulfillment"] = stock_summary
+    requested = _requested_quantities(df, qty_to_buy_col)
+
+    matched = np.array([bool(k) for k in inv_keys], dtype=bool)
+    fulfillment = np.where(total_avail >= requested, "✅ Available", "")
+    fulfillment = fulfillment.astype(object)
+    partial = total_avail < requested
+    fulfillment[partial] = [
+        f"⚠️ Partial ({a}/{r})" for a, r in zip(total_avail[partial], requested[partial])
+    ]
+    fulfillment[total_avail == 0] = "❌ OOS"
+    fulfillment[~matched] = "❌ No Match"
+    df["Fulfillment"] = fulfillment
 
     # 4. Assign individual location columns
-    for loc in locations:
-        vals = []
-        for i, source_key in enumerate(stock_sources):
-            qty = 0
-            if source_key and source_key in inventory:
-                qty = inventory[source_key].get(loc, 0)
-            vals.append(qty)
-        df[loc] = vals
+    for j, loc in enumerate(locations):
+        df[loc] = stock[:, j]
 
     # 5. Intelligent Dispatch Suggestion
-    dispatch_suggestions = ["N/A"] * len(df)
-    group_col = get_group_by_column(df)
-
-    if group_col:
-        # Create a helper for quantities
-        qty_needed = [1] * len(df)
-        if qty_to_buy_col and qty_to_buy_col in df.columns:
-            qty_needed = [
-                int(float(x)) if pd.notna(x) else 1 for x in df[qty_to_buy_col]
-            ]
-
-        # Group data to optimize per order
-        for _, group_indices in df.groupby(group_col).groups.items():
-            # For this order, find the best location(s)
-            remaining_indices = list(group_indices)
-
-            # 1. Try to find a SINGLE location that can fulfill ALL items in the order
-            best_single_loc = None
-            for loc in locations:
-                all_match = True
-                for idx in group_indices:
-                    source_key = stock_sources[idx]
-                    needed = qty_needed[idx]
-                    avail = (
-                        inventory.get(source_key, {}).get(loc, 0) if source_key else 0
-                    )
-                    if avail < needed:
-                        all_match = False
-                        break
-                if all_match:
-                    best_single_loc = loc
-                    break  # Prioritize Ecom -> Mirpur -> ... as defined in 'locations'
-
-            if best_single_loc:
-                for idx in group_indices:
-                    dispatch_suggestions[idx] = best_single_loc
-            else:
-                # 2. Multi-parcel minimization: Find loc with MOST fulfillment, then repeat
-                while remaining_indices:
-                    best_loc = None
-                    max_covered = -1
-                    covered_indices = []
-
-                    for loc in locations:
-                        current_covered = []
-                        for idx in remaining_indices:
-                            source_key = stock_sources[idx]
-                            needed = qty_needed[idx]
-                            avail = (
-                                inventory.get(source_key, {}).get(loc, 0)
-                                if source_key
-                                else 0
-                            )
-                            if avail >= needed:
-                                current_covered.append(idx)
-
-                        if len(current_covered) > max_covered:
-                            max_covered = len(current_covered)
-                            best_loc = loc
-                            covered_indices = current_covered
-
-                    if best_loc and covered_indices:
-                        for idx in covered_indices:
-                            dispatch_suggestions[idx] = best_loc
-                        remaining_indices = [
-                            i for i in remaining_indices if i not in covered_indices
-                        ]
-                    else:
-                        # OOS items remaining
-                        for idx in remaining_indices:
-                            dispatch_suggestions[idx] = "OOS / No Match"
-                        break
-
-    df["Dispatch Suggestion"] = dispatch_suggestions
+    df["Dispatch Suggestion"] = _dispatch_suggestions(df, stock, requested, locations)
 
     # Reorder Match Status to the end
     cols = [c for c in df.columns if c != "Match Status"] + ["Match Status"]
     df = df[cols]
 
-    return df, len(matched)
+    return df, int(matched.sum())
+
+
+class DistributionIndex:
+    """
+    Search and stock filters over an analysed distribution table, built once
+    per analysis. Lookups return sorted row positions for `df.iloc`.
+
+    Titles are lowercased once and indexed by character trigram, so a
+    substring query is answered by intersecting the posting lists of its
+    trigrams and confirming the few candidates with `in`. Per-location stock
+    and totals are kept as arrays, with rows presorted by total for
+    low-stock views.
+    """
+
+    def __init__(self, df: pd.DataFrame, title_col: str, locations: List[str]):
+        self.df = df
+        self.locations = [loc for loc in locations if loc in df.columns]
+        self.titles: List[str] = df[title_col].astype(str).str.lower().tolist()
+
+        postings = defaultdict(list)
+        for row, title in enumerate(self.titles):
+            for gram in {title[i : i + 3] for i in range(len(title) - 2)}:
+                postings[gram].append(row)
+        self.trigrams: Dict[str, np.ndarray] = {
+            g: np.array(rows, dtype=np.int64) for g, rows in postings.items()
+        }
+
+        self.stock = (
+            df[self.locations].fillna(0).to_numpy(dtype=np.int64)
+            if self.locations
+            else np.zeros((len(df), 0), dtype=np.int64)
+        )
+        self.totals = self.stock.sum(axis=1)
+        self.by_total = np.argsort(self.totals, kind="stable")
+        self._sorted_totals = self.totals[self.by_total]
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def search(self, query: str) -> np.ndarray:
+        """
+        Rows whose title contains `query` (case-insensitive), the same rows
+        as str.contains on the lowercased titles. Queries shorter than three
+        characters scan the prebuilt lowercase titles.
+        """
+        q = str(query or "").lower()
+        if not q:
+            return np.arange(len(self.titles))
+        if len(q) < 3:
+            return np.array([r for r, t in enumerate(self.titles) if q in t], dtype=np.int64)
+
+        grams = {q[i : i + 3] for i in range(len(q) - 2)}
+        if any(g not in self.trigrams for g in grams):
+            return np.empty(0, dtype=np.int64)
+        rows = None
+        for postings in sorted((self.trigrams[g] for g in grams), key=len):
+            rows = postings if rows is None else np.intersect1d(rows, postings, assume_unique=True)
+            if not len(rows):
+                return rows
+        if len(q) == 3:
+            return rows
+        return np.array([r for r in rows if q in self.titles[r]], dtype=np.int64)
+
+    def at_least(self, location: str, min_stock: int) -> np.ndarray:
+        """Rows holding at least `min_stock` at `location`."""
+        col = self.locations.index(location)
+        return np.flatnonzero(self.stock[:, col] >= min_stock)
+
+    def low_stock(self, max_total: int) -> np.ndarray:
+        """Rows whose total stock across locations is at most `max_total`."""
+        end = np.searchsorted(self._sorted_totals, max_total, side="right")
+        return np.sort(self.by_total[:end])
+
+    def select(
+        self,
+        query: str = "",
+        location: Optional[str] = None,
+        min_stock: int = 0,
+        low_stock_max: Optional[int] = None,
+    ) -> np.ndarray:
+        """Rows matching every given filter."""
+        rows = self.search(query)
+        if location in self.locations and min_stock > 0:
+            rows = np.intersect1d(rows, self.at_least(location, min_stock), assume_unique=True)
+        if low_stock_max is not None:
+            rows = np.intersect1d(rows, self.low_stock(low_stock_max), assume_unique=True)
+        return rows
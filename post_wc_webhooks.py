@@ -0,0 +1,70 @@
+"""
+Replay recorded WooCommerce webhook deliveries against the local receiver.
+
+Usage:
+    python post_wc_webhooks.py payloads.json --secret <WC_WEBHOOK_SECRET>
+        [--url http://127.0.0.1:8765/wc-webhook]
+
+The JSON file holds a list of {"topic": "order.updated", "payload": {...}}
+records (a bare order object is sent as order.updated). Each body is signed
+the way WooCommerce signs it (X-WC-Webhook-Signature).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import requests
+
+from app_modules.wc_webhook import WEBHOOK_DEFAULT_PORT, WEBHOOK_PATH, sign_payload
+
+
+def load_records(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    records = data if isinstance(data, list) else [data]
+    return [r if "payload" in r else {"topic": "order.updated", "payload": r} for r in records]
+
+
+def post_records(url, secret, records, timeout=10):
+    """POST each record signed with `secret`; returns [(status, seconds, response json)]."""
+    results = []
+    for record in records:
+        body = json.dumps(record["payload"]).encode("utf-8")
+        headers = {
+            "Content-Type": "application/json",
+            "X-WC-Webhook-Topic": record.get("topic", "order.updated"),
+            "X-WC-Webhook-Signature": sign_payload(body, secret),
+            "X-WC-Webhook-Delivery-ID": str(record.get("delivery_id") or uuid.uuid4()),
+            "X-WC-Webhook-Source": record.get("source", "http://localhost/"),
+        }
+        started = time.perf_counter()
+        resp = requests.post(url, data=body, headers=headers, timeout=timeout)
+        results.append((resp.status_code, time.perf_counter() - started, resp.json()))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payloads", help="JSON file with recorded webhook deliveries")
+    parser.add_argument("--url", default=f"http://127.0.0.1:{WEBHOOK_DEFAULT_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=os.getenv("WC_WEBHOOK_SECRET"))
+    args = parser.parse_args(argv)
+    if not args.secret:
+        parser.error("--secret (or WC_WEBHOOK_SECRET) is required")
+
+    records = load_records(args.payloads)
+    failed = 0
+    for record, (status, seconds, body) in zip(records, post_records(args.url, args.secret, records)):
+        order_id = record["payload"].get("id")
+        print(f"{record.get('topic', 'order.updated'):<14} #{order_id:<8} -> {status} in {seconds * 1000:.0f} ms {body}")
+        failed += status >= 400
+    print(f"Posted {len(records)} deliveries, {failed} failed.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
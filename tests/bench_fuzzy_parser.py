@@ -0,0 +1,131 @@
+"""
+Delivery text parser benchmarks on synthetic Pathao consignment pastes.
+
+    python tests/bench_fuzzy_parser.py --sizes 1000 10000 50000 [--style table|loose]
+
+synthetic_paste() mimics text copied from the Pathao merchant panel:
+"table" puts one field per line (what parse_records expects); "loose"
+flattens records onto a few lines with currency symbols, as pasted from
+chats or PDFs (what parse_data_fuzzy handles). Reports parse time,
+throughput and input size for both parsers.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app_modules.fuzzy_parser_tab import parse_data_fuzzy, parse_records  # noqa: E402
+
+_STORES = ["Deen Commerce", "w DEEN WARI OUTLET", "c DEEN CUMILLA OUTLET"]
+_NAMES = ["Raafin", "Nusrat Jahan", "Md. Karim", "Tanvir Ahmed", "Sadia Islam", "Farhan", "Rumana Akter"]
+_AREAS = ["Uttara West, Dhaka", "Mirpur 10, Dhaka", "Agrabad, Chattogram", "Zindabazar, Sylhet",
+          "Kandirpar, Cumilla", "Boyra, Khulna", "Section 2, Mirpur, Dhaka 1216"]
+_STATUSES = ["At Delivery Hub", "Paid Return", "Urgent Delivery Requested", "Returned", "Delivered", "In Transit"]
+
+
+def _consignment(i: int, rng: random.Random) -> Dict:
+    return {
+        "cons": f"DD{rng.randint(10000, 319999):06d}{''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789') for _ in range(6))}",
+        "order": f"{190000 + i:06d}",
+        "store": rng.choice(_STORES),
+        "name": rng.choice(_NAMES),
+        "address": f"House {rng.randint(1, 99)}, Road {rng.randint(1, 30)}, {rng.choice(_AREAS)}",
+        "phone": f"01{rng.choice('3456789')}{rng.randint(10000000, 99999999)}",
+        "status": rng.choice(_STATUSES),
+        "updated": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2026",
+        "cod": rng.choice([0, 850, 1290, 2490, 12500]),
+        "charge": rng.choice([50, 60, 70, 110, 130.5]),
+        "discount": rng.choice([0, 5, 10]),
+        "paid": rng.random() < 0.4,
+    }
+
+
+def _table_block(c: Dict) -> str:
+    lines = [c["cons"], "Type:", "Parcel", c["order"], c["store"], c["name"], c["address"], c["phone"],
+             c["status"], f"Updated on {c['updated']}", f"COD {c['cod']:,}", f"Charge {c['charge']}",
+             f"Discount {c['discount']}", "Paid" if c["paid"] else "Unpaid", "View", "POD"]
+    return "\n".join(lines)
+
+
+def _loose_block(c: Dict) -> str:
+    payment = f"Paid At: {c['updated']}" if c["paid"] else "Unpaid"
+    return (
+        f"{c['cons']} Type: Parcel {c['order']}\n"
+        f"{c['store']}\n{c['name']}\n{c['address']}\n  {c['phone']}  \n"
+        f"{c['status']} Updated on {c['updated']}\n"
+        f"COD à§³ {c['cod']:,} Charge à§³ {c['charge']} Discount à§³{c['discount']}\n"
+        f"{payment}\nView POD\n"
+    )
+
+
+def synthetic_paste(n: int, seed: int = 0, style: str = "table") -> str:
+    """n consignments as pasted text, with the panel's column header on top."""
+    rng = random.Random(seed)
+    block = _table_block if style == "table" else _loose_block
+    header = "Cons. ID\nOrder ID\nStore\nRecipient Info\nDelivery Status\nAmount\nPayment\nAction\n"
+    return header + "\n".join(block(_consignment(i, rng)) for i in range(n))
+
+
+TARGETS: Dict[str, Callable] = {"parse_records": parse_records, "parse_data_fuzzy": parse_data_fuzzy}
+
+
+def measure(name: str, text: str, size: int, repeat: int = 3) -> Dict:
+    fn = TARGETS[name]
+    best = float("inf")
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(fn(text))
+        best = min(best, time.perf_counter() - started)
+    return {
+        "target": name,
+        "size": size,
+        "rows": rows,
+        "input_mb": round(len(text.encode("utf-8")) / 1e6, 2),
+        "seconds": round(best, 4),
+        "records_per_sec": round(size / best) if best else 0,
+    }
+
+
+def run_benchmarks(sizes: List[int], style: str = "table", repeat: int = 3) -> List[Dict]:
+    results = []
+    for size in sizes:
+        text = synthetic_paste(size, style=style)
+        for name in TARGETS:
+            results.append(measure(name, text, size, repeat))
+    return results
+
+
+def format_table(results: List[Dict]) -> str:
+    cols = ["target", "size", "rows", "input_mb", "seconds", "records_per_sec"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in cols}
+    lines = ["  ".join(c.ljust(widths[c]) for c in cols)]
+    lines += ["  ".join(str(r[c]).ljust(widths[c]) for c in cols) for r in results]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delivery text parser benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--style", choices=["table", "loose"], default="table")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.style, args.repeat)
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+WooCommerce fetch benchmarks against the local stand-in server.
+
+    python tests/bench_wc_fetch.py --sizes 1000 10000 100000 [--latency 0.05] [--error-rate 0.01]
+
+For each size the stand-in (tests/wc_stub_server.py) runs in a separate
+process, so its memory is not counted. Each target is timed in one run
+and measured with tracemalloc in a second run. Reports end-to-end sync time,
+throughput, pages, retries, payload size and peak Python memory for
+load_from_woocommerce and fetch_wc_customers.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from app_modules.wc_fetcher import FetchReport  # noqa: E402
+from app_modules.wc_live_source import load_from_woocommerce  # noqa: E402
+from app_modules.woocommerce_customer_tab import CUSTOMER_FIELDS, fetch_wc_customers  # noqa: E402
+
+SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wc_stub_server.py")
+
+
+class StandIn:
+    """tests/wc_stub_server.py running in a child process."""
+
+    def __init__(self, orders: int, customers: int, latency: float = 0.0, error_rate: float = 0.0):
+        self.args = [
+            sys.executable, SERVER, "--orders", str(orders), "--customers", str(customers),
+            "--latency", str(latency), "--error-rate", str(error_rate),
+        ]
+        self.proc: Optional[subprocess.Popen] = None
+        self.url = ""
+
+    def __enter__(self) -> "StandIn":
+        self.proc = subprocess.Popen(self.args, stdout=subprocess.PIPE, text=True)
+        line = self.proc.stdout.readline()
+        if not line.startswith("READY "):
+            self.proc.kill()
+            raise RuntimeError(f"stand-in server failed to start: {line!r}")
+        self.url = line.split()[1]
+        return self
+
+    def __exit__(self, *exc):
+        self.proc.terminate()
+        self.proc.wait(10)
+
+
+def _load_orders(url: str) -> Tuple[int, Optional[FetchReport]]:
+    load_from_woocommerce.clear()
+    df, _, _ = load_from_woocommerce(url, "ck", "cs", status="any",
+                                     after="2000-01-01T00:00:00", before="2100-01-01T00:00:00")
+    return len(df), df.attrs.get("fetch_report")
+
+
+def _fetch_customers(url: str) -> Tuple[int, Optional[FetchReport]]:
+    reports: List[FetchReport] = []
+    customers = fetch_wc_customers(url, "ck", "cs", fields=CUSTOMER_FIELDS, on_report=reports.append)
+    return len(customers), reports[-1] if reports else None
+
+
+TARGETS: Dict[str, Callable[[str], Tuple[int, Optional[FetchReport]]]] = {
+    "load_from_woocommerce": _load_orders,
+    "fetch_wc_customers": _fetch_customers,
+}
+
+
+def measure(name: str, url: str, size: int) -> Dict:
+    fn = TARGETS[name]
+    started = time.perf_counter()
+    produced, report = fn(url)
+    seconds = time.perf_counter() - started
+
+    tracemalloc.start()
+    fn(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "target": name,
+        "size": size,
+        "rows": produced,
+        "seconds": round(seconds, 3),
+        "items_per_sec": round(size / seconds) if seconds else 0,
+        "pages": report.total_pages if report else 0,
+        "retries": report.retries if report else 0,
+        "payload_mb": round(report.total_bytes / 1e6, 2) if report else 0,
+        "peak_mb": round(peak / 1e6, 1),
+    }
+
+
+def run_benchmarks(sizes: List[int], latency: float = 0.0, error_rate: float = 0.0,
+                   targets: Optional[List[str]] = None) -> List[Dict]:
+    results = []
+    for size in sizes:
+        with StandIn(orders=size, customers=size, latency=latency, error_rate=error_rate) as server:
+            for name in targets or list(TARGETS):
+                results.append(measure(name, server.url, size))
+    return results
+
+
+def format_table(results: List[Dict]) -> str:
+    cols = ["target", "size", "rows", "seconds", "items_per_sec", "pages", "retries", "payload_mb", "peak_mb"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in cols}
+    lines = ["  ".join(c.ljust(widths[c]) for c in cols)]
+    lines += ["  ".join(str(r[c]).ljust(widths[c]) for c in cols) for r in results]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WooCommerce fetch benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--latency", type=float, default=0.0, help="per-request server latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS))
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.latency, args.error_rate, args.targets)
+    print(format_table(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
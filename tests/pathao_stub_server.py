@@ -0,0 +1,139 @@
+"""
+Local stand-in for the Pathao merchant API (issue-token + order search).
+
+GET /aladdin/api/v1/orders?search=<phone|order id> answers from `orders`
+(matched on recipient_phone, merchant_order_id or consignment_id) in
+Pathao's {"data": {"data": [...]}} envelope. Supports per-query failures,
+a server-side rate limit (429 + Retry-After) and token expiry.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+
+def _digits(value) -> str:
+    return re.sub(r"\D", "", str(value or ""))[-10:]
+
+
+class PathaoStubServer:
+    def __init__(self, orders: Optional[List[Dict]] = None, rate_limit: Optional[float] = None,
+                 latency: float = 0.0, token_ttl: int = 3600):
+        self.orders = orders or []
+        self.rate_limit = rate_limit  # max requests/second before answering 429
+        self.latency = latency
+        self.token_ttl = token_ttl
+        # search query -> statuses to return (in order) before answering
+        self.faults: Dict[str, List[int]] = {}
+        self.valid_tokens = set()
+        self.token_requests: List[Dict] = []
+        self.requests: List[Dict] = []
+        self.throttled = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._attempts = defaultdict(int)
+        self._window: List[float] = []
+        self._loop = None
+        self._thread = None
+        self.port = None
+        self.reindex()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def reindex(self):
+        """Rebuild the search index after changing `orders`."""
+        self._by_key = defaultdict(list)
+        for o in self.orders:
+            keys = {_digits(o.get("recipient_phone")), str(o.get("merchant_order_id", "")), str(o.get("consignment_id", ""))}
+            for key in keys - {""}:
+                self._by_key[key].append(o)
+
+    def issue(self) -> str:
+        token = f"tok-{len(self.token_requests) + len(self.valid_tokens)}-{time.time_ns()}"
+        self.valid_tokens.add(token)
+        return token
+
+    async def _issue_token(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.token_requests.append(body)
+        if body.get("grant_type") == "refresh_token":
+            if body.get("refresh_token") != "refresh-ok":
+                return web.json_response({"error": "invalid_grant"}, status=401)
+        elif not body.get("client_id") or body.get("password") == "wrong":
+            return web.json_response({"error_description": "Invalid credentials"}, status=401)
+        return web.json_response({
+            "token_type": "Bearer", "expires_in": self.token_ttl,
+            "access_token": self.issue(), "refresh_token": "refresh-ok",
+        })
+
+    async def _orders(self, request: web.Request) -> web.Response:
+        query = request.query.get("search", "")
+        now = time.monotonic()
+        self.requests.append({"search": query, "time": now,
+                              "auth": request.headers.get("Authorization", "")})
+        if request.headers.get("Authorization", "").removeprefix("Bearer ") not in self.valid_tokens:
+            return web.json_response({"message": "Unauthenticated."}, status=401)
+
+        if self.rate_limit:
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate_limit:
+                self.throttled += 1
+                return web.json_response({"message": "Too Many Attempts."}, status=429, headers={"Retry-After": "1"})
+            self._window.append(now)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            attempt = self._attempts[query]
+            self._attempts[query] += 1
+            faults = self.faults.get(query, [])
+            if attempt < len(faults):
+                return web.json_response({"message": "stub error"}, status=faults[attempt])
+            matches = self._by_key.get(query) or self._by_key.get(_digits(query)) or []
+            return web.json_response({"type": "success", "code": 200, "data": {"data": matches, "total": len(matches)}})
+        finally:
+            self.in_flight -= 1
+
+    def start(self) -> "PathaoStubServer":
+        ready = threading.Event()
+
+        def _run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            app = web.Application()
+            app.router.add_post("/aladdin/api/v1/issue-token", self._issue_token)
+            app.router.add_get("/aladdin/api/v1/orders", self._orders)
+            runner = web.AppRunner(app, access_log=None)
+            self._loop.run_until_complete(runner.setup())
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            self._loop.run_until_complete(site.start())
+            self.port = site._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_run, daemon=True)
+        self._thread.start()
+        ready.wait(5)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,3 +1,7 @@
+import io
+import time
+
+import numpy as np
 import pandas as pd
 import pytest
 from inventory_modules import core as inv_core
@@ -72,3 +76,261 @@ def test_add_stock_columns():
     assert res.loc[1, "Store2"] == 10
 
     assert len(res) == 3
+
+
+def test_add_title_size_column():
+    df = pd.DataFrame(
+        {
+            "Title": [" Polo ", "Shirt", 123, "45.0", None, "Cap"],
+            "Size": ["M", 42.0, "no size", "L", "S", ".0"],
+        }
+    )
+
+    res = inv_core.add_title_size_column(df, title_col="Title", size_col="Size")
+
+    assert res["Title - Size"].tolist() == [
+        "Polo - M",
+        "Shirt - 42",
+        "123",
+        "45 - L",
+        "",
+        "Cap",
+    ]
+    assert "Title - Size" not in df.columns
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        [" Polo - M ", "Shirt - 42.0", 123, "45.0", None, "Cap - no size", 7.5],
+        [12.5, pd.Timestamp("2026-01-01"), None],  # object column without a single string
+        [1.0, 2.0, float("nan")],
+        [None, None],
+    ],
+)
+def test_columnwise_keys_match_scalar_helpers(values):
+    col = pd.Series(values, dtype=object)
+    assert inv_core.normalize_keys(col).tolist() == [inv_core.normalize_key(v) for v in values]
+    assert inv_core.normalize_skus(col).tolist() == [inv_core.normalize_sku(v) for v in values]
+    assert inv_core.title_size_keys(col).tolist() == [
+        inv_core.build_title_size_key(*inv_core.item_name_to_title_size(v)) for v in values
+    ]
+
+
+def _upload(df, name):
+    f = io.BytesIO(df.to_csv(index=False).encode("utf-8"))
+    f.name = name
+    return f
+
+
+def test_load_inventory_matrix():
+    ecom = pd.DataFrame(
+        {
+            "Item Name": ["Polo", "Polo", "Shirt", "Cap", ""],
+            "Size": ["M", "M", "L", "", "M"],
+            "Quantity": ["1,200", "3", "2.7", "", "9"],
+            "SKU": ["po-m", "PO M", "SH-L", None, "X"],
+        }
+    )
+    mirpur = pd.DataFrame(
+        {"Title": ["polo", "Shirt"], "Size": ["m", "L"], "Stock": [4, -1], "SKU": ["SH-L2", "SH-L"]}
+    )
+
+    inv, warnings, enriched, sku_map = inv_core.load_inventory_from_uploads(
+        {"Ecom": _upload(ecom, "ecom.csv"), "Mirpur": _upload(mirpur, "mirpur.csv"), "Empty": None}
+    )
+
+    assert warnings == []
+    assert set(enriched) == {"Ecom", "Mirpur"}
+    assert isinstance(inv, inv_core.InventoryMatrix)
+    assert inv.matrix.dtype == "int64"
+    assert list(inv) == ["polo - m", "POM", "shirt - l", "SHL", "cap", "SHL2"]
+    assert inv["polo - m"] == {"Ecom": 1203, "Mirpur": 4, "Empty": 0}
+    assert inv["POM"] == {"Ecom": 1203, "Mirpur": 0, "Empty": 0}
+    assert inv["SHL"] == {"Ecom": 2, "Mirpur": -1, "Empty": 0}
+    assert inv.get("missing", {}).get("Ecom", 0) == 0
+    assert sku_map == {"POM": "polo - m", "SHL": "shirt - l", "SHL2": "polo - m"}
+    assert inv.sku_index == sku_map
+    assert inv.name_keys() == ["polo - m", "shirt - l", "cap"]
+    assert inv.totals()[inv.row("cap")] == 0
+
+
+def test_stock_matching_rules():
+    ecom = pd.DataFrame(
+        {
+            "Item Name": ["Polo", "Shirt", "Embroidered Cotton Panjabi", "Cap"],
+            "Size": ["M", "L", "40", ""],
+            "Quantity": [5, 1, 2, 0],
+            "SKU": ["PO-M", "SH-L", "ECP-40", "CP"],
+        }
+    )
+    inv, _, _, sku_map = inv_core.load_inventory_from_uploads(
+        {"Ecom": _upload(ecom, "ecom.csv"), "Mirpur": None}
+    )
+    master = pd.DataFrame(
+        {
+            "Item Name": [
+                "Polo - M",
+                "POLO - M",
+                "Polo - M",
+                "Shirt - L",
+                "Blue Shirt - L",
+                "Embroidered Cotton Panjabi - 40",
+                "Embroidered Cotton Panjabi - 40",
+                "Embroidered Cotton Panjabi - 42",
+                "Cap",
+                "Hat",
+            ],
+            "SKU": ["PO-M", "", "SH-L", "ZZ", "sh l", "ECP-40", "", "ECP 40", "CP", ""],
+            "Quantity": [2, 1, 1, 3, 1, 1, 1, 1, 1, 1],
+            "Order Number": ["1", "1", "2", "3", "3", "4", "5", "6", "7", "8"],
+        }
+    )
+
+    res, matched = inv_core.add_stock_columns_from_inventory(
+        master, "Item Name", inv, ["Ecom", "Mirpur"], "SKU", sku_map
+    )
+
+    assert res["Match Status"].tolist()[:9] == [
+        "Perfect Match (Name + SKU)",
+        "Exact Name Match",
+        "Name Match (SKU mismatch)",
+        "Name Match (SKU not in Inv)",
+        "SKU Match (Name mismatch -> shirt - l)",
+        "Perfect Match (Name + SKU)",
+        "No Match (Strict SKU required for Embroidered Cotton Panjabi)",
+        "SKU Match (Strict mode for Panjabi -> embroidered cotton panjabi - 40)",
+        "Perfect Match (Name + SKU)",
+    ]
+    assert res["Match Status"].iloc[9] == "No Match"
+    assert matched == 8
+    assert res["Ecom"].tolist() == [5, 5, 5, 1, 1, 2, 0, 2, 0, 0]
+    assert res["Fulfillment"].tolist() == [
+        "✅ Available",
+        "✅ Available",
+        "✅ Available",
+        "⚠️ Partial (1/3)",
+        "✅ Available",
+        "✅ Available",
+        "❌ No Match",
+        "✅ Available",
+        "❌ OOS",
+        "❌ No Match",
+    ]
+    assert res["Dispatch Suggestion"].tolist()[:6] == ["Ecom"] * 3 + [
+        "OOS / No Match",
+        "Ecom",
+        "Ecom",
+    ]
+
+
+def test_location_parse_cache_reparses_only_changed_files():
+    ecom = pd.DataFrame({"Item Name": ["Polo", "Cap"], "Size": ["M", ""], "Quantity": [3, 1]})
+    mirpur = pd.DataFrame({"Item Name": ["Polo"], "Size": ["M"], "Quantity": [2]})
+    wari = pd.DataFrame({"Price": [1]})
+    cache = inv_core.LocationParseCache()
+    uploads = {
+        "Ecom": _upload(ecom, "ecom.csv"),
+        "Mirpur": _upload(mirpur, "mirpur.csv"),
+        "Wari": _upload(wari, "wari.csv"),
+    }
+
+    first = inv_core.parse_location_uploads(uploads, cache=cache, max_workers=3)
+    sequential = inv_core.parse_location_uploads(uploads, max_workers=1)
+    assert len(cache) == 3
+    for loc in ("Ecom", "Mirpur"):
+        pd.testing.assert_frame_equal(first[loc].entries, sequential[loc].entries)
+    assert first["Wari"].warnings == sequential["Wari"].warnings
+    assert first["Wari"].df is None
+
+    mirpur.loc[0, "Quantity"] = 7
+    uploads["Mirpur"] = _upload(mirpur, "mirpur.csv")
+    second = inv_core.parse_location_uploads(uploads, cache=cache)
+    assert second["Ecom"] is first["Ecom"]
+    assert second["Wari"] is first["Wari"]
+    assert second["Mirpur"] is not first["Mirpur"]
+
+    inv, warnings, _, _ = inv_core.load_inventory_from_uploads(uploads, cache=cache)
+    assert inv["polo - m"] == {"Ecom": 3, "Mirpur": 7, "Wari": 0}
+    assert warnings == ["⚠️ Wari: Missing 'Title/Item Name' column. Skipped."]
+
+
+def test_fuzzy_fallback_is_blocked_by_size_and_tokens():
+    keys = ["polo shirt - m", "polo shirt - l", "denim jeans - 32", "cap"]
+    keys += [f"product {i} - m" for i in range(2000)]
+    index = inv_core.FuzzyKeyIndex(keys, top_k=5)
+
+    assert len(index.candidates("product 77 - m")) == 5
+    assert [keys[i] for i in index.candidates("polo shirtt - m")] == ["polo shirt - m"]
+    assert len(index.candidates("hat")) == 0
+
+    matches = inv_core.fuzzy_match_keys(
+        ["polo shirtt - m", "denim jens - 32", "polo shirtt - xl", "denim shirt - 32"], index
+    )
+    assert matches[0] == ("polo shirt - m", "Fuzzy Match (97%) -> polo shirt - m")
+    assert matches[1][0] == "denim jeans - 32"
+    assert matches[1][1].startswith("Fuzzy Match (")
+    assert matches[2] == (None, "No Match")
+    assert matches[3][0] is None
+    assert matches[3][1] == "No Match (Closest: denim jeans - 32 @ 75%)"
+
+    strict = inv_core.fuzzy_match_keys(["denim jens - 32"], index, threshold=99)
+    assert strict[0][0] is None
+    timed_out = inv_core.fuzzy_match_keys(["polo shirtt - m"], index, time_limit=-1)
+    assert timed_out == [(None, "No Match (Fuzzy search timed out)")]
+
+
+def test_fuzzy_time_limit_covers_scoring_and_fallback_budget(monkeypatch):
+    index = inv_core.FuzzyKeyIndex(["polo shirt - m", "denim jeans - 32", "cap - l"])
+    queries = ["polo shirtt - m", "denim jens - 32", "capp - l"]
+    timed_out = (None, "No Match (Fuzzy search timed out)")
+
+    # Scoring runs past the deadline: batches after the first are never scored
+    score = inv_core._score_pairs
+
+    def slow_score(q, c):
+        time.sleep(0.2)
+        return score(q, c)
+
+    monkeypatch.setattr(inv_core, "_score_pairs", slow_score)
+    monkeypatch.setattr(inv_core, "FUZZY_SCORE_CHUNK", 1)
+    monkeypatch.setattr(inv_core, "FUZZY_FALLBACK_CHUNK", 1)
+    matches = inv_core.fuzzy_match_keys(queries, index, time_limit=0.1)
+    assert matches[0][0] == "polo shirt - m"
+    assert matches[1:] == [timed_out, timed_out]
+    monkeypatch.setattr(inv_core, "_score_pairs", score)
+
+    # Without rapidfuzz the pair budget bounds the pure-Python scorer
+    monkeypatch.setattr(inv_core, "rf_process", None)
+    monkeypatch.setattr(inv_core, "FUZZY_FALLBACK_MAX_PAIRS", 2)
+    matches = inv_core.fuzzy_match_keys(queries, index, time_limit=None)
+    assert [m[0] for m in matches[:2]] == ["polo shirt - m", "denim jeans - 32"]
+    assert matches[2] == timed_out
+
+
+def test_distribution_index_lookups():
+    df = pd.DataFrame(
+        {
+            "item name": ["Polo Shirt - M", "Polo Shirt - L", "Denim Jeans - 32", "Napolo Cap", "Cap", "Sweatshirt"],
+            "Ecom": [5, 0, 2, 1, 0, 4],
+            "Mirpur": [1, 0, 0, 0, 3, 0],
+        }
+    )
+    index = inv_core.DistributionIndex(df, "item name", ["Ecom", "Mirpur", "Wari"])
+
+    assert index.locations == ["Ecom", "Mirpur"]
+    assert index.search("").tolist() == [0, 1, 2, 3, 4, 5]
+    assert index.search("POLO").tolist() == [0, 1, 3]
+    assert index.search("shirt").tolist() == [0, 1, 5]
+    assert index.search("polo shirt - l").tolist() == [1]
+    assert index.search("cap").tolist() == [3, 4]
+    assert index.search("olo").tolist() == [0, 1, 3]
+    assert index.search("jeans polo").tolist() == []
+    assert index.at_least("Ecom", 2).tolist() == [0, 2, 5]
+    assert index.low_stock(1).tolist() == [1, 3]
+    assert index.select("polo", location="Ecom", min_stock=1).tolist() == [0, 3]
+    assert index.select("cap", low_stock_max=1).tolist() == [3]
+
+    for q in ["polo", "cap", "shirt - m", "o", "32", "olo", "t -", "xyz", "a"]:
+        expected = np.flatnonzero(df["item name"].str.lower().str.contains(q, regex=False))
+        assert index.search(q).tolist() == expected.tolist()
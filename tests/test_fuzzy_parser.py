@@ -0,0 +1,118 @@
+import csv
+import html
+import io
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+from bench_fuzzy_parser import format_table, run_benchmarks, synthetic_paste
+
+from app_modules.fuzzy_parser_tab import (
+    RECORD_COLUMNS,
+    iter_parsed_chunks,
+    iter_records,
+    parse_data_fuzzy,
+    parse_records,
+    parse_upload,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# Expected records were captured from the previous per-record regex parsers,
+# except the last loose record: a six-digit COD before the order id used to
+# be taken as the Order ID; the COD token now consumes it (Order ID 190099).
+@pytest.mark.parametrize("style", ["table", "loose"])
+def test_parsers_match_recorded_output(style):
+    expected = json.loads(_fixture("pathao_paste_expected.json"))[style]
+    text = _fixture(f"pathao_paste_{style}.txt")
+    assert parse_records(text).to_dict("records") == expected["parse_records"]
+    assert parse_data_fuzzy(text).to_dict("records") == expected["parse_data_fuzzy"]
+
+
+def test_standard_record_fields():
+    df = parse_records(_fixture("pathao_paste_table.txt"))
+    last = df.iloc[-1].to_dict()
+    assert list(df.columns) == RECORD_COLUMNS
+    assert last["Delivery Status"] == "Delivery Failed; Customer unreachable"
+    assert (last["COD Amount"], last["Charge"], last["Action"]) == (3450.0, 60.5, "View, POD")
+    assert parse_records("no consignments here").empty and parse_data_fuzzy("").empty
+
+
+def test_multi_megabyte_paste_parses_in_under_a_second():
+    for style, parser in (("table", parse_records), ("loose", parse_data_fuzzy)):
+        text = synthetic_paste(10000, seed=3, style=style)
+        started = time.perf_counter()
+        df = parser(text)
+        assert len(df) == 10000 and time.perf_counter() - started < 1.0
+        assert len(text) > 1_900_000
+
+
+def test_benchmark_smoke_run():
+    results = run_benchmarks([200], repeat=1)
+    assert [r["rows"] for r in results] == [200, 200]
+    assert "records_per_sec" in format_table(results)
+
+
+def _as_html(text):
+    rows = "".join(
+        "<tr>" + "".join(f"<td><span>{html.escape(line)}</span></td>" for line in block.splitlines()) + "</tr>\n"
+        for block in text.split("\n\n")
+    )
+    return f'<html><head><script>var t = "<td>DD999999ZZZZ</td>";</script></head><body><table>{rows}</table></body></html>'
+
+
+@pytest.mark.parametrize("chunk_chars", [64, 500, 4096])
+def test_streamed_upload_matches_whole_text_parse(chunk_chars):
+    table = _fixture("pathao_paste_table.txt").replace("House 10", "House 10 & 11")
+    loose = _fixture("pathao_paste_loose.txt")
+    expected_table = parse_records(table).to_dict("records")
+
+    def _parse(data, **kwargs):
+        return parse_upload(io.BytesIO(data.encode("utf-8")), chunk_chars=chunk_chars, **kwargs).to_dict("records")
+
+    assert _parse(table) == expected_table
+    assert _parse(loose) == parse_data_fuzzy(loose).to_dict("records")
+    assert _parse(_as_html(table), kind="html", parser="standard") == expected_table
+
+    csv_buf = io.StringIO()
+    writer = csv.writer(csv_buf)
+    for block in table.split("\n\n"):
+        writer.writerow(block.splitlines())
+    assert _parse(csv_buf.getvalue(), kind="csv") == expected_table
+
+
+def test_streaming_memory_tracks_chunk_size():
+    data = synthetic_paste(20000, seed=5).encode("utf-8")
+    tracemalloc.start()
+    chunks = records = 0
+    for progress in iter_parsed_chunks(io.BytesIO(data), chunk_chars=128 * 1024, total_bytes=len(data)):
+        chunks += 1
+        records = progress.records
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert records == 20000 and chunks > 10
+    assert progress.bytes_read == len(data) and progress.records_per_sec > 0
+    assert peak < len(data) / 2  # the whole file is never held, decoded or parsed at once
+
+    head = data[:3000]
+    assert [r["Consignment ID"] for r in iter_records(io.BytesIO(head), chunk_chars=256)] == \
+        parse_records(head.decode())["Consignment ID"].tolist()
+
+
+@pytest.mark.parametrize("chunk_chars", [256, 64 * 1024])
+def test_auto_mode_keeps_standard_dumps_without_dd_ids(chunk_chars):
+    text = synthetic_paste(2000, seed=11).replace("\nDD", "\nDL")
+    expected = parse_records(text).to_dict("records")
+    assert len(expected) == 2000
+
+    streamed = parse_upload(io.BytesIO(text.encode("utf-8")), chunk_chars=chunk_chars)
+    assert streamed.to_dict("records") == expected
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+from app_modules import live_sync_worker as lsw
+from app_modules.wc_order_store import StoreDeltaSync, WCOrderStore
+from wc_stub_server import StubServer
+
+
+def _order(i, modified="2026-03-01T10:00:00"):
+    return {
+        "id": i, "status": "completed", "date_created": "2026-03-01T09:00:00", "date_modified": modified,
+        "billing": {"phone": "01711000000", "first_name": "A", "last_name": "B"},
+        "line_items": [{"type": "line_item", "name": "Cap", "quantity": 1, "subtotal": "300", "total": "300"}],
+    }
+
+
+def _capture_errors(monkeypatch):
+    # Keep failing jobs out of the tracked data/error_logs.json
+    logged = []
+    monkeypatch.setattr(lsw, "log_error", lambda error, context="General", details=None: logged.append(context))
+    return logged
+
+
+def test_worker_publishes_snapshots_and_keeps_last_on_error(monkeypatch):
+    logged = _capture_errors(monkeypatch)
+    calls = []
+
+    def job():
+        calls.append(threading.current_thread().name)
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        return len(calls)
+
+    worker = lsw.SyncWorker("test", job, interval=60).start()
+    try:
+        first = lsw.read_snapshot(worker, timeout=5)
+        assert (first.version, first.payload) == (1, 1)
+        assert worker.latest() is first  # readers never trigger a run
+
+        lsw.refresh_now(worker, timeout=5)
+        assert isinstance(worker.last_error, RuntimeError) and worker.latest() is first
+        assert logged == ["Live sync (test)"]
+
+        third = lsw.refresh_now(worker, timeout=5)
+        assert (third.version, third.payload) == (2, 3) and worker.last_error is None
+        assert set(calls) == {"live-sync-test"}
+    finally:
+        worker.stop()
+
+
+def test_registry_starts_one_worker_per_name():
+    factories = []
+
+    def factory():
+        factories.append(1)
+        return lambda: "ok"
+
+    a = lsw.get_sync_worker("test-registry", factory, interval=60)
+    b = lsw.get_sync_worker("test-registry", factory, interval=60)
+    try:
+        assert a is b and len(factories) == 1
+        assert lsw.read_snapshot(a, timeout=5).payload == "ok"
+    finally:
+        a.stop()
+
+
+def test_first_read_raises_when_sync_fails(monkeypatch):
+    _capture_errors(monkeypatch)
+    worker = lsw.SyncWorker("failing", lambda: 1 / 0, interval=60).start()
+    try:
+        with pytest.raises(ZeroDivisionError):
+            lsw.read_snapshot(worker, timeout=5)
+    finally:
+        worker.stop()
+
+
+def test_wc_job_syncs_store_in_background():
+    with StubServer(orders=[_order(1), _order(2)]) as server:
+        sync = StoreDeltaSync(WCOrderStore(), server.url, "ck", "cs")
+        job = lsw.WCStoreSyncJob(sync)
+        worker = lsw.SyncWorker("wc-test", job, interval=60).start()
+        try:
+            snapshot = lsw.read_snapshot(worker, timeout=5)
+            assert snapshot.payload["stats"]["full"] and sync.store.count() == 2
+
+            server.collections["orders"].append(_order(3, modified="2026-03-02T10:00:00"))
+            requests_before = len(server.requests)
+            time.sleep(0.05)
+            assert len(server.requests) == requests_before  # idle between ticks
+
+            snapshot = lsw.refresh_now(worker, timeout=5)
+            assert snapshot.version == 2 and sync.store.count() == 3
+        finally:
+            worker.stop()
@@ -0,0 +1,157 @@
+import time
+
+import pytest
+from app_modules.pathao_client import (
+    ORDERS_PATH,
+    PathaoAuthError,
+    PathaoCheckConfig,
+    PathaoTokenManager,
+    iter_bulk_check,
+    iter_order_sync,
+)
+from app_modules.pathao_history import DeliveryHistoryStore
+from pathao_stub_server import PathaoStubServer
+
+FAST = PathaoCheckConfig(rate=2000, burst=50, concurrency=8, backoff_base=0.01, backoff_max=0.05)
+
+
+def _history(n_phones):
+    orders = []
+    for i in range(n_phones):
+        phone = f"0171{i:07d}"
+        for j in range(i % 4):
+            orders.append({"recipient_phone": phone, "merchant_order_id": f"{i}-{j}",
+                           "consignment_id": f"C{i}{j}", "order_status": "Delivered" if j else "Returned"})
+    return orders
+
+
+def _run(server, phones, config=FAST):
+    rows, failed, batches = [], [], 0
+    for batch in iter_bulk_check(phones, server.issue(), config=config, base_url=server.url, poll_interval=0.02):
+        rows.extend(batch.rows)
+        failed.extend(batch.failed)
+        batches += 1
+    return rows, failed, batches
+
+
+def test_bulk_check_handles_thousands_with_bounded_concurrency():
+    phones = [f"+880171{i:07d}" for i in range(1500)]
+    with PathaoStubServer(orders=_history(1500), latency=0.002) as server:
+        rows, failed, batches = _run(server, phones)
+
+    assert not failed and len(rows) == 1500
+    assert server.max_in_flight <= FAST.concurrency
+    by_phone = {r["Phone"]: r for r in rows}
+    assert by_phone["+8801710000003"] == {
+        "Phone": "+8801710000003", "Total Orders": 3, "Delivered": 2,
+        "Returned/Cancelled": 1, "Success Rate (%)": 66.67,
+    }
+    assert batches > 1  # rows stream in while the run is still going
+
+
+def test_rate_limit_and_transient_errors_are_absorbed():
+    phones = [f"+880171{i:07d}" for i in range(40)]
+    config = PathaoCheckConfig(rate=20, burst=5, concurrency=4, backoff_base=0.01, backoff_max=0.05)
+    with PathaoStubServer(orders=_history(40), rate_limit=25) as server:
+        server.faults = {phones[3]: [503, 502], phones[7]: [500] * 10}
+        started = time.perf_counter()
+        rows, failed, _ = _run(server, phones, config)
+        elapsed = time.perf_counter() - started
+
+    assert len(rows) == 39 and [p for p, _ in failed] == [phones[7]]
+    assert server.throttled == 0  # the token bucket stays under the server's limit
+    assert elapsed >= (40 + 2 + 5 - config.burst) / config.rate * 0.9
+
+
+def test_rejected_token_aborts_the_run():
+    with PathaoStubServer(orders=_history(5)) as server:
+        with pytest.raises(PathaoAuthError):
+            for _ in iter_bulk_check(["+8801710000001"], "bad-token", config=FAST, base_url=server.url, poll_interval=0.02):
+                pass
+
+
+def _manager(server, password="secret", **kwargs):
+    return PathaoTokenManager("cid", "csecret", "merchant@example.com", password, base_url=server.url, **kwargs)
+
+
+def test_token_is_cached_and_renewed_once_on_401():
+    with PathaoStubServer(orders=_history(5)) as server:
+        tokens = _manager(server)
+        for _ in range(5):
+            assert tokens.get(f"{server.url}{ORDERS_PATH}", params={"search": "01710000003"}, timeout=5).status_code == 200
+        assert len(server.token_requests) == 1
+
+        server.valid_tokens.clear()  # token revoked server-side
+        resp = tokens.get(f"{server.url}{ORDERS_PATH}", params={"search": "01710000003"}, timeout=5)
+        assert resp.status_code == 200 and len(resp.json()["data"]["data"]) == 3
+        assert [r["grant_type"] for r in server.token_requests] == ["password", "refresh_token"]
+
+
+def test_token_is_refreshed_before_expiry():
+    with PathaoStubServer(token_ttl=60) as server:
+        tokens = _manager(server, refresh_margin=300)
+        first = tokens.get_token()
+        second = tokens.get_token()
+        assert first != second
+        assert [r["grant_type"] for r in server.token_requests] == ["password", "refresh_token"]
+
+        tokens.refresh_margin = 0
+        assert tokens.get_token() == second and len(server.token_requests) == 2
+
+
+def test_bad_credentials_raise_auth_error():
+    with PathaoStubServer() as server:
+        with pytest.raises(PathaoAuthError, match="Invalid credentials"):
+            _manager(server, password="wrong").get_token()
+
+
+def test_bulk_check_survives_token_revocation():
+    phones = [f"+880171{i:07d}" for i in range(200)]
+    with PathaoStubServer(orders=_history(200), latency=0.002) as server:
+        tokens = _manager(server)
+        rows, failed = [], []
+        for batch in iter_bulk_check(phones, tokens, config=FAST, base_url=server.url, poll_interval=0.02):
+            rows.extend(batch.rows)
+            failed.extend(batch.failed)
+            if len(rows) >= 20 and tokens.issued == 1:
+                server.valid_tokens.clear()
+
+    assert not failed and len(rows) == 200
+    assert tokens.issued == 2  # concurrent 401s share one renewal
+
+
+def test_order_sync_shares_phone_searches_and_skips_resolved_orders():
+    pathao = [{"recipient_phone": f"01720000{i:03d}", "merchant_order_id": f"WC-{i}", "consignment_id": f"DC{i}",
+               "order_status": "Delivered" if i < 10 else "In_Transit"} for i in range(20)]
+    # Earlier consignments for two repeat customers whose new orders were booked without an id
+    pathao += [{"recipient_phone": phone, "merchant_order_id": "legacy", "consignment_id": f"L{phone[-1]}",
+                "order_status": "Returned"} for phone in ("01730000001", "01730000002")]
+    lookups = [(f"WC-{i}", f"+8801720000{i:03d}") for i in range(20)]
+    lookups += [(f"WC-{i}", f"+880173000000{1 + i % 2}") for i in range(20, 30)]
+    lookups.append(("WC-3", "+8801720000003"))  # duplicate line item
+
+    history = DeliveryHistoryStore()
+    with PathaoStubServer(orders=pathao, latency=0.002) as server:
+        token = server.issue()
+        rows = {}
+        for batch in iter_order_sync(lookups, token, config=FAST, base_url=server.url,
+                                     poll_interval=0.02, history=history):
+            rows.update({r["Order ID"]: r for r in batch.rows})
+        searches = [r["search"] for r in server.requests]
+
+        assert len(rows) == 30
+        assert rows["WC-4"] == {"Order ID": "WC-4", "Pathao Status": "Delivered", "Consignment ID": "DC4"}
+        assert rows["WC-15"]["Pathao Status"] == "In_Transit"
+        assert rows["WC-21"] == {"Order ID": "WC-21", "Pathao Status": "Returned", "Consignment ID": "L2"}
+        assert len(searches) == 32  # 30 order ids + one search per fallback phone
+        assert sorted(s for s in searches if not s.startswith("WC-")) == ["+8801730000001", "+8801730000002"]
+
+        server.requests.clear()
+        rerun = list(iter_order_sync(lookups, token, config=FAST, base_url=server.url,
+                                     poll_interval=0.02, history=history))
+        assert rerun[0].cached == 10 and rerun[-1].done == 30
+        # Phone-fallback hits (WC-20..29) belong to older consignments, so they are never cached
+        assert sorted(r["search"] for r in server.requests) == sorted(
+            [f"WC-{i}" for i in range(10, 30)] + ["+8801730000001", "+8801730000002"])
+        rerun_rows = {r["Order ID"]: r for batch in rerun for r in batch.rows}
+        assert rerun_rows["WC-21"]["Consignment ID"] == "L2"
@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+import pandas as pd
+from app_modules.pathao_client import PathaoCheckConfig, iter_bulk_check
+from app_modules.pathao_history import DeliveryHistoryStore, PhoneIndex, load_export_index
+from pathao_stub_server import PathaoStubServer
+
+FAST = PathaoCheckConfig(rate=2000, burst=50, concurrency=8, backoff_base=0.01, backoff_max=0.05)
+
+
+def _export():
+    return pd.DataFrame({
+        "Consignment ID": ["C1", "C2", "C3", None, None],
+        "Recipient Phone": ["01711000001", "+8801711000001", "01711000001", "01811000002", "01811000002"],
+        "Order Status": ["Delivered", "Return", "Delivered", "Cancelled", "Cancelled"],
+    }, dtype=str)
+
+
+def test_export_import_answers_success_rates_and_is_idempotent():
+    history = DeliveryHistoryStore()
+    assert history.import_export(_export()) == 5
+    history.import_export(_export())
+
+    by_phone = {r["Phone"]: r for r in history.summaries(["01711000001", "01811000002", "01911000003"])}
+    assert by_phone["01711000001"] == {
+        "Phone": "01711000001", "Total Orders": 3, "Delivered": 2,
+        "Returned/Cancelled": 1, "Success Rate (%)": 66.67,
+    }
+    assert by_phone["01811000002"]["Returned/Cancelled"] == 2  # id-less rows are kept apart
+    assert "01911000003" not in by_phone
+    assert history.stale_phones(["01711000001", "01911000003"]) == ["01911000003"]
+    assert history.stale_phones(["01711000001"], max_age=-1) == ["01711000001"]
+
+
+def test_partial_deliveries_do_not_mark_phone_fresh():
+    history = DeliveryHistoryStore()
+    history.record_deliveries([{"phone": "01711000001", "consignment_id": "C9", "order_status": "delivered"}])
+    assert history.summary("01711000001")["Total Orders"] == 1
+    assert history.stale_phones(["01711000001"]) == ["01711000001"]
+
+    history.record_phone("01911000003", [])  # checked, no orders
+    assert history.summaries(["01911000003"], only_fresh=True)[0]["Total Orders"] == 0
+
+
+def test_bulk_check_only_queries_stale_or_missing_phones():
+    orders = [{"recipient_phone": f"0171100000{i}", "merchant_order_id": f"{i}-{j}",
+               "consignment_id": f"K{i}{j}", "order_status": "Delivered"} for i in range(6) for j in range(2)]
+    phones = [f"+88017110000{i:02d}" for i in range(6)]
+    history = DeliveryHistoryStore()
+    with PathaoStubServer(orders=orders) as server:
+        token = server.issue()
+        first = [b for b in iter_bulk_check(phones[:4], token, config=FAST, base_url=server.url,
+                                             poll_interval=0.02, history=history)]
+        assert len(server.requests) == 4 and first[-1].cached == 0
+
+        rows = []
+        batches = list(iter_bulk_check(phones, token, config=FAST, base_url=server.url,
+                                       poll_interval=0.02, history=history))
+        for batch in batches:
+            rows.extend(batch.rows)
+
+    assert len(server.requests) == 6  # only the two new phones hit the API
+    assert batches[0].cached == 4 and batches[0].done == 4 and batches[-1].done == 6
+    assert sorted(r["Total Orders"] for r in rows) == [2] * 6
+
+
+def test_phone_index_matches_scan_and_answers_quickly():
+    rng = np.random.default_rng(7)
+    n = 200_000
+    numbers = [f"017{d:08d}" for d in rng.integers(0, 20_000, n)]  # ~10 orders per customer
+    spellings = [p if i % 3 else "+88" + p for i, p in enumerate(numbers)]
+    statuses = rng.choice(["Delivered", "Returned", "Cancelled", None], n).tolist()
+    index = PhoneIndex(spellings, statuses)
+    frame = pd.DataFrame({"phone": numbers, "status": statuses})
+
+    target = numbers[1234]
+    rows = index.lookup("+88" + target)
+    expected = frame.index[frame["phone"] == target].to_numpy()
+    assert rows.tolist() == expected.tolist() and len(rows) > 1
+    assert index.status_counts(rows) == frame.loc[expected, "status"].value_counts().to_dict()
+
+    prefix = target[:8]
+    assert index.lookup(prefix).tolist() == frame.index[frame["phone"].str.startswith(prefix)].tolist()
+    assert len(index.lookup("01999")) == 0 and len(index.lookup("")) == 0
+
+    started = time.perf_counter()
+    for p in numbers[:1000]:
+        index.status_counts(index.lookup(p))
+    assert (time.perf_counter() - started) / 1000 < 1e-3
+
+
+def test_export_is_parsed_once_per_content():
+    content = _export().to_csv(index=False).encode("utf-8")
+    first = load_export_index("hash-a", "export.csv", content)
+    assert load_export_index("hash-a", "export.csv", content) is first
+    assert (first.phone_col, first.status_col) == ("Recipient Phone", "Order Status")
+    assert first.index.lookup("01711000001").tolist() == [0, 1, 2]
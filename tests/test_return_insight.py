@@ -0,0 +1,125 @@
+import pandas as pd
+import pytest
+from app_modules import return_insight as ri
+
+
+def _returns_df():
+    return pd.DataFrame(
+        {
+            "Date": ["2026-01-01 10:00", "2026-01-01 12:30", "2026-01-02 09:15"],
+            "Customer Name": ["A", "B", "A"],
+            "Phone": ["01711000000", "01811000000", "01711000000"],
+            "Product": ["Polo Shirt", "Polo Shirts", "Denim Jeans"],
+            "Refund Amount": ["500", "450", "900"],
+            "Delivery Issue": ["Non Paid", "Exchange", "Partial"],
+            "Issue Or Product Details": [
+                "Polo Shirt – M – P-100",
+                "Polo Shirt – L x2 – P-101",
+                "Denim Jeans – 32 – J-200; Polo Shirt – M – P-100",
+            ],
+        }
+    )
+
+
+def test_compute_insights_does_not_mutate_input():
+    df = _returns_df()
+    cols = ri.detect_columns(df)
+    df_clean = ri.clean_dataframe(df, cols)
+    before = list(df_clean.columns)
+
+    ri.compute_insights(df_clean, cols)
+
+    assert list(df_clean.columns) == before
+
+
+def test_get_return_insights_is_memoized():
+    df = _returns_df()
+    cols = ri.detect_columns(df)
+    cache = ri.InsightsCache(max_entries=4)
+
+    first, hit1 = ri.get_return_insights(df, cols, 0.75, cache=cache)
+    second, hit2 = ri.get_return_insights(df.copy(), cols, 0.75, cache=cache)
+    _, hit3 = ri.get_return_insights(df, cols, 0.9, cache=cache)
+
+    assert (hit1, hit2, hit3) == (False, True, False)
+    assert second.insights is first.insights
+    assert "_product_group" in first.df_clean.columns
+    with pytest.raises(TypeError):
+        first.insights["total_returns"] = 0
+
+    # Callers get their own frames: editing one does not leak into later hits
+    first.df_clean.drop(columns="_product_group", inplace=True)
+    second.items["count"] = 0
+    third, hit4 = ri.get_return_insights(df, cols, 0.75, cache=cache)
+    assert hit4
+    assert "_product_group" in third.df_clean.columns
+    assert third.items["count"].sum() > 0
+
+
+def test_missing_product_groups_as_unknown(monkeypatch):
+    # A cleaned product that stays missing is grouped as "Unknown" in both the insights and df_clean
+    clean = ri.standardize_product_name
+    monkeypatch.setattr(ri, "standardize_product_name", lambda name: None if pd.isna(name) else clean(name))
+    df = _returns_df()
+    df.loc[1, "Product"] = None
+    cols = ri.detect_columns(df)
+    result, _ = ri.get_return_insights(df, cols, 0.75, cache=ri.InsightsCache())
+
+    groups = result.df_clean["_product_group"]
+    assert groups.tolist()[1] == "Unknown"
+    assert set(groups) <= set(result.insights["top_returned_products"].index)
+
+
+def test_insights_cache_evicts_by_count_and_memory():
+    small = ri.ReturnInsightsResult(pd.DataFrame(), {}, nbytes=10)
+    cache = ri.InsightsCache(max_entries=2, max_bytes=25)
+
+    cache.put("a", small)
+    cache.put("b", small)
+    cache.get("a")
+    cache.put("c", small)
+    assert cache.get("b") is None
+    assert cache.get("a") is small
+
+    cache.put("big", ri.ReturnInsightsResult(pd.DataFrame(), {}, nbytes=100))
+    assert cache.get("big") is None
+    assert cache.size_bytes <= 25
+
+
+def test_explode_product_details_matches_scalar_parser():
+    details = pd.Series(
+        [
+            "Polo Shirt – M – P-100",
+            "Polo Shirt – L x2 – P-101",
+            "Denim Jeans – 32 – J-200; Polo Shirt (Blue) - XL",
+            "Cap - CAP01",
+            None,
+            "  ",
+            "Plain Tee x(3)",
+        ]
+    )
+
+    items = ri.explode_product_details(details)
+
+    expected = [
+        (row, p["name"], p["size"], p["count"], p["sku"], p["display_name"])
+        for row, text in details.items()
+        for p in ri.parse_product_details(text)
+    ]
+    actual = list(
+        items[["source_row", "name", "size", "count", "sku", "display_name"]].itertuples(
+            index=False, name=None
+        )
+    )
+    assert actual == expected
+
+
+def test_clean_return_data_counts_items_per_row():
+    df = _returns_df()
+    cols = ri.detect_columns(df)
+
+    df_clean, items = ri.clean_return_data(df, cols)
+
+    assert df_clean["_parsed_item_count"].tolist() == [1, 2, 2]
+    assert items["source_row"].tolist() == [0, 1, 2, 2]
+    assert items["date"].notna().all()
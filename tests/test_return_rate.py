@@ -0,0 +1,65 @@
+from datetime import date
+
+import pandas as pd
+from app_modules import return_insight as ri
+from app_modules.return_rate import OrderLineIndex, compute_return_rates, match_returns_to_orders
+
+
+def _orders_df():
+    return pd.DataFrame(
+        {
+            "Order ID": ["100", "100", "101", "102", "103"],
+            "Date": pd.to_datetime(
+                ["2026-01-01 09:00", "2026-01-01 09:00", "2026-01-03 11:00", "2026-01-05 15:00", "2026-02-10 10:00"]
+            ),
+            "Product Name": ["Polo Shirt - M", "Denim Jeans - 32", "Polo Shirt - L", "Polo Shirt - M", "Polo Shirt - M"],
+            "Quantity": [2, 1, 3, 1, 1],
+            "Phone": ["01711000000", "01711000000", "+8801811000000", "01911000000", "01711000000"],
+            "Customer Name": ["A", "A", "B", "C", "A"],
+            "City": ["Dhaka", "Dhaka", "chattogram", "Dhaka", "Dhaka"],
+        }
+    )
+
+
+def _returns():
+    df = pd.DataFrame(
+        {
+            "Date": ["2026-01-04", "2026-01-06", "2026-01-07"],
+            "Customer Name": ["A", "B", "Z"],
+            "Phone": ["01711000000", "01811000000", "01511000000"],
+            "Order ID": ["#100", "", ""],
+            "Issue Or Product Details": ["Polo Shirt – M – P-100", "Polo Shirt – L x2 – P-101", "Cap - CAP01"],
+        }
+    )
+    cols = ri.detect_columns(df)
+    cols["order_id"] = "Order ID"
+    df_clean, items = ri.clean_return_data(df, cols)
+    return df_clean, items, cols
+
+
+def test_returns_match_by_order_id_then_phone():
+    df_clean, _, cols = _returns()
+    index = OrderLineIndex.from_dashboard_df(_orders_df())
+
+    matches = match_returns_to_orders(df_clean, index, order_id_col=cols["order_id"])
+
+    assert matches["match"].tolist() == ["order_id", "phone", "unmatched"]
+    assert matches["order_key"].tolist() == ["100", "101", ""]
+    assert matches["city"].tolist() == ["Dhaka", "Chattogram", ""]
+
+
+def test_return_rates_per_product_size_city_and_customer():
+    df_clean, items, cols = _returns()
+    index = OrderLineIndex.from_dashboard_df(_orders_df())
+
+    tables = compute_return_rates(
+        df_clean, items, index, start=date(2026, 1, 1), end=date(2026, 1, 31), order_id_col=cols["order_id"]
+    )
+
+    polo = tables.by_product.set_index("Product").loc["polo shirt"]
+    assert (polo["Units Ordered"], polo["Units Returned"]) == (6, 3)
+    assert tables.by_size.set_index("Size").loc["L", "Return Rate (%)"] == round(2 / 3 * 100, 2)
+    assert tables.by_city.set_index("City").loc["Dhaka", "Returned Orders"] == 1
+    customer_a = tables.by_customer.set_index("Phone").loc["01711000000"]
+    assert (customer_a["Customer"], customer_a["Orders"], customer_a["Returns"]) == ("A", 1, 1)
+    assert tables.match_stats["orders_in_range"] == 3
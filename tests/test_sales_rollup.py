@@ -0,0 +1,106 @@
+from datetime import date
+
+import pandas as pd
+from app_modules.sales_dashboard import (
+    _compute_order_status_metrics,
+    _rollup_order_status_metrics,
+    compute_period_metrics,
+    find_columns,
+    process_data,
+)
+from app_modules.sales_rollup import SalesRollup
+
+
+def _sales_df():
+    return pd.DataFrame(
+        {
+            "Order ID": ["1", "1", "2", "3", "4", "4"],
+            "Date": pd.to_datetime(
+                ["2026-01-01 10:00", "2026-01-01 10:00", "2026-01-02 11:00", "2026-01-09 12:00", "2026-01-10 09:00", "2026-01-10 09:00"]
+            ),
+            "Product Name": ["Polo Shirt - M", "Denim Jeans", "Polo Shirt - L", "Cap", "Panjabi", "Polo Shirt - M"],
+            "Price": [500, 1200, 500, 300, 2000, 500],
+            "Quantity": [2, 1, 1, 3, 1, 1],
+            "Phone": ["01711000000"] * 6,
+            "Total Amount": [1000, 1200, 450, 900, 2000, 500],
+        }
+    )
+
+
+def _mapping(df):
+    found = find_columns(df)
+    return {k: found.get(k) for k in ["name", "cost", "qty", "date", "order_id", "phone"]}
+
+
+def test_rollup_matches_process_data_and_period_metrics():
+    df = _sales_df()
+    mapping = _mapping(df)
+    rollup = SalesRollup(mapping)
+    rollup.sync_frame(df)
+
+    drill, summ, top, timeframe, basket = process_data(df, mapping)
+    r_drill, r_summ, r_top, r_timeframe, r_basket = rollup.process_outputs()
+
+    by_cat = lambda t: t.sort_values(list(t.columns[:2])).reset_index(drop=True)
+    pd.testing.assert_frame_equal(by_cat(r_summ), by_cat(summ), check_dtype=False)
+    pd.testing.assert_frame_equal(by_cat(r_drill), by_cat(drill), check_dtype=False)
+    pd.testing.assert_frame_equal(r_top.reset_index(drop=True), top.reset_index(drop=True), check_dtype=False)
+    assert (r_timeframe, r_basket) == (timeframe, basket)
+
+    curr = df[df["Date"] < "2026-01-05"]
+    prev = df[df["Date"] >= "2026-01-05"]
+    curr_kpi, prev_kpi, _ = compute_period_metrics(curr, prev, mapping)
+    assert rollup.kpis(date(2026, 1, 1), date(2026, 1, 4)) == curr_kpi
+    assert rollup.kpis(date(2026, 1, 5), date(2026, 1, 10)) == prev_kpi
+
+
+def test_rollup_updates_only_touched_orders():
+    df = _sales_df()
+    rollup = SalesRollup(_mapping(df))
+    assert rollup.sync_frame(df)["added"] == 4
+    assert rollup.sync_frame(df.copy())["days"] == 0
+
+    df.loc[2, "Quantity"] = 5
+    stats = rollup.sync_frame(df)
+    assert (stats["changed"], stats["days"]) == (1, 1)
+
+    stats = rollup.sync_frame(df[df["Order ID"] != "4"])
+    assert stats["removed"] == 1
+    assert rollup.kpis()["orders"] == 3
+    weekly = rollup.trend(granularity="Weekly")
+    assert weekly["_revenue"].sum() == 1000 + 1200 + 2500 + 900
+
+
+def test_rollup_kpis_match_period_metrics_with_status_filter():
+    df = _sales_df()
+    df["Status"] = ["Completed", "Completed", "Processing", "Cancelled", "Completed", "Completed"]
+    extra = pd.DataFrame(
+        {
+            "Order ID": ["5", "5", "6"],
+            "Date": pd.to_datetime(["2026-01-02 12:00", "2026-01-02 12:00", "2026-01-03 15:00"]),
+            "Product Name": ["Choose Any 2 Polo", "Polo Shirt - S", "Denim Jeans"],
+            "Price": [0, 500, 1200],
+            "Quantity": [2, 1, -1],  # a placeholder line and a refunded line
+            "Phone": ["01711000000"] * 3,
+            "Total Amount": [0, 500, -1200],
+            "Status": ["Completed", "Completed", "Completed"],
+        }
+    )
+    df = pd.concat([df, extra], ignore_index=True)
+    mapping = _mapping(df)
+    rollup = SalesRollup(mapping, status_col="Status")
+    rollup.sync_frame(df)
+
+    statuses = ["Completed", "Processing"]
+    start, end = date(2026, 1, 1), date(2026, 1, 4)
+    filtered = df[df["Status"].isin(statuses)]
+    curr = filtered[filtered["Date"] < "2026-01-05"]
+    prev = filtered[filtered["Date"] >= "2026-01-05"]
+    curr_kpi, prev_kpi, _ = compute_period_metrics(curr, prev, mapping)
+    assert rollup.kpis(start, end, statuses) == curr_kpi
+    assert rollup.kpis(date(2026, 1, 5), date(2026, 1, 10), statuses) == prev_kpi
+
+    expected = _compute_order_status_metrics(curr)
+    got = _rollup_order_status_metrics(rollup, start, end, statuses)
+    for key in ("status_breakdown", "shipped_orders", "processing_orders", "cancelled_orders", "total_items"):
+        assert got[key] == expected[key], key
@@ -0,0 +1,28 @@
+from bench_wc_fetch import format_table, run_benchmarks
+from wc_stub_server import StubServer, synthetic_customers, synthetic_orders
+
+from app_modules.wc_live_source import fetch_wc_orders
+from app_modules.wc_fetcher import FetchConfig
+
+
+def test_stand_in_caps_page_size_and_injects_errors():
+    with StubServer(orders=synthetic_orders(250), max_per_page=50, error_rate=0.5, seed=3) as server:
+        orders = fetch_wc_orders(server.url, "ck", "cs", status="any", per_page=100,
+                                 fetch_config=FetchConfig(max_retries=8, backoff_base=0.001, backoff_max=0.01))
+        failures = len(server.requests) - 5
+    assert sorted(o["id"] for o in orders) == list(range(1, 251))
+    assert failures > 0
+
+
+def test_synthetic_fixtures_match_consumers():
+    order = synthetic_orders(1)[0]
+    assert {"billing", "line_items", "meta_data", "_links"} <= set(order)
+    assert any(m["key"] == "whatsapp_number" for c in synthetic_customers(20) for m in c["meta_data"])
+
+
+def test_benchmark_smoke_run():
+    results = run_benchmarks([300])
+    assert [r["target"] for r in results] == ["load_from_woocommerce", "fetch_wc_customers"]
+    assert all(r["pages"] == 3 and r["peak_mb"] > 0 for r in results)
+    assert results[1]["rows"] == 300
+    assert "items_per_sec" in format_table(results)
@@ -0,0 +1,61 @@
+from app_modules import wc_live_source as wls
+
+
+def _order(order_id, status="completed", modified="2026-01-01T10:00:00", qty=1):
+    return {
+        "id": order_id,
+        "status": status,
+        "date_created": "2026-01-01T09:00:00",
+        "date_modified": modified,
+        "billing": {"phone": "01711000000", "first_name": "A", "last_name": "B", "city": "Dhaka"},
+        "line_items": [{"type": "line_item", "name": "Polo Shirt - M", "quantity": qty, "subtotal": "500", "total": "500"}],
+    }
+
+
+class _FakeStore:
+    def __init__(self, orders):
+        self.orders = {o["id"]: o for o in orders}
+        self.calls = []
+
+    def fetch(self, **kwargs):
+        self.calls.append(kwargs)
+        orders = list(self.orders.values())
+        if kwargs.get("modified_after"):
+            orders = [o for o in orders if o["date_modified"] > kwargs["modified_after"]]
+        if kwargs.get("status") != "any":
+            allowed = set(kwargs["status"].split(","))
+            orders = [o for o in orders if o["status"] in allowed]
+        if kwargs.get("fields") == "id":
+            orders = [{"id": o["id"]} for o in orders]
+        return orders
+
+
+def test_delta_sync_upserts_and_reconciles(monkeypatch):
+    store = _FakeStore([_order(1), _order(2), _order(3)])
+    monkeypatch.setattr(wls, "fetch_wc_orders", store.fetch)
+    sync = wls.WCDeltaSync("shop.test", "ck", "cs", status="completed,processing", reconcile_interval=3600)
+
+    assert sync.sync()["full"] == 1
+    assert sorted(sync.rows_by_order) == ["1", "2", "3"]
+
+    store.orders[1] = _order(1, modified="2026-01-01T12:00:00", qty=5)
+    store.orders[2] = _order(2, status="cancelled", modified="2026-01-01T12:00:00")
+    store.orders[4] = _order(4, status="processing", modified="2026-01-01T12:30:00")
+    stats = sync.sync()
+
+    assert store.calls[-1]["modified_after"] == "2026-01-01T09:59:00"
+    # Order 3 falls inside the overlap window and is re-upserted unchanged
+    assert stats == {"fetched": 4, "upserted": 3, "removed": 1, "full": 0}
+    df = sync.to_dataframe()
+    assert sorted(df["Order ID"].unique()) == ["1", "3", "4"]
+    assert df.loc[df["Order ID"] == "1", "Quantity"].item() == 5
+    assert sync.watermark == "2026-01-01T12:30:00"
+
+    # Permanently deleted orders never show up in a modified_after query
+    del store.orders[3]
+    sync.reconcile_interval = 0
+    stats = sync.sync()
+
+    assert store.calls[-1]["fields"] == "id"
+    assert stats["removed"] == 1
+    assert sorted(sync.rows_by_order) == ["1", "4"]
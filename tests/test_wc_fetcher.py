@@ -0,0 +1,123 @@
+import asyncio
+
+import aiohttp
+import pytest
+from app_modules import wc_fetcher
+from app_modules import wc_live_source as wls
+from app_modules.wc_fetcher import FetchConfig, backoff_delay, fetch_all_pages
+from app_modules.wc_live_source import fetch_wc_orders
+from wc_stub_server import StubServer
+
+FAST = FetchConfig(concurrency=3, max_retries=3, backoff_base=0.01, backoff_max=0.05)
+
+
+def _orders(n):
+    return [{"id": i, "status": "completed", "line_items": []} for i in range(1, n + 1)]
+
+
+def _fetch(server, config=FAST, **params):
+    async def run():
+        async with aiohttp.ClientSession() as session:
+            return await fetch_all_pages(
+                session, f"{server.url}/wp-json/wc/v3/orders", dict({"per_page": 10}, **params),
+                config=config, label="test-orders",
+            )
+    return asyncio.run(run())
+
+
+def test_fetch_all_pages_bounds_concurrency_and_records_latency():
+    with StubServer(orders=_orders(95)) as server:
+        server.delays = {p: 0.05 for p in range(2, 11)}
+        items, report = _fetch(server)
+
+    assert sorted(o["id"] for o in items) == list(range(1, 96))
+    assert server.max_in_flight <= FAST.concurrency
+    assert report.total_pages == 10 and len(report.pages) == 10
+    assert all(p.latency > 0 for p in report.pages)
+
+
+def test_lowercase_pagination_headers_are_read():
+    with StubServer(orders=_orders(25)) as server:
+        server.lowercase_headers = True
+        items, report = _fetch(server)
+
+    assert report.total_pages == 3 and len(report.pages) == 3
+    assert sorted(o["id"] for o in items) == list(range(1, 26))
+
+
+def test_failed_pages_are_retried_individually():
+    with StubServer(orders=_orders(40)) as server:
+        server.faults = {2: [503, 429], 4: [502]}
+        items, report = _fetch(server)
+        page_hits = [r["page"] for r in server.requests]
+
+    assert len(items) == 40
+    assert page_hits.count(1) == 1 and page_hits.count(3) == 1
+    assert page_hits.count(2) == 3 and page_hits.count(4) == 2
+    assert report.retries == 3
+
+
+def test_retry_after_is_honoured_and_errors_surface():
+    with StubServer(orders=_orders(20)) as server:
+        server.faults = {2: [429]}
+        server.retry_after = "0.2"
+        _, report = _fetch(server, config=FetchConfig(backoff_base=0.01, backoff_max=1))
+    assert next(p for p in report.pages if p.page == 2).latency >= 0.2
+
+    with StubServer(orders=_orders(20)) as server:
+        server.faults = {2: [500] * 10}
+        with pytest.raises(aiohttp.ClientResponseError):
+            _fetch(server)
+
+    with StubServer(orders=_orders(20)) as server:
+        server.faults = {1: [401]}
+        with pytest.raises(Exception, match="Authentication failed"):
+            fetch_wc_orders(server.url, "ck", "cs", per_page=10)
+        assert len(server.requests) == 1
+
+
+def test_backoff_is_jittered_and_capped():
+    config = FetchConfig(backoff_base=1, backoff_max=8)
+    delays = [backoff_delay(10, config) for _ in range(50)]
+    assert all(0 <= d <= 8 for d in delays) and len(set(delays)) > 1
+    assert backoff_delay(0, config, retry_after=3) == 3
+
+
+def test_field_projection_is_requested_and_savings_reported():
+    orders = [
+        dict(o, date_created="2026-01-01T10:00:00", billing={"phone": "01711000000"},
+             meta_data=[{"key": "_note", "value": "x" * 200}], _links={"self": [{"href": "/orders"}]})
+        for o in _orders(25)
+    ]
+    sampling = FetchConfig(sample_projection=True)
+    reports = []
+    with StubServer(orders=orders) as server:
+        fetch_wc_orders(server.url, "ck", "cs", per_page=10, fields=wls.DASHBOARD_ORDER_FIELDS,
+                        fetch_config=sampling, on_report=reports.append)
+        fetch_wc_orders(server.url, "ck", "cs", per_page=10, fields=wls.DASHBOARD_ORDER_FIELDS,
+                        fetch_config=sampling, on_report=reports.append)
+        fetch_wc_orders(server.url, "ck", "cs", per_page=10, fields=wls.DASHBOARD_ORDER_FIELDS,
+                        on_report=reports.append)
+        projected = [r["query"].get("_fields") for r in server.requests]
+        fetch_wc_orders(server.url, "ck", "cs", per_page=10, fields=None, on_report=reports.append)
+        opted_out = server.requests[len(projected):]
+
+    # 3 projected pages per fetch plus one unprojected page-1 sample, only when sampling is on
+    assert projected.count("id,date_created,billing,shipping,line_items") == 9
+    assert projected.count(None) == 1
+    assert all("_fields" not in r["query"] for r in opted_out)
+
+    assert [r.projection is not None for r in reports] == [True, True, False, False]
+    assert reports[0].projection.full_bytes > reports[0].projection.projected_bytes
+    assert reports[-1].fields is None and reports[-1].total_bytes > 0
+
+
+def test_fetch_report_estimates_full_payload():
+    sample = wc_fetcher.ProjectionSample("id", 10, 250, 1000, 0.1, 0.3)
+    report = wc_fetcher.FetchReport(label="orders", total_pages=1, fields="id", projection=sample,
+                                    pages=[wc_fetcher.PageStat(1, 0.1, 1, 10, 200, 500)])
+    assert sample.saved_pct == 75
+    assert report.estimated_full_bytes == 2000
+    assert "_fields saved ~75%" in report.summary()
+    assert wc_fetcher.fields_param(["id", "status", "id"]) == "id,status"
+    assert wc_fetcher.fields_param(None) is None
@@ -0,0 +1,51 @@
+import threading
+
+from app_modules.wc_http import ProgressRelay, get_http_client
+from app_modules import wc_live_source
+from app_modules.wc_live_source import fetch_wc_orders
+from app_modules.woocommerce_customer_tab import fetch_wc_customers
+from wc_stub_server import StubServer
+
+
+class _Progress:
+    def __init__(self):
+        self.values = []
+        self.threads = set()
+
+    def progress(self, value, text=None):
+        self.values.append(value)
+        self.threads.add(threading.get_ident())
+
+
+def test_calls_share_one_session_and_keep_alive_connection():
+    orders = [{"id": i, "status": "completed", "line_items": []} for i in range(1, 21)]
+    customers = [{"id": i, "email": f"c{i}@example.com"} for i in range(1, 6)]
+    with StubServer(orders=orders, customers=customers) as server:
+        assert wc_live_source.test_wc_connection(server.url, "ck", "cs")
+        assert len(fetch_wc_orders(server.url, "ck", "cs")) == 20
+        assert len(fetch_wc_orders(server.url, "ck", "cs")) == 20
+        assert len(fetch_wc_customers(server.url, "ck", "cs")) == 5
+        assert len(server.requests) == 4
+        assert len(server.peers) == 1
+
+    client = get_http_client()
+    assert client is get_http_client() and client.loop.is_running()
+
+
+def test_progress_is_replayed_on_the_calling_thread():
+    orders = [{"id": i, "status": "completed", "line_items": []} for i in range(1, 31)]
+    target = _Progress()
+    with StubServer(orders=orders) as server:
+        fetch_wc_orders(server.url, "ck", "cs", per_page=10, progress_callback=target)
+    assert target.values and target.values[-1] == 1.0
+    assert target.threads == {threading.get_ident()}
+
+    relay = ProgressRelay(None)
+    relay.progress(0.5)
+    relay.flush()
+
+
+def test_connection_check_reports_failures():
+    with StubServer() as server:
+        server.faults = {1: [401]}
+        assert not wc_live_source.test_wc_connection(server.url, "ck", "cs")
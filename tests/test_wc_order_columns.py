@@ -0,0 +1,48 @@
+import pandas as pd
+from app_modules import wc_live_source as wls
+from wc_stub_server import StubServer
+
+
+def _orders(n):
+    return [
+        {
+            "id": i,
+            "status": "completed",
+            "date_created": f"2026-03-{1 + i % 28:02d}T10:{i % 60:02d}:00",
+            "billing": {"first_name": "Cus", "last_name": str(i), "phone": f"0171{i:07d}", "city": "Dhaka"},
+            "line_items": [
+                {"type": "line_item", "name": f"Polo Shirt - {'ML'[i % 2]}", "quantity": 1 + i % 3,
+                 "subtotal": str(500 * (1 + i % 3)), "total": str(450 * (1 + i % 3))},
+                {"type": "line_item", "name": "Cap", "quantity": 0, "price": 300, "subtotal": "0", "total": "0"},
+                {"type": "shipping", "name": "Courier"},
+            ],
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def _row_based(orders):
+    rows = [row for order in orders for row in wls._order_to_rows(order)]
+    return wls._rows_to_dashboard_df(rows)
+
+
+def test_column_buffer_matches_row_transform_in_page_order():
+    orders = _orders(25)
+    buffer = wls.OrderColumnBuffer()
+    for page in (3, 1, 2):  # pages arrive out of order
+        buffer.add_page(page, orders[(page - 1) * 10: page * 10])
+
+    df = buffer.to_dataframe()
+    assert (buffer.orders, buffer.rows) == (25, 50)
+    pd.testing.assert_frame_equal(df, _row_based(orders))
+    pd.testing.assert_frame_equal(wls.transform_orders_to_dashboard_df(orders), df)
+    assert wls.OrderColumnBuffer().to_dataframe().columns.tolist() == wls.DASHBOARD_COLUMNS
+
+
+def test_load_from_woocommerce_streams_pages_into_columns():
+    orders = _orders(230)
+    with StubServer(orders=orders) as server:
+        df, source, _ = wls.load_from_woocommerce(server.url, "ck", "cs", after="2026-01-01", before="2026-12-31")
+    assert len({r["page"] for r in server.requests}) == 3
+    assert source.startswith("wc_127.0.0.1")
+    pd.testing.assert_frame_equal(df, _row_based(orders))
@@ -0,0 +1,114 @@
+from datetime import date
+
+from app_modules import wc_live_source as wls
+from app_modules.wc_order_store import StoreDeltaSync, WCOrderStore
+
+
+def _order(order_id, status="completed", created="2026-01-01T09:00:00", modified=None, phone="01711000000"):
+    return {
+        "id": order_id,
+        "status": status,
+        "date_created": created,
+        "date_modified": modified or created,
+        "total": "1000",
+        "billing": {"phone": phone, "first_name": "A", "last_name": "B", "city": "", "email": "a@b.c"},
+        "shipping": {"city": "Dhaka"},
+        "line_items": [
+            {"type": "line_item", "name": "Polo Shirt - M", "sku": "P-100", "quantity": 2, "subtotal": "800", "total": "800"},
+            {"type": "line_item", "name": "Cap", "sku": "C-1", "quantity": 1, "subtotal": "200", "total": "200"},
+        ],
+    }
+
+
+def test_store_matches_transform_and_filters():
+    orders = [
+        _order(1),
+        _order(2, status="processing", created="2026-01-02T10:00:00", phone="+8801811000000"),
+        _order(3, status="cancelled", created="2026-01-03T11:00:00"),
+    ]
+    store = WCOrderStore()
+    store.upsert_orders(orders)
+
+    df = store.query_dashboard_df()
+    expected = wls.transform_orders_to_dashboard_df(orders)
+    assert df.to_dict("records") == expected.to_dict("records")
+
+    ranged = store.query_dashboard_df(start=date(2026, 1, 2), end=date(2026, 1, 3), statuses=["completed", "processing"])
+    assert ranged["Order ID"].unique().tolist() == ["2"]
+    assert store.query_orders(phone="01811000000")["id"].tolist() == ["2"]
+
+    # Upserting replaces line items instead of appending
+    changed = _order(1)
+    changed["line_items"] = changed["line_items"][:1]
+    store.upsert_orders([changed])
+    assert len(store.query_dashboard_df(statuses=["completed"])) == 1
+
+    # revision keys derived caches: it moves on every write, not on no-op deletes
+    revision = store.revision
+    store.delete_orders(["404"])
+    assert store.revision == revision
+    store.delete_orders(["3"])
+    assert store.revision == revision + 1
+
+
+def test_store_sync_persists_watermark(monkeypatch):
+    server = {1: _order(1, modified="2026-01-01T10:00:00"), 2: _order(2, modified="2026-01-01T10:00:00")}
+
+    def fake_fetch(**kwargs):
+        orders = list(server.values())
+        if kwargs.get("modified_after"):
+            orders = [o for o in orders if o["date_modified"] > kwargs["modified_after"]]
+        if kwargs.get("fields") == "id":
+            orders = [{"id": o["id"]} for o in orders]
+        return orders
+
+    monkeypatch.setattr(wls, "fetch_wc_orders", fake_fetch)
+    store = WCOrderStore()
+    sync = StoreDeltaSync(store, "shop.test", "ck", "cs", reconcile_interval=3600)
+    sync.sync()
+    assert store.get_meta("watermark") == "2026-01-01T10:00:00"
+
+    server[2] = _order(2, status="trash", modified="2026-01-01T11:00:00")
+    server[3] = _order(3, modified="2026-01-01T11:30:00")
+
+    # A new sync process (e.g. after a restart) resumes from the stored watermark
+    resumed = StoreDeltaSync(store, "shop.test", "ck", "cs", reconcile_interval=3600)
+    resumed.last_reconcile = float("inf")
+    stats = resumed.sync()
+
+    assert stats["full"] == 0
+    assert sorted(store.order_ids()) == ["1", "3"]
+    assert store.get_meta("watermark") == "2026-01-01T11:30:00"
+
+
+def test_backfill_then_first_sync_on_empty_store(monkeypatch):
+    # Old order modified recently; recent order created inside the window
+    server = {
+        1: _order(1, created="2026-01-05T09:00:00", modified="2026-01-20T10:00:00"),
+        2: _order(2, created="2026-01-15T09:00:00"),
+    }
+
+    def fake_fetch(**kwargs):
+        orders = list(server.values())
+        if kwargs.get("after"):
+            orders = [o for o in orders if o["date_created"] >= kwargs["after"]]
+        if kwargs.get("before"):
+            orders = [o for o in orders if o["date_created"] < kwargs["before"]]
+        if kwargs.get("modified_after"):
+            orders = [o for o in orders if o["date_modified"] > kwargs["modified_after"]]
+        return orders
+
+    monkeypatch.setattr(wls, "fetch_wc_orders", fake_fetch)
+    monkeypatch.setattr("app_modules.wc_order_store.fetch_wc_orders", fake_fetch)
+    store = WCOrderStore()
+    sync = StoreDeltaSync(store, "shop.test", "ck", "cs", reconcile_interval=3600)
+    sync.after = "2026-01-10T00:00:00"
+
+    sync.ensure_coverage("2026-01-01T00:00:00")
+    assert sync.watermark is None
+    assert store.order_ids() == ["1"]
+
+    stats = sync.sync()
+    assert stats["full"] == 1
+    assert sorted(store.order_ids()) == ["1", "2"]
+    assert store.get_meta("watermark") == "2026-01-20T10:00:00"
@@ -0,0 +1,52 @@
+import json
+import os
+import time
+
+import requests
+from app_modules.wc_order_store import WCOrderStore
+from app_modules.wc_webhook import WebhookReceiver, sign_payload, verify_signature
+from post_wc_webhooks import load_records, post_records
+
+SECRET = "whsec-test"
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "wc_webhook_deliveries.json")
+
+
+def test_signature_matches_woocommerce_format():
+    body = b'{"id": 1}'
+    assert verify_signature(body, sign_payload(body, SECRET), SECRET)
+    assert not verify_signature(body, sign_payload(body, "other"), SECRET)
+    assert not verify_signature(body, None, SECRET)
+
+
+def test_recorded_deliveries_are_upserted_end_to_end():
+    store = WCOrderStore()
+    changes = []
+    receiver = WebhookReceiver(store, SECRET, host="127.0.0.1", port=0, on_change=lambda t, i: changes.append((t, i)))
+    receiver.start()
+    try:
+        started = time.perf_counter()
+        results = post_records(receiver.url, SECRET, load_records(FIXTURE))
+        elapsed = time.perf_counter() - started
+        assert [status for status, _, _ in results] == [200] * 4
+        # The stale order.updated (older date_modified) is not applied
+        assert [body["applied"] for _, _, body in results] == [True, True, True, False]
+        assert elapsed < 1.0
+
+        orders = store.query_orders().set_index("id")
+        assert orders.loc["9001", "status"] == "completed"
+        assert store.query_dashboard_df().groupby("Order ID")["Quantity"].sum().to_dict() == {"9001": 3, "9002": 2}
+        assert changes == [("order.created", "9001"), ("order.created", "9002"), ("order.updated", "9001")]
+
+        # Redelivery of the same delivery id is ignored; a bad signature is rejected
+        assert post_records(receiver.url, SECRET, load_records(FIXTURE)[:1])[0][2] == {"ok": True, "duplicate": "d-1"}
+        body = json.dumps({"id": 9003}).encode()
+        resp = requests.post(receiver.url, data=body, headers={
+            "X-WC-Webhook-Topic": "order.created", "X-WC-Webhook-Signature": sign_payload(body, "wrong")})
+        assert resp.status_code == 401 and store.count() == 2
+
+        record = {"topic": "order.deleted", "payload": {"id": 9002}}
+        post_records(receiver.url, SECRET, [record])
+        assert store.count() == 1
+        assert receiver.stats["rejected"] == 1
+    finally:
+        receiver.stop()
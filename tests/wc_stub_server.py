@@ -0,0 +1,257 @@
+"""
+Local WooCommerce REST stand-in for fetcher tests and benchmarks.
+
+Serves /wp-json/wc/v3/orders and /customers with X-WP-Total(Pages)
+headers on a background thread, from synthetic (synthetic_orders /
+synthetic_customers) or recorded (load_fixture) data. Supports per-request
+latency, a per_page cap, per-page failures (status codes, Retry-After),
+random error injection and `_fields` projection.
+
+Standalone:
+    python tests/wc_stub_server.py --orders 10000 --customers 10000 --latency 0.05
+prints "READY <url>" and serves until interrupted.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from aiohttp import web
+
+_PRODUCTS = [
+    ("Polo Shirt", 1290), ("Denim Jeans", 2490), ("Panjabi", 3290), ("Cap", 450),
+    ("Embroidered Cotton Panjabi", 3890), ("Chino Pant", 1990), ("T-Shirt", 790), ("Sweatshirt", 2190),
+]
+_SIZES = ["S", "M", "L", "XL", "XXL"]
+_CITIES = ["Dhaka", "Chattogram", "Sylhet", "Khulna", "Rajshahi", "Barishal", "Rangpur", "Gazipur"]
+_STATUSES = ["completed"] * 6 + ["processing"] * 2 + ["shipped", "cancelled", "refunded", "on-hold"]
+
+
+def synthetic_orders(n: int, seed: int = 0, start: str = "2026-01-01") -> List[Dict]:
+    """WooCommerce-shaped orders (meta_data, tax/shipping lines and _links included)."""
+    rng = random.Random(seed)
+    base = datetime.fromisoformat(start)
+    orders = []
+    for i in range(1, n + 1):
+        created = base + timedelta(minutes=i * 7 + rng.randint(0, 5))
+        items = []
+        for line in range(rng.randint(1, 3)):
+            name, price = rng.choice(_PRODUCTS)
+            qty = rng.randint(1, 3)
+            items.append({
+                "id": i * 10 + line, "type": "line_item", "name": f"{name} - {rng.choice(_SIZES)}",
+                "product_id": 100 + _PRODUCTS.index((name, price)), "variation_id": 0, "quantity": qty,
+                "sku": f"SKU-{name[:3].upper()}-{line}", "price": price,
+                "subtotal": f"{price * qty:.2f}", "total": f"{price * qty:.2f}", "total_tax": "0.00",
+                "taxes": [], "meta_data": [{"id": i, "key": "pa_size", "value": rng.choice(_SIZES)}],
+            })
+        city = rng.choice(_CITIES)
+        billing = {
+            "first_name": f"Customer{i % 997}", "last_name": "Test", "company": "",
+            "address_1": f"House {i % 50}, Road {i % 20}", "address_2": "", "city": city, "state": "BD-13",
+            "postcode": "1207", "country": "BD", "email": f"customer{i % 997}@example.com",
+            "phone": f"017{rng.randint(10000000, 99999999)}",
+        }
+        orders.append({
+            "id": i, "parent_id": 0, "status": rng.choice(_STATUSES), "currency": "BDT",
+            "date_created": created.strftime("%Y-%m-%dT%H:%M:%S"),
+            "date_modified": (created + timedelta(hours=rng.randint(0, 48))).strftime("%Y-%m-%dT%H:%M:%S"),
+            "total": f"{sum(float(it['total']) for it in items) + 80:.2f}", "shipping_total": "80.00",
+            "customer_id": i % 997, "payment_method": rng.choice(["cod", "bkash", "card"]),
+            "billing": billing, "shipping": {k: billing[k] for k in ("first_name", "last_name", "address_1", "city", "country")},
+            "line_items": items,
+            "shipping_lines": [{"id": i, "method_title": "Courier", "total": "80.00", "meta_data": []}],
+            "tax_lines": [], "fee_lines": [], "coupon_lines": [], "refunds": [],
+            "meta_data": [{"id": i, "key": "_delivery_note", "value": "Call before delivery"}],
+            "_links": {"self": [{"href": f"https://shop.example.com/wp-json/wc/v3/orders/{i}"}],
+                       "collection": [{"href": "https://shop.example.com/wp-json/wc/v3/orders"}]},
+        })
+    return orders
+
+
+def synthetic_customers(n: int, seed: int = 0, start: str = "2025-01-01") -> List[Dict]:
+    """WooCommerce-shaped customers with WhatsApp meta keys on some of them."""
+    rng = random.Random(seed)
+    base = datetime.fromisoformat(start)
+    customers = []
+    for i in range(1, n + 1):
+        phone = f"018{rng.randint(10000000, 99999999)}"
+        meta = [{"id": i, "key": "_last_order_source", "value": "web"}]
+        if rng.random() < 0.4:
+            meta += [{"id": i + 1, "key": "whatsapp_number", "value": phone},
+                     {"id": i + 2, "key": "whatsapp_enabled", "value": "yes"}]
+        customers.append({
+            "id": i, "date_created": (base + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "email": f"user{i}@example.com", "first_name": f"User{i}", "last_name": "Test",
+            "role": "customer", "username": f"user{i}", "is_paying_customer": rng.random() < 0.5,
+            "avatar_url": "https://secure.gravatar.com/avatar/0?s=96",
+            "billing": {"first_name": f"User{i}", "last_name": "Test", "city": rng.choice(_CITIES),
+                        "country": "BD", "email": f"user{i}@example.com", "phone": phone},
+            "shipping": {"first_name": f"User{i}", "last_name": "Test", "city": rng.choice(_CITIES), "country": "BD"},
+            "meta_data": meta,
+            "_links": {"self": [{"href": f"https://shop.example.com/wp-json/wc/v3/customers/{i}"}]},
+        })
+    return customers
+
+
+def load_fixture(path: str) -> List[Dict]:
+    """Recorded API objects: a JSON list, or pages ({"page": n, "items": [...]}) concatenated."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data and isinstance(data[0], dict) and "items" in data[0] and "id" not in data[0]:
+        return [item for page in sorted(data, key=lambda p: p.get("page", 0)) for item in page["items"]]
+    return data
+
+
+class StubServer:
+    def __init__(self, orders: Optional[List[Dict]] = None, customers: Optional[List[Dict]] = None,
+                 latency: float = 0.0, jitter: float = 0.0, max_per_page: int = 100,
+                 error_rate: float = 0.0, error_statuses: Sequence[int] = (500, 502, 503, 429),
+                 seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.collections = {"orders": orders or [], "customers": customers or []}
+        # page -> statuses to return (in order) before serving the page
+        self.faults: Dict[int, List[int]] = {}
+        self.retry_after: Optional[str] = None
+        # send pagination headers lowercased, as some proxies do
+        self.lowercase_headers = False
+        self.delays: Dict[int, float] = {}
+        self.latency = latency
+        self.jitter = jitter
+        self.max_per_page = max_per_page
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.requests: List[Dict] = []
+        # client (host, port) pairs seen, i.e. distinct TCP connections
+        self.peers = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(seed)
+        self._attempts = defaultdict(int)
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self.host = host
+        self.port = port or None
+        self._bind_port = port
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        name = request.match_info["collection"]
+        page = int(request.query.get("page", 1))
+        per_page = min(int(request.query.get("per_page", 10)), self.max_per_page)
+        self.peers.add(request.transport.get_extra_info("peername"))
+        self.requests.append({"collection": name, "page": page, "query": dict(request.query), "time": time.perf_counter()})
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = self.delays.get(page, 0) + self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+            if delay:
+                await asyncio.sleep(delay)
+            attempt = self._attempts[(name, page)]
+            self._attempts[(name, page)] += 1
+            faults = self.faults.get(page, [])
+            if attempt < len(faults) or (self.error_rate and self._rng.random() < self.error_rate):
+                status = faults[attempt] if attempt < len(faults) else self._rng.choice(self.error_statuses)
+                headers = {"Retry-After": self.retry_after} if self.retry_after else {}
+                return web.json_response({"code": "stub_error"}, status=status, headers=headers)
+
+            items = self.collections.get(name, [])
+            total_pages = max(1, -(-len(items) // per_page))
+            body = items[(page - 1) * per_page: page * per_page]
+            fields = request.query.get("_fields")
+            if fields:
+                keep = fields.split(",")
+                body = [{k: item[k] for k in keep if k in item} for item in body]
+            headers = {"X-WP-Total": str(len(items)), "X-WP-TotalPages": str(total_pages)}
+            if self.lowercase_headers:
+                headers = {k.lower(): v for k, v in headers.items()}
+            return web.json_response(body, headers=headers)
+        finally:
+            self.in_flight -= 1
+
+    def _build(self):
+        app = web.Application()
+        app.router.add_get("/wp-json/wc/v3/{collection}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self._bind_port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def start(self) -> "StubServer":
+        ready = threading.Event()
+
+        def _run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._build()
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=_run, daemon=True)
+        self._thread.start()
+        ready.wait(5)
+        return self
+
+    def serve_forever(self):
+        """Run in the current thread (standalone mode)."""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._build()
+        print(f"READY {self.url}", flush=True)
+        try:
+            self._loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._loop.run_until_complete(self._runner.cleanup())
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local WooCommerce REST stand-in")
+    parser.add_argument("--orders", type=int, default=1000, help="synthetic order count")
+    parser.add_argument("--customers", type=int, default=0, help="synthetic customer count")
+    parser.add_argument("--orders-file", help="recorded orders JSON (overrides --orders)")
+    parser.add_argument("--customers-file", help="recorded customers JSON (overrides --customers)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random 0..jitter seconds")
+    parser.add_argument("--max-per-page", type=int, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 5xx/429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    orders = load_fixture(args.orders_file) if args.orders_file else synthetic_orders(args.orders, args.seed)
+    customers = load_fixture(args.customers_file) if args.customers_file else synthetic_customers(args.customers, args.seed)
+    StubServer(
+        orders, customers, latency=args.latency, jitter=args.jitter, max_per_page=args.max_per_page,
+        error_rate=args.error_rate, seed=args.seed, host=args.host, port=args.port,
+    ).serve_forever()
+
+
+if __name__ == "__main__":
+    main()